@@ -0,0 +1,141 @@
+import copy
+import json
+import os
+import threading
+
+
+TASKS = ["evaluation", "drafting", "knowledge", "triage"]
+
+DEFAULT_SETTINGS = {
+    "models": {"evaluation": "gpt-4", "drafting": "gpt-4", "knowledge": "gpt-4", "triage": "gpt-4o-mini"},
+    "temperatures": {"evaluation": 0.0, "drafting": 0.5, "knowledge": 0.5, "triage": 0.0},
+    # Sections evaluated by the triage model first, escalating only uncertain items
+    "cascade_sections": [],
+    "cascade_confidence_threshold": 0.8,
+    "max_concurrent_sections": 5,
+    "requests_per_minute": 60,
+    "tokens_per_minute": 80000,
+    "max_retries": 5,
+    "timeout_seconds": 120.0,
+    "cache_max_mb": 50,
+    "cache_ttl_days": 30,
+    # 0 disables the limit
+    "daily_token_budget": 0
+}
+
+# --- Validation ---
+def _merge(base, overrides):
+    if not isinstance(overrides or {}, dict):
+        raise ValueError("Settings must be a JSON object.")
+    merged = copy.deepcopy(base)
+    for key, value in (overrides or {}).items():
+        if key not in merged:
+            continue
+        if isinstance(merged[key], dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"{key.capitalize()} must be an object keyed by task.")
+            merged[key].update({task: v for task, v in value.items() if task in merged[key]})
+        else:
+            merged[key] = value
+    return merged
+
+def validate_settings(settings):
+    """Return a normalised copy of ``settings``, raising ValueError for out-of-range or mistyped values."""
+    try:
+        return _validate(_merge(DEFAULT_SETTINGS, settings))
+    except TypeError as e:
+        # e.g. a null or a list where a number belongs in a hand-edited file
+        raise ValueError(f"Malformed setting: {e}") from None
+
+def _validate(settings):
+    for task in TASKS:
+        name = str(settings["models"][task]).strip()
+        if not name:
+            raise ValueError(f"A model name is required for {task}.")
+        settings["models"][task] = name
+        temperature = float(settings["temperatures"][task])
+        if not 0 <= temperature <= 2:
+            raise ValueError(f"The {task} temperature must be between 0 and 2.")
+        settings["temperatures"][task] = temperature
+
+    minimums = {
+        "max_concurrent_sections": 1,
+        "requests_per_minute": 1,
+        "tokens_per_minute": 1000,
+        "max_retries": 0,
+        "cache_max_mb": 1,
+        "cache_ttl_days": 1,
+        "daily_token_budget": 0
+    }
+    for key, minimum in minimums.items():
+        settings[key] = int(settings[key])
+        if settings[key] < minimum:
+            raise ValueError(f"{key.replace('_', ' ').capitalize()} must be at least {minimum}.")
+    settings["timeout_seconds"] = float(settings["timeout_seconds"])
+    if settings["timeout_seconds"] <= 0:
+        raise ValueError("Timeout seconds must be positive.")
+
+    sections = {str(sid).strip() for sid in settings["cascade_sections"]} if isinstance(settings["cascade_sections"], list) else None
+    if sections is None or not all(sid.isdigit() for sid in sections):
+        raise ValueError("Cascade sections must be a list of section numbers, e.g. [\"4\", \"6\"].")
+    settings["cascade_sections"] = sorted(sections, key=int)
+    settings["cascade_confidence_threshold"] = float(settings["cascade_confidence_threshold"])
+    if not 0 <= settings["cascade_confidence_threshold"] <= 1:
+        raise ValueError("The cascade confidence threshold must be between 0 and 1.")
+    return settings
+
+# --- Persistence ---
+class SettingsStore:
+    """Admin settings kept in a JSON file and re-read whenever the file changes.
+
+    Values missing from the file fall back to ``defaults``, so the file only
+    needs to hold what an admin actually changed. Writes go through a temporary
+    file and an atomic rename, so other sessions never read a half-written file.
+    """
+
+    def __init__(self, path, defaults=None):
+        self.path = path
+        self.defaults = validate_settings(defaults or DEFAULT_SETTINGS)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._settings = copy.deepcopy(self.defaults)
+        self.error = None
+
+    def load(self):
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                try:
+                    overrides = {}
+                    if mtime is not None:
+                        with open(self.path, encoding="utf-8") as f:
+                            overrides = json.load(f)
+                    self._settings = validate_settings(_merge(self.defaults, overrides))
+                    self.error = None
+                except ValueError as e:
+                    # A hand-edited file with a mistake keeps the last good settings running
+                    self.error = f"{self.path}: {e}"
+                self._mtime = mtime
+            return copy.deepcopy(self._settings)
+
+    def save(self, settings):
+        settings = validate_settings(settings)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(settings, f, indent=2)
+            os.replace(temporary, self.path)
+            self._mtime = None
+        return settings
+
+    def reset(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._mtime = -1
@@ -0,0 +1,79 @@
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+class ServiceError(RuntimeError):
+    def __init__(self, status, message):
+        super().__init__(f"Compliance API returned {status}: {message}")
+        self.status = status
+
+# --- Client ---
+class ComplianceServiceClient:
+    """Minimal client for api_service.py, using only the standard library."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None, **params):
+        query = urllib.parse.urlencode({key: value for key, value in params.items() if value is not None})
+        request = urllib.request.Request(
+            f"{self.base_url}{path}" + (f"?{query}" if query else ""),
+            data=json.dumps(body).encode("utf-8") if body is not None else None,
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+            method=method
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("detail", e.reason)
+            except (ValueError, AttributeError):
+                message = e.reason
+            raise ServiceError(e.code, message) from None
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def evaluate_section(self, policy_text, section_id, **options):
+        return self._request("POST", "/evaluate/section", dict(options, policy_text=policy_text, section_id=section_id))
+
+    # --- Jobs ---
+    def submit(self, policy_text, section_ids=None, **options):
+        """Queue a whole-policy evaluation; ``options`` are JobRequest fields (model, use_cache, record...)."""
+        return self._request("POST", "/jobs", dict(options, policy_text=policy_text, section_ids=section_ids))
+
+    def status(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def results(self, job_id, partial=False):
+        return self._request("GET", f"/jobs/{job_id}/result", partial="true" if partial else None)
+
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def iter_results(self, job_id, poll_interval=1.0, timeout=None):
+        """Poll a job, yielding each section result once as it finishes.
+
+        Raises ServiceError when the job fails or is cancelled and TimeoutError
+        after ``timeout`` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        seen = set()
+        while True:
+            status = self.status(job_id)
+            for result in self.results(job_id, partial=True):
+                if result["Section"] not in seen:
+                    seen.add(result["Section"])
+                    yield result
+            if status["status"] == "succeeded":
+                return
+            if status["status"] in ("failed", "cancelled"):
+                raise ServiceError(500, f"Job {job_id} {status['status']}: {status['error'] or 'no details'}")
+            if deadline and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout} seconds.")
+            time.sleep(poll_interval)
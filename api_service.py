@@ -0,0 +1,383 @@
+"""HTTP API around the compliance engine, for integrations that submit policies programmatically.
+
+Usage:
+    OPENAI_API_KEY=... python api_service.py --port 8000
+    OPENAI_API_KEY=... uvicorn api_service:app --port 8000
+
+Single-section checks and drafting are answered directly. Whole-policy
+evaluations are queued as jobs on a pool of worker threads: POST /jobs
+returns a job id, GET /jobs/{id} reports progress and GET /jobs/{id}/result
+returns the section results in the same shape as the app's combined JSON
+export. Job state lives in the process that accepted the job, so when
+several replicas run behind a load balancer, poll the replica that returned
+the id (e.g. with sticky sessions); the result cache and rate limits are
+configured the same way as for the app and batch_audit.py.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+
+from fastapi import FastAPI, File, Form, HTTPException, Query, UploadFile
+from pydantic import BaseModel, Field
+
+import dpdpa_engine
+from admin_settings import DEFAULT_SETTINGS, SettingsStore
+from dpdpa_engine import (
+    analyze_policy_section, analyze_sections_batched, analyze_sections_concurrently, assemble_policy, call_gpt_text,
+    create_custom_draft_prompt, create_lifecycle_prompt, create_policy_generation_prompt, create_section_draft_prompt,
+    dpdpa_checklists, extract_text_from_bytes, generate_policy_parts, lifecycle_options, policy_generation_parts
+)
+from evaluation_store import EvaluationStore
+from gpt_scheduler import RequestScheduler
+from job_queue import JobQueue, QueueFullError
+from pdf_extract import PdfTooLargeError
+from result_cache import ResultCache
+from telemetry import Telemetry, llm_feature
+
+
+# --- Engine Setup ---
+# Environment variables mirror the app's secrets. Everything is built in the lifespan hook rather than
+# at import, so the spawn workers pdf_extract starts for long PDFs (which re-import this module) stay cheap.
+settings_store = None
+applied_settings = None
+telemetry = None
+result_cache = None
+request_scheduler = None
+evaluation_store = None
+jobs = None
+
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", 500))
+PDF_MAX_BYTES = int(os.environ.get("PDF_MAX_MB", 25)) * 1024 * 1024
+# How often the Admin Settings file is checked for changes saved from the app
+SETTINGS_POLL_SECONDS = float(os.environ.get("ADMIN_SETTINGS_POLL_SECONDS", 5))
+
+def setup():
+    global settings_store, telemetry, result_cache, request_scheduler, evaluation_store, jobs
+    defaults = dict(DEFAULT_SETTINGS)
+    env_defaults = {
+        "max_concurrent_sections": "MAX_CONCURRENT_SECTIONS",
+        "cache_max_mb": "RESULT_CACHE_MAX_MB",
+        "cache_ttl_days": "RESULT_CACHE_TTL_DAYS",
+        "requests_per_minute": "OPENAI_REQUESTS_PER_MINUTE",
+        "tokens_per_minute": "OPENAI_TOKENS_PER_MINUTE",
+        "max_retries": "OPENAI_MAX_RETRIES",
+        "timeout_seconds": "OPENAI_TIMEOUT_SECONDS",
+        "daily_token_budget": "OPENAI_DAILY_TOKEN_BUDGET"
+    }
+    for key, variable in env_defaults.items():
+        if variable in os.environ:
+            defaults[key] = os.environ[variable]
+    settings_store = SettingsStore(os.environ.get("ADMIN_SETTINGS_PATH", "data/admin_settings.json"), defaults)
+    telemetry = Telemetry(
+        log_path=os.environ.get("TELEMETRY_LOG_PATH", "data/llm_calls.jsonl"),
+        metrics_path=os.environ.get("TELEMETRY_METRICS_PATH") or None
+    )
+    result_cache = ResultCache(os.environ.get("RESULT_CACHE_PATH", ".cache/dpdpa_results.sqlite"))
+    # The daily token budget is kept in the result cache, shared with the app and batch audits
+    request_scheduler = RequestScheduler(budget_store=result_cache)
+    evaluation_store = EvaluationStore(os.environ.get("EVALUATION_STORE_PATH", "data/dpdpa_evaluations.sqlite"))
+    jobs = JobQueue(
+        workers=int(os.environ.get("API_JOB_WORKERS", 2)),
+        max_pending=int(os.environ.get("API_MAX_PENDING_JOBS", 100))
+    )
+    apply_settings()
+
+def apply_settings():
+    """Apply the saved Admin Settings if they changed since they were last applied."""
+    global applied_settings
+    settings = settings_store.load()
+    if settings == applied_settings:
+        return
+    result_cache.resize(
+        max_bytes=settings["cache_max_mb"] * 1024 * 1024,
+        max_age_seconds=settings["cache_ttl_days"] * 24 * 3600
+    )
+    request_scheduler.update(
+        requests_per_minute=settings["requests_per_minute"],
+        tokens_per_minute=settings["tokens_per_minute"],
+        max_retries=settings["max_retries"],
+        timeout=settings["timeout_seconds"],
+        daily_token_budget=settings["daily_token_budget"]
+    )
+    dpdpa_engine.configure(
+        cache=result_cache,
+        max_concurrency=settings["max_concurrent_sections"],
+        request_scheduler=request_scheduler,
+        models=settings["models"],
+        temperatures=settings["temperatures"],
+        call_telemetry=telemetry,
+        cascade_sections=settings["cascade_sections"],
+        cascade_threshold=settings["cascade_confidence_threshold"]
+    )
+    applied_settings = settings
+
+async def watch_settings():
+    # Settings are saved from the app's Admin page; re-applying them per request would race running jobs
+    while True:
+        await asyncio.sleep(SETTINGS_POLL_SECONDS)
+        await asyncio.to_thread(apply_settings)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    setup()
+    watcher = asyncio.create_task(watch_settings())
+    yield
+    watcher.cancel()
+    jobs.shutdown()
+
+app = FastAPI(title="DPDPA Compliance API", lifespan=lifespan)
+
+# --- Request Bodies ---
+class EvaluationOptions(BaseModel):
+    model: str | None = None
+    use_cache: bool = True
+    retrieval_top_k: int | None = Field(None, ge=1)
+    prescreen: bool = True
+
+class SectionRequest(EvaluationOptions):
+    policy_text: str = Field(min_length=1)
+    section_id: str
+
+class JobRequest(EvaluationOptions):
+    policy_text: str = Field(min_length=1)
+    section_ids: list[str] | None = None
+    batched: bool = False
+    document: str = ""
+    organization: str = ""
+    # Clients that keep their own history (like the Streamlit app) turn this off
+    record: bool = True
+
+class PolicyDraftRequest(BaseModel):
+    policy_type: str
+    org_name: str
+    sector: str
+    data_types: list[str]
+    children_data: str = "No"
+    cross_border: str = "No"
+    lawful_purpose: str
+    consent_type: str = "Explicit Consent"
+    special_uses: str = "None"
+    retention_period: str
+    grievance_email: str
+    by_section: bool = False
+    model: str | None = None
+
+class SectionDraftRequest(BaseModel):
+    section_id: str
+    instruction: str = Field(min_length=1)
+    context: str = ""
+    model: str | None = None
+
+class LifecycleDraftRequest(BaseModel):
+    stage: str
+    instruction: str = ""
+    context: str = ""
+    model: str | None = None
+
+class CustomDraftRequest(BaseModel):
+    instruction: str = Field(min_length=1)
+    sector: str = ""
+    scope: str = ""
+    category: str = ""
+    model: str | None = None
+
+def check_sections(section_ids):
+    unknown = [sid for sid in section_ids if sid not in dpdpa_checklists]
+    if unknown:
+        raise HTTPException(422, f"Unknown sections: {', '.join(unknown)}. Available: {', '.join(dpdpa_checklists)}.")
+    return section_ids
+
+# --- Reference ---
+@app.get("/health")
+async def health():
+    return {"status": "ok", "checklist": dpdpa_engine.checklist_registry.version}
+
+@app.get("/sections")
+async def sections():
+    return dpdpa_checklists
+
+@app.get("/metrics/summary")
+async def metrics_summary():
+    return {"calls": telemetry.summary(), "cascade": telemetry.escalation_summary()}
+
+# --- Documents ---
+@app.post("/extract")
+async def extract(file: UploadFile = File(...)):
+    """Text of an uploaded PDF, TXT or DOCX policy."""
+    data = await file.read()
+    try:
+        text = await asyncio.to_thread(
+            extract_text_from_bytes, file.filename or "", data, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES
+        )
+    except PdfTooLargeError as e:
+        raise HTTPException(413, str(e))
+    except ValueError as e:
+        raise HTTPException(415, str(e))
+    return {"document": file.filename, "characters": len(text), "text": text}
+
+# --- Evaluation ---
+@app.post("/evaluate/section")
+async def evaluate_section(request: SectionRequest):
+    """Evaluate one section synchronously; returns the section result JSON."""
+    check_sections([request.section_id])
+    return await asyncio.to_thread(
+        analyze_policy_section, request.section_id, dpdpa_checklists[request.section_id]["items"], request.policy_text,
+        request.model, request.use_cache, request.retrieval_top_k, request.prescreen
+    )
+
+def evaluation_job(policy_text, section_ids, options, batched=False, document="", organization="", record=True):
+    """The job body for JobQueue: evaluate ``section_ids`` and return the results in section order."""
+    def run(report):
+        if batched:
+            section_results = analyze_sections_batched(
+                section_ids, policy_text, options.model, use_cache=options.use_cache, prescreen=options.prescreen
+            )
+        else:
+            section_results = analyze_sections_concurrently(
+                section_ids, policy_text, options.model, use_cache=options.use_cache,
+                retrieval_top_k=options.retrieval_top_k, prescreen=options.prescreen
+            )
+        results = []
+        for result in section_results:
+            results.append(result)
+            report(result)
+        results.sort(key=lambda r: section_ids.index(r["Section"]))
+        if record:
+            evaluation_store.record_run(
+                results, policy_text=policy_text, organization=organization, document=document,
+                model=dpdpa_engine.model_for("evaluation", options.model), source="api"
+            )
+        return results
+    return run
+
+def submit_job(run, **info):
+    try:
+        return jobs.submit(run, **info)
+    except QueueFullError as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "30"})
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """Queue an evaluation of the given sections (default: all) and return the job status."""
+    section_ids = check_sections(request.section_ids or list(dpdpa_checklists))
+    return submit_job(
+        evaluation_job(
+            request.policy_text, section_ids, request, request.batched, request.document, request.organization, request.record
+        ),
+        document=request.document, sections=section_ids, total=len(section_ids)
+    )
+
+@app.post("/jobs/upload", status_code=202)
+async def create_job_from_file(
+    file: UploadFile = File(...),
+    sections: str = Form("", description="Comma-separated section ids; empty for all."),
+    organization: str = Form(""),
+    model: str | None = Form(None),
+    use_cache: bool = Form(True),
+    prescreen: bool = Form(True),
+    retrieval_top_k: int | None = Form(None),
+    batched: bool = Form(False)
+):
+    """Queue an evaluation of an uploaded policy file; text extraction runs on the job's worker."""
+    section_ids = check_sections([sid.strip() for sid in sections.split(",") if sid.strip()] or list(dpdpa_checklists))
+    options = EvaluationOptions(model=model, use_cache=use_cache, prescreen=prescreen, retrieval_top_k=retrieval_top_k)
+    document, data = file.filename or "upload", await file.read()
+
+    def run(report):
+        text = extract_text_from_bytes(document, data, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES)
+        return evaluation_job(text, section_ids, options, batched, document, organization)(report)
+
+    return submit_job(run, document=document, sections=section_ids, total=len(section_ids))
+
+@app.get("/jobs")
+async def list_jobs(limit: int = Query(50, ge=1, le=500)):
+    return jobs.recent(limit)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(404, f"No job {job_id}.")
+    return status
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, partial: bool = False):
+    """The section results list, as in DPDPA_All_Sections_Combined.json.
+
+    Until the job has succeeded this is 409, unless ``partial`` asks for the
+    sections finished so far (in completion order).
+    """
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(404, f"No job {job_id}.")
+    if status["status"] != "succeeded" and not partial:
+        raise HTTPException(409, f"Job {job_id} is {status['status']}.")
+    return jobs.results(job_id)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if jobs.status(job_id) is None:
+        raise HTTPException(404, f"No job {job_id}.")
+    if not jobs.cancel(job_id):
+        raise HTTPException(409, f"Job {job_id} has already started.")
+    return jobs.status(job_id)
+
+# --- Drafting ---
+def draft(prompt, feature, model=None):
+    with llm_feature(feature):
+        return call_gpt_text(prompt, model=model)
+
+@app.post("/generate/policy")
+async def generate_policy(request: PolicyDraftRequest):
+    """A full policy draft, in one response or drafted part by part in parallel (``by_section``)."""
+    details = request.model_dump(exclude={"by_section", "model"})
+    if not request.by_section:
+        text = await asyncio.to_thread(draft, create_policy_generation_prompt(details), "generator:full-policy", request.model)
+        return {"text": text, "failed_parts": []}
+
+    parts = policy_generation_parts(include_children=request.children_data == "Yes")
+
+    def run():
+        texts, failed = {}, []
+        for part, text, error in generate_policy_parts(details, parts, model=request.model):
+            if error is None:
+                texts[part["key"]] = text
+            else:
+                failed.append(part["heading"])
+        return {"text": assemble_policy(parts, texts), "failed_parts": failed}
+    return await asyncio.to_thread(run)
+
+@app.post("/generate/section")
+async def generate_section(request: SectionDraftRequest):
+    check_sections([request.section_id])
+    prompt = create_section_draft_prompt(
+        request.section_id, dpdpa_checklists[request.section_id]["title"], request.instruction, request.context
+    )
+    return {"text": await asyncio.to_thread(draft, prompt, "generator:section", request.model)}
+
+@app.post("/generate/lifecycle")
+async def generate_lifecycle(request: LifecycleDraftRequest):
+    if request.stage not in lifecycle_options:
+        raise HTTPException(422, f"Unknown lifecycle stage. Available: {', '.join(lifecycle_options)}.")
+    prompt = create_lifecycle_prompt(request.stage, request.instruction or lifecycle_options[request.stage], request.context)
+    return {"text": await asyncio.to_thread(draft, prompt, "generator:lifecycle", request.model)}
+
+@app.post("/generate/custom")
+async def generate_custom(request: CustomDraftRequest):
+    prompt = create_custom_draft_prompt(request.instruction, request.sector, request.scope, request.category)
+    return {"text": await asyncio.to_thread(draft, prompt, "generator:custom", request.model)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the DPDPA compliance engine over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,224 +3,394 @@ import openai
 import json
 import pandas as pd
 import re
-import fitz
 import io
 import datetime
-from docx import Document              
+import html
+import os
+from draft_export import DraftExporter
+from api_client import ComplianceServiceClient, ServiceError
+from result_cache import ResultCache
+from admin_settings import DEFAULT_SETTINGS, TASKS, SettingsStore
+from checklist_registry import ChecklistRegistry, configured_checklist_path, files_signature
+from evaluation_store import EvaluationStore
+from knowledge_index import SOURCES as KNOWLEDGE_SOURCES, KnowledgeIndex
+from gpt_scheduler import RequestScheduler
+from telemetry import Telemetry, llm_feature
+from xlsx_report import write_compliance_report
+from pdf_extract import ExtractedTextCache, PdfTooLargeError, TextMemo, extract_pdf_text, file_hash
+import prescreen
+import dpdpa_engine
+from dpdpa_engine import (
+    dpdpa_checklists, stream_gpt_text, analyze_policy_section,
+    analyze_sections_batched, analyze_sections_concurrently, combined_rows,
+    analyze_policy_section_incremental, reanalyze_sections_incrementally,
+    section_map, lifecycle_options, create_policy_generation_prompt,
+    create_section_draft_prompt, create_lifecycle_prompt, create_custom_draft_prompt,
+    policy_generation_parts, generate_policy_parts, assemble_policy,
+    answer_knowledge_question, compare_policies, comparison_rows, comparison_score_rows,
+    extract_text_from_bytes, unique_document_names
+)
 
 # --- OpenAI Setup ---
-api_key = st.secrets["OPENAI_API_KEY"]
-client = openai.OpenAI(api_key=api_key)
-
-# --- Section Checklists ---
-dpdpa_checklists = {
-    "4": {
-        "title": "Grounds for Processing Personal Data",
-        "items": [
-            {"id" : "4.1", "text" : "The policy must state that personal data is processed **only as per the provisions of the Digital Personal Data Protection Act, 2023**."},
-            {"id" : "4.2", "text" : "The policy must confirm that personal data is processed **only for a lawful purpose**."},
-            {"id" : "4.3", "text" : "The policy must define **lawful purpose** as any purpose **not expressly forbidden by law**."},
-            {"id" : "4.4", "text" : "The policy must include a statement that personal data is processed **only with the consent of the Data Principal**."},
-            {"id" : "4.5", "text" : "Alternatively, the policy must specify that personal data is processed **for certain legitimate uses**, as defined under the Act."}
-        ]
-    },
-    "5": {
-        "title": "Notice",
-        "items": [
-            {"id" : "5.1", "text" : "The policy must state that **every request for consent** is accompanied or preceded by a **notice from the Data Fiduciary to the Data Principal**."},
-            {"id" : "5.2", "text" : "The notice must clearly specify the **personal data proposed to be processed**."},
-            {"id" : "5.3", "text" : "The notice must clearly specify the **purpose for which the personal data is proposed to be processed**."},
-            {"id" : "5.4", "text" : "The notice must explain the **manner in which the Data Principal can exercise her rights under Section 6(4)** (withdrawal of consent)."},
-            {"id" : "5.5", "text" : "The notice must explain the **manner in which the Data Principal can exercise her rights under Section 13** (grievance redressal)."},
-            {"id" : "5.6", "text" : "The notice must specify the **manner in which a complaint can be made to the Data Protection Board**."},
-            {"id" : "5.7", "text" : "If consent was obtained **before the commencement of the Act**, the policy must state that a notice will be sent **as soon as reasonably practicable**."},
-            {"id" : "5.8", "text" : "The post-commencement notice must mention the **personal data that has been processed**."},
-            {"id" : "5.9", "text" : "The post-commencement notice must mention the **purpose for which the personal data has been processed**."},
-            {"id" : "5.10", "text" : "The post-commencement notice must mention the **manner in which the Data Principal can exercise her rights under Section 6(4)**."},
-            {"id" : "5.11", "text" : "The post-commencement notice must mention the **manner in which the Data Principal can exercise her rights under Section 13**."},
-            {"id" : "5.12", "text" : "The post-commencement notice must mention the **manner in which a complaint can be made to the Board**."},
-            {"id" : "5.13", "text" : "The policy must mention that the Data Fiduciary **may continue to process personal data** until the Data Principal **withdraws her consent**."},
-            {"id" : "5.14", "text" : "The policy must provide the Data Principal an **option to access the contents of the notice** in **English or any language listed in the Eighth Schedule of the Constitution**."}
-        ]
-    },
-    "6": {
-        "title": "Consent",
-        "items": [
-            {"id" : "6.1", "text" : "The policy must state that **consent is free, specific, informed, unconditional, and unambiguous**, given through a **clear affirmative action**."},
-            {"id" : "6.2", "text" : "The policy must specify that **consent signifies agreement to process personal data only for the specified purpose**."},
-            {"id" : "6.3", "text" : "The policy must state that **consent is limited to such personal data as is necessary for the specified purpose**."},
-            {"id" : "6.4", "text" : "The policy must mention that **any part of the consent that violates this Act, rules under it, or any other law in force is invalid to that extent**."},
-            {"id" : "6.5", "text" : "The request for consent must be presented in **clear and plain language**."},
-            {"id" : "6.6", "text" : "The request for consent must allow the Data Principal to access it in **English or any language listed in the Eighth Schedule of the Constitution**."},
-            {"id" : "6.7", "text" : "The request for consent must provide **contact details of a Data Protection Officer** or **another authorised person** responsible for handling Data Principal queries."},
-            {"id" : "6.8", "text" : "The policy must clearly state that the **Data Principal has the right to withdraw consent at any time**."},
-            {"id" : "6.9", "text" : "The **ease of withdrawing consent** must be comparable to the **ease with which consent was given**."},
-            {"id" : "6.10", "text" : "The policy must mention that **consequences of withdrawal shall be borne by the Data Principal**."},
-            {"id" : "6.11", "text" : "The policy must state that **withdrawal does not affect the legality of data processing done before withdrawal**."},
-            {"id" : "6.12", "text" : "The policy must mention that upon withdrawal of consent, the **Data Fiduciary and its Data Processors must cease processing** the personal data **within a reasonable time**, unless permitted by law."},
-            {"id" : "6.13", "text" : "The policy must state that consent **can be managed, reviewed, or withdrawn through a Consent Manager**."},
-            {"id" : "6.14", "text" : "The policy must specify that the **Consent Manager is accountable to the Data Principal** and acts on her behalf."},
-            {"id" : "6.15", "text" : "The policy must specify that **every Consent Manager is registered with the Board** under prescribed conditions."},
-            {"id" : "6.16", "text" : "The policy must mention that, in case of dispute, the **Data Fiduciary must prove that proper notice was given and valid consent was obtained** as per the Act and its rules."}
-        ]
-    },
-    "7": {
-        "title": "Certain Legitimate Uses",
-        "items": [
-            {"id" : "7.1", "text" : "The policy must allow personal data to be processed for the **specified purpose for which the Data Principal voluntarily provided the data**, if she has **not indicated non-consent** to such use."},
-            {"id" : "7.2", "text" : "The policy must permit personal data to be processed by the State or its instrumentalities for providing or issuing **subsidy, benefit, service, certificate, licence, or permit**, as prescribed, where the Data Principal has **previously consented** to such processing."},
-            {"id" : "7.3", "text" : "The policy must allow personal data to be processed by the State or its instrumentalities if the data is **already available in digital or digitised form in notified government databases**, subject to prescribed standards and government policies."},
-            {"id" : "7.4", "text" : "The policy must allow personal data to be processed by the State or its instrumentalities for performing any **legal function** under existing Indian laws or **in the interest of sovereignty and integrity of India or State security**."},
-            {"id" : "7.5", "text" : "The policy must allow personal data to be processed to **fulfil a legal obligation** requiring any person to disclose information to the State or its instrumentalities, as per applicable laws."},
-            {"id" : "7.6", "text" : "The policy must permit personal data to be processed for **compliance with any judgment, decree, or order** issued under Indian law, or for **contractual or civil claims under foreign laws**."},
-            {"id" : "7.7", "text" : "The policy must allow personal data to be processed to **respond to a medical emergency** involving a **threat to life or immediate health risk** of the Data Principal or any individual."},
-            {"id" : "7.8", "text" : "The policy must allow personal data to be processed to **provide medical treatment or health services** during an **epidemic, outbreak, or other threat to public health**."},
-            {"id" : "7.9", "text" : "The policy must permit processing of personal data to **ensure safety of or provide assistance/services to individuals** during any **disaster or breakdown of public order**."},
-            {"id" : "7.10", "text" : "The policy must define 'disaster' in accordance with the **Disaster Management Act, 2005 (Section 2(d))**."},
-            {"id" : "7.11", "text" : "The policy must allow personal data to be processed for purposes related to **employment**, or to **safeguard the employer from loss or liability**, including prevention of corporate espionage, confidentiality of trade secrets or IP, and enabling services/benefits to employee Data Principals."}
-        ]
-    },
-    "8": {
-        "title": "General Obligations of Data Fiduciary",
-        "items": [
-            {"id" : "8.1", "text" : "The policy must state that the Data Fiduciary is responsible for complying with the Act and its rules, even if the Data Principal fails to perform her duties."},
-            {"id" : "8.2", "text" : "The policy must state that the Data Fiduciary may engage or involve a Data Processor **only under a valid contract** to process personal data for offering goods or services."},
-            {"id" : "8.3", "text" : "The policy must ensure that if personal data is used to make a decision affecting the Data Principal, the data must be **complete, accurate, and consistent**."},
-            {"id" : "8.4", "text" : "The policy must ensure that if personal data is disclosed to another Data Fiduciary, the data must be **complete, accurate, and consistent**."},
-            {"id" : "8.5", "text" : "The policy must require the Data Fiduciary to implement **appropriate technical and organisational measures** to ensure compliance with the Act and its rules."},
-            {"id" : "8.6", "text" : "The policy must mandate **reasonable security safeguards** to protect personal data from breaches, including breaches by its Data Processors."},
-            {"id" : "8.7", "text" : "The policy must state that in the event of a **personal data breach**, the Data Fiduciary shall **inform both the Board and each affected Data Principal** in the prescribed manner."},
-            {"id" : "8.8", "text" : "The policy must mandate that personal data be **erased upon withdrawal of consent** or as soon as it is reasonable to assume that the **specified purpose is no longer being served**, whichever is earlier."},
-            {"id" : "8.9", "text" : "The policy must mandate that the Data Fiduciary must **cause its Data Processors to erase the data** when retention is no longer justified."},
-            {"id" : "8.10", "text" : "The policy must define that the specified purpose is deemed no longer served if the Data Principal has neither **approached the Data Fiduciary for the purpose** nor **exercised her rights** within the prescribed time period."},
-            {"id" : "8.11", "text" : "The policy must require publishing the **business contact details** of the Data Protection Officer (if applicable) or of an authorised person able to respond to questions about personal data processing."},
-            {"id" : "8.12", "text" : "The policy must provide an **effective grievance redressal mechanism** for Data Principals."},
-            {"id" : "8.13", "text" : "The policy must clarify that a Data Principal is considered as **not having approached** the Data Fiduciary if she has not initiated contact in person, or through physical or electronic communication, for the purpose within a prescribed period."}
-        ]
+@st.cache_resource
+def get_openai_client():
+    return openai.OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+
+# --- Admin Settings ---
+# Secrets provide the defaults; anything saved on the Admin Settings page overrides them.
+# The file is re-read whenever it changes, so new values apply on the next rerun.
+@st.cache_resource
+def get_settings_store():
+    defaults = dict(DEFAULT_SETTINGS)
+    secret_defaults = {
+        "max_concurrent_sections": "MAX_CONCURRENT_SECTIONS",
+        "cache_max_mb": "RESULT_CACHE_MAX_MB",
+        "cache_ttl_days": "RESULT_CACHE_TTL_DAYS",
+        "requests_per_minute": "OPENAI_REQUESTS_PER_MINUTE",
+        "tokens_per_minute": "OPENAI_TOKENS_PER_MINUTE",
+        "max_retries": "OPENAI_MAX_RETRIES",
+        "timeout_seconds": "OPENAI_TIMEOUT_SECONDS",
+        "daily_token_budget": "OPENAI_DAILY_TOKEN_BUDGET"
     }
-}
+    for key, secret in secret_defaults.items():
+        if secret in st.secrets:
+            defaults[key] = st.secrets[secret]
+    return SettingsStore(st.secrets.get("ADMIN_SETTINGS_PATH", "data/admin_settings.json"), defaults)
 
-# --- PDF Extractor ---
-def extract_text_from_pdf(pdf_file):
-    doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-    return "\n".join(page.get_text() for page in doc)
-
-# --- Prompt Generator ---
-def create_full_policy_prompt(section_id, full_policy_text, checklist):
-    checklist_text = "\n".join(
-        f"{item['id']}. {item['text']}" for item in checklist
+settings_store = get_settings_store()
+admin_settings = settings_store.load()
+
+# --- Result Cache ---
+RESULT_CACHE_PATH = st.secrets.get("RESULT_CACHE_PATH", ".cache/dpdpa_results.sqlite")
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(RESULT_CACHE_PATH)
+
+result_cache = get_result_cache()
+result_cache.resize(
+    max_bytes=admin_settings["cache_max_mb"] * 1024 * 1024,
+    max_age_seconds=admin_settings["cache_ttl_days"] * 24 * 3600
+)
+
+# --- Evaluation History ---
+# Every compliance check is kept here for the Dashboard & Reports page.
+@st.cache_resource
+def get_evaluation_store():
+    return EvaluationStore(st.secrets.get("EVALUATION_STORE_PATH", "data/dpdpa_evaluations.sqlite"))
+
+evaluation_store = get_evaluation_store()
+
+# --- Knowledge Index ---
+# Built offline by build_knowledge_index.py; keyed on the manifest's mtime so a rebuild is picked up.
+KNOWLEDGE_INDEX_PATH = st.secrets.get("KNOWLEDGE_INDEX_PATH", "data/knowledge_index")
+
+@st.cache_resource
+def get_knowledge_index(path, built_at):
+    return KnowledgeIndex(path)
+
+def load_knowledge_index():
+    manifest_path = os.path.join(KNOWLEDGE_INDEX_PATH, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        return get_knowledge_index(KNOWLEDGE_INDEX_PATH, os.path.getmtime(manifest_path))
+    except ValueError as e:
+        st.warning(str(e))
+        return None
+
+# --- Request Scheduling ---
+# One scheduler per server process so every session shares the same rate limits.
+@st.cache_resource
+def get_request_scheduler():
+    # The daily token budget is kept in the result cache, shared with the API and batch audits
+    return RequestScheduler(budget_store=get_result_cache())
+
+request_scheduler = get_request_scheduler()
+request_scheduler.update(
+    requests_per_minute=admin_settings["requests_per_minute"],
+    tokens_per_minute=admin_settings["tokens_per_minute"],
+    max_retries=admin_settings["max_retries"],
+    timeout=admin_settings["timeout_seconds"],
+    daily_token_budget=admin_settings["daily_token_budget"]
+)
+
+# --- LLM Telemetry ---
+# Every GPT call is logged as JSONL and exported as Prometheus metrics for a textfile collector.
+@st.cache_resource
+def get_telemetry():
+    return Telemetry(
+        log_path=st.secrets.get("TELEMETRY_LOG_PATH", "data/llm_calls.jsonl"),
+        metrics_path=st.secrets.get("TELEMETRY_METRICS_PATH", "data/metrics.prom")
     )
 
-    return f"""
-    You are a compliance analyst evaluating whether the following full privacy policy meets DPDPA Section {section_id}: {dpdpa_checklists[section_id]['title']}.
-    
-    **Checklist:** Use the item numbers (e.g., 4.1, 4.2...) from the checklist below in your response. Do not rephrase or modify the checklist items. Evaluate strictly based on the original items.
-    
-    {checklist_text}
-    
-    **Full Policy Text:**
-    {full_policy_text}
-    
-    Instructions:
-    For each checklist item, search anywhere in the policy and classify it as:
-    - Explicitly Mentioned
-    - Partially Mentioned
-    - Missing
-    
-    Return output in this JSON format only:
-    {{
-      "Checklist Evaluation": [
-        {{
-          "Checklist Item ID": "4.1",
-          "Status": "Explicitly Mentioned",
-          "Justification": "..."
-        }},
-        ...
-      ],
-      "Match Level": "Fully Compliant / Partially Compliant / Non-Compliant",
-      "Compliance Score": 0.0,
-      "Suggested Rewrite": "...",
-      "Simplified Legal Meaning": "..."
-    }}
-    
-    Only return the JSON object. Do not include any commentary or explanation.
+telemetry = get_telemetry()
+
+# --- Checklist Registry ---
+# Parsed once per process; keyed on the files' sizes and mtimes so an edited checklist is picked up.
+# Set DPDPA_CHECKLIST_PATH in the environment or secrets.toml (root-level secrets are exported to the environment).
+CHECKLIST_PATH = configured_checklist_path()
+
+@st.cache_resource
+def get_checklist_registry(path, signature):
+    return ChecklistRegistry.load(path)
+
+checklist_registry = get_checklist_registry(CHECKLIST_PATH, files_signature(CHECKLIST_PATH))
+
+dpdpa_engine.configure(
+    openai_client=get_openai_client(),
+    cache=result_cache,
+    max_concurrency=admin_settings["max_concurrent_sections"],
+    request_scheduler=request_scheduler,
+    models=admin_settings["models"],
+    temperatures=admin_settings["temperatures"],
+    call_telemetry=telemetry,
+    cascade_sections=admin_settings["cascade_sections"],
+    cascade_threshold=admin_settings["cascade_confidence_threshold"],
+    checklists=checklist_registry
+)
+
+# --- Compliance API ---
+# With COMPLIANCE_API_URL set, "All Sections" checks are queued on api_service.py instead of running here.
+COMPLIANCE_API_URL = st.secrets.get("COMPLIANCE_API_URL", "")
+COMPLIANCE_API_TIMEOUT = float(st.secrets.get("COMPLIANCE_API_TIMEOUT_SECONDS", 1800))
+service_client = ComplianceServiceClient(COMPLIANCE_API_URL) if COMPLIANCE_API_URL else None
+
+def service_section_results(section_ids, policy_text, use_cache=True, retrieval_top_k=None, prescreen=True,
+                            document="", organization=""):
+    """Yield section results from a compliance API job, finishing locally if the service fails.
+
+    The session records the run itself, so the job is submitted with
+    record=False. Any sections not received when the service errors, times
+    out or loses the job are evaluated in this process instead.
     """
-# --- GPT Call ---
-def call_gpt(prompt, model="gpt-4"):
-    response = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0
+    received = set()
+    try:
+        job = service_client.submit(
+            policy_text, section_ids, use_cache=use_cache, retrieval_top_k=retrieval_top_k,
+            prescreen=prescreen, document=document, organization=organization, record=False
+        )
+        st.caption(f"🛰️ Evaluating on the compliance service at {COMPLIANCE_API_URL} (job {job['id']})")
+        for result in service_client.iter_results(job["id"], timeout=COMPLIANCE_API_TIMEOUT):
+            received.add(result["Section"])
+            yield result
+        return
+    except (ServiceError, OSError, ValueError) as e:
+        # OSError covers connection failures (URLError) and TimeoutError
+        st.error(f"❌ Compliance service failed ({e}); evaluating the remaining sections here instead.")
+    remaining = [sid for sid in section_ids if sid not in received]
+    yield from analyze_sections_concurrently(
+        remaining, policy_text, use_cache=use_cache, retrieval_top_k=retrieval_top_k, prescreen=prescreen
     )
-    return json.loads(response.choices[0].message.content)
-    
-def call_gpt_text(prompt, model="gpt-4"):
-    response = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.5
+
+# --- PDF Extractor ---
+PDF_MAX_PAGES = int(st.secrets.get("PDF_MAX_PAGES", 500))
+PDF_MAX_BYTES = int(st.secrets.get("PDF_MAX_MB", 25)) * 1024 * 1024
+
+@st.cache_resource
+def get_extracted_text_cache():
+    return ExtractedTextCache(
+        st.secrets.get("PDF_TEXT_CACHE_DIR", ".cache/pdf_text"),
+        max_bytes=int(st.secrets.get("PDF_TEXT_CACHE_MAX_MB", 200)) * 1024 * 1024
     )
-    return response.choices[0].message.content.strip()
 
-def analyze_policy_section(section_id, checklist, policy_text, model="gpt-4"):
-    prompt = create_full_policy_prompt(section_id, policy_text, checklist)
-    
-    try:
-        result = call_gpt(prompt, model=model)
-    except Exception as e:
-        return {
-            "Section": section_id,
-            "Title": dpdpa_checklists[section_id]['title'],
-            "Error": str(e),
-            "Match Level": "Error",
-            "Compliance Score": 0.0,
-            "Matched Details": [],
-            "Checklist Items Matched": [],
-            "Suggested Rewrite": "",
-            "Simplified Legal Meaning": ""
-        }
+# Extracted texts expire with the evaluation results they feed
+get_extracted_text_cache().resize(max_age_seconds=admin_settings["cache_ttl_days"] * 24 * 3600)
 
-    checklist_dict = {item["id"]: item["text"] for item in checklist}
-    evaluations = []
+# In-memory memo in front of the disk cache so reruns never touch the PDF again.
+# Bounded by total characters so long-running servers don't grow without limit.
+@st.cache_resource
+def get_pdf_text_memo():
+    return TextMemo(max_chars=int(st.secrets.get("PDF_MEMO_MAX_MB", 50)) * 1024 * 1024)
 
-    matched_count = 0
-    partial_count = 0
+# Generated Word/TXT/JSON downloads, shared by every session and keyed by content
+@st.cache_resource
+def get_draft_exporter():
+    return DraftExporter(max_bytes=int(st.secrets.get("DRAFT_EXPORT_MAX_MB", 64)) * 1024 * 1024)
 
-    for item in result.get("Checklist Evaluation", []):
-        item_id = item.get("Checklist Item ID", "").strip()
-        status = item.get("Status", "Missing").strip()
-        justification = item.get("Justification", "").strip()
-        text = checklist_dict.get(item_id, "❓")
+def extract_text_from_pdf(pdf_file, progress=None):
+    data = pdf_file.getvalue() if hasattr(pdf_file, "getvalue") else pdf_file.read()
+    digest = file_hash(data)
+    memo = get_pdf_text_memo()
+    text = memo.get(digest)
+    if text is None:
+        text_cache = get_extracted_text_cache()
+        text = text_cache.get(digest)
+        if text is None:
+            text = extract_pdf_text(data, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_BYTES, progress=progress)
+            text_cache.set(digest, text)
+        memo.set(digest, text)
+    return text
 
-        if status == "Explicitly Mentioned":
-            matched_count += 1
-        elif status == "Partially Mentioned":
-            partial_count += 1
+def extract_uploaded_text(uploaded_file):
+    if uploaded_file.name.lower().endswith(".pdf"):
+        return extract_text_from_pdf(uploaded_file)
+    return extract_text_from_bytes(uploaded_file.name, uploaded_file.getvalue())
 
-        evaluations.append({
-            "Checklist Item ID": item_id,
-            "Checklist Text": text,
-            "Status": status,
-            "Justification": justification
-        })
+STATUS_COLORS = {
+    "Explicitly Mentioned": "#198754",
+    "Partially Mentioned": "#FFC107",
+    "Missing": "#DC3545",
+    "Error": "#6C757D"
+}
+
+def comparison_workbook(matrix, scores):
+    """The comparison as one Excel file: the item matrix sheet plus section scores."""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        matrix.to_excel(writer, sheet_name="Comparison", index=False)
+        scores.to_excel(writer, sheet_name="Section Scores", index=False)
+    return buffer.getvalue()
+
+def render_policy_comparison(comparison):
+    names, named_results = comparison["names"], comparison["results"]
+    st.markdown("## 🆚 Policy Comparison")
+    st.caption(f"Baseline: **{names[0]}**. Δ columns count status steps against it (+1 better, -1 worse).")
 
-    score = (matched_count + 0.5 * partial_count) / len(checklist) if checklist else 0
-    level = (
-        "Fully Compliant" if score == 1 else
-        "Non-Compliant" if score == 0 else
-        "Partially Compliant"
+    scores = pd.DataFrame(comparison_score_rows(named_results))
+    st.markdown("### Section Scores")
+    st.dataframe(scores, hide_index=True)
+
+    matrix = pd.DataFrame(comparison_rows(named_results))
+    only_differences = st.checkbox("Show only items whose status differs between documents", value=False)
+    shown = matrix[matrix["Differs"]] if only_differences else matrix
+    st.markdown(f"### Item-by-Item Matrix ({int(matrix['Differs'].sum())} of {len(matrix)} items differ)")
+    st.dataframe(
+        shown.drop(columns=["Checklist Text"]).style.map(
+            lambda status: f"background-color:{STATUS_COLORS[status]}; color:white" if status in STATUS_COLORS else "",
+            subset=names
+        ),
+        hide_index=True
     )
 
-    return {
-        "Section": section_id,
-        "Title": dpdpa_checklists[section_id]['title'],
-        "Match Level": result.get("Match Level", level),
-        "Compliance Score": round(score, 2),
-        "Matched Details": evaluations,
-        "Checklist Items Matched": [f"{e['Checklist Item ID']} — {e['Checklist Text']}" for e in evaluations if e["Status"] in ["Explicitly Mentioned", "Partially Mentioned"]],
-        "Suggested Rewrite": result.get("Suggested Rewrite", ""),
-        "Simplified Legal Meaning": result.get("Simplified Legal Meaning", "")
-    }
+    export_cols = st.columns(2)
+    with export_cols[0]:
+        st.download_button(
+            label="📥 Download Comparison CSV",
+            data=matrix.to_csv(index=False).encode("utf-8"),
+            file_name="DPDPA_Policy_Comparison.csv",
+            mime="text/csv"
+        )
+    with export_cols[1]:
+        st.download_button(
+            label="📥 Download Comparison Excel",
+            data=comparison_workbook(matrix, scores),
+            file_name="DPDPA_Policy_Comparison.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+def render_section_result(result):
+    with st.expander(f"Section {result['Section']} — {result['Title']}", expanded=True):
+        level_color = {
+            "Fully Compliant": "#198754",
+            "Partially Compliant": "#FFC107",
+            "Non-Compliant": "#DC3545"
+        }
+        match_level = result["Match Level"]
+        color = level_color.get(match_level, "#6C757D")
+
+        st.markdown(f"""
+        <div style="margin-bottom: 1rem;">
+          <b>Compliance Score:</b>
+          <span style="background-color:#0d6efd; color:white; padding:4px 10px; border-radius:5px; font-size:0.85rem;">
+            {html.escape(str(result["Compliance Score"]))}
+          </span><br>
+          <b>Match Level:</b>
+          <span style="background-color:{color}; color:black; padding:4px 10px; border-radius:5px; font-size:0.85rem;">
+            {html.escape(match_level)}
+          </span>
+        </div>
+        """, unsafe_allow_html=True)
+
+        if result.get("Error"):
+            st.error(f"❌ GPT Error: {result['Error']}")
+        if result.get("Pre-screened Items"):
+            st.caption(f"⚡ Resolved locally without GPT: {', '.join(result['Pre-screened Items'])}")
+        if "Escalated Items" in result:
+            st.caption(f"🪜 Cascade: escalated {', '.join(result['Escalated Items']) or 'no items'} to the evaluation model.")
+        if result.get("Policy Parts"):
+            st.caption(f"🧩 Long policy: evaluated in {result['Policy Parts']} overlapping parts and merged item by item.")
+        if "Re-evaluated Items" in result:
+            reevaluated = result["Re-evaluated Items"]
+            st.caption(f"🔁 Incremental re-check: re-evaluated {', '.join(reevaluated) or 'no items'}; reused {len(result['Matched Details']) - len(reevaluated)} earlier verdicts.")
+
+        st.markdown("### 📋 Checklist Items Matched:")
+        for item in result["Checklist Items Matched"]:
+            st.markdown(f"- {item}")
+
+        st.markdown("### 🔍 Matched Details:")
+        for item in result["Matched Details"]:
+            status = item.get("Status", "Missing")
+            badge_color = {
+                "Explicitly Mentioned": "#198754",
+                "Partially Mentioned": "#FFC107",
+                "Missing": "#DC3545"
+            }.get(status, "#6c757d")
+
+            # Justifications quote the uploaded policy verbatim, so every field is escaped before rendering as HTML
+            st.markdown(f"""
+            **{html.escape(str(item['Checklist Item ID']))} — {html.escape(str(item['Checklist Text']))}**  
+            <span style="color:white;background-color:{badge_color};padding:3px 10px;border-radius:6px;font-size:13px;">{html.escape(status)}</span>  
+            <br><small>📝 {html.escape(str(item.get("Justification", "No justification")))}</small>
+            """, unsafe_allow_html=True)
+
+        st.markdown("### ✏️ Suggested Rewrite:")
+        st.info(result["Suggested Rewrite"])
+
+        st.markdown("### 🧾 Simplified Legal Meaning:")
+        st.success(result["Simplified Legal Meaning"])
+
+def stream_draft(prompt, feature):
+    """Show GPT output token by token while it is generated and return the final text."""
+    placeholder = st.empty()
+    with placeholder.container(), llm_feature(feature):
+        text = st.write_stream(stream_gpt_text(prompt))
+    # The editor below takes over displaying the finished draft
+    placeholder.empty()
+    return text.strip()
+
+def draft_download_buttons(columns, key, title, text, file_stem, json_file_stem, json_data):
+    """Word, TXT and JSON downloads of a draft in three columns.
+
+    The files are passed as callables, so nothing is built until a button is
+    clicked, and the exporter returns the same bytes for unchanged content.
+    """
+    exporter = get_draft_exporter()
+    downloads = [
+        ("📄 Download Word File", lambda: exporter.docx(title, text), f"{file_stem}.docx",
+         "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+        ("📄 Download TXT File", lambda: exporter.txt(text), f"{file_stem}.txt", "text/plain"),
+        ("📁 Download JSON Draft", lambda: exporter.json(json_data), f"{json_file_stem}.json", "application/json")
+    ]
+    for column, (label, data, file_name, mime) in zip(columns, downloads):
+        with column:
+            st.download_button(
+                label=label, data=data, file_name=file_name, mime=mime,
+                key=f"download_{key}_{file_name.rsplit('.', 1)[1]}", on_click="ignore"
+            )
+
+def generate_policy_in_parts(details, parts, all_parts):
+    """Draft ``parts`` in parallel, reporting each as it lands, and reassemble the full draft."""
+    texts = st.session_state.setdefault("full_policy_part_texts", {})
+    failed = []
+    with st.status(f"Generating {len(parts)} policy sections in parallel...", expanded=True) as status:
+        for part, text, error in generate_policy_parts(details, parts, all_parts=all_parts):
+            if error is None:
+                texts[part["key"]] = text
+                st.write(f"✅ {part['heading']}")
+            else:
+                failed.append(part["key"])
+                st.write(f"❌ {part['heading']}: {error}")
+        status.update(
+            label=f"{len(failed)} of {len(parts)} sections failed" if failed else "All sections generated",
+            state="error" if failed else "complete",
+            expanded=bool(failed)
+        )
+    st.session_state["full_policy_failed"] = failed
+    st.session_state["full_policy_draft"] = assemble_policy(all_parts, texts)
+    st.session_state["full_policy_generated_at"] = str(datetime.datetime.now())
+    if not failed:
+        st.success("✅ DPDPA-compliant draft generated successfully!")
 
 def set_custom_css():
     st.markdown("""
@@ -365,6 +535,28 @@ menu = st.sidebar.radio("", [
     "Knowledge Assistant",
     "Admin Settings"
 ])
+
+@st.fragment(run_every=10)
+def llm_usage_panel():
+    """Live per-feature token and latency totals for this server process."""
+    usage = pd.DataFrame(telemetry.summary())
+    with st.expander("📊 LLM Usage", expanded=False):
+        if usage.empty:
+            st.caption("No GPT calls yet.")
+            return
+        by_feature = usage.groupby("feature", as_index=False)[["calls", "cache_hits", "prompt_tokens", "completion_tokens"]].sum()
+        st.metric("Tokens since server start", f"{int(by_feature['prompt_tokens'].sum() + by_feature['completion_tokens'].sum()):,}")
+        st.dataframe(by_feature, hide_index=True)
+        recent = pd.DataFrame(telemetry.recent(10))
+        st.caption("Latest calls")
+        st.dataframe(recent[["feature", "model", "total_tokens", "latency_ms", "retries", "status"]], hide_index=True)
+        escalations = pd.DataFrame(telemetry.escalation_summary())
+        if not escalations.empty:
+            st.caption(f"Cascade escalation rate: {escalations['escalated'].sum() / max(1, escalations['items'].sum()):.0%}")
+            st.dataframe(escalations, hide_index=True)
+
+with st.sidebar:
+    llm_usage_panel()
 st.sidebar.markdown("<br><br><br><br><br><br><br><br><br><br><br><br><br><br>", unsafe_allow_html=True)
 st.sidebar.markdown("""
     <div style='padding: 0px 12px 0px 0px;'>
@@ -448,6 +640,14 @@ elif menu == "Policy Generator":
             st.markdown("**Grievance Officer Contact Email***  \n_As per Section 10, provide a contact for complaints or data requests._")
             grievance_email = st.text_input(" ", key="grievance_email")
 
+        generation_mode = st.radio(
+            "Generation mode",
+            ["Single draft", "Section-by-section (parallel)"],
+            horizontal=True,
+            key="generation_mode",
+            help="Section-by-section drafts each DPDPA section and lifecycle stage concurrently and assembles them, so long policies are not limited by one response."
+        )
+
         # --- Generate Button ---
         if st.button("Generate DPDPA-Compliant Policy with GPT"):
             errors = []
@@ -473,50 +673,46 @@ elif menu == "Policy Generator":
                 data_types_final = data_types_common + [dt.strip() for dt in data_types_custom.split(",") if dt.strip()]
                 special_uses = ", ".join(legitimate_use) if legitimate_use else "None"
     
-                with st.spinner("Generating policy... please wait."):
-                    prompt = f"""
-    You are a legal policy assistant. Draft a comprehensive, DPDPA-compliant {policy_type.lower()} for the following organization.
-    
-    **Organization Details**:
-    - Name: {org_name}
-    - Sector: {sector_final}
-    
-    **Data Handling**:
-    - Data Types Collected: {", ".join(data_types_final)}
-    - Applicable to Children (<18): {children_data}
-    - Shared Internationally: {cross_border}
-    
-    **Legal Basis**:
-    - Lawful Purpose: {lawful_purpose}
-    - Consent Type: {consent_type}
-    - Special Use Cases (Sec 7): {special_uses}
-    
-    **Retention & Redressal**:
-    - Retention Period: {retention_period}
-    - Grievance Contact: {grievance_email}
-    
-    **Compliance Requirements**:
-    Ensure the policy covers all obligations under the Digital Personal Data Protection Act, 2023 (India), including:
-    - Lawful purpose (Sec 4)
-    - Informed consent (Sec 6)
-    - Notice obligations (Sec 5)
-    - Grievance handling (Sec 10)
-    - Data accuracy (Sec 8.3)
-    - Security safeguards (Sec 8.5)
-    - Erasure after purpose is fulfilled or consent withdrawn (Sec 8.7)
-    - Special clauses for children (Sec 9) if applicable
-    - International transfer declaration (Sec 16)
-    
-    Write the policy in clear, professional English with practical sections like: Purpose, Scope, Data Types, Lawful Use, Consent, Security, Retention, Rights, Grievance Redressal, Contact.
-    
-    Return only the policy draft (no disclaimers or titles).
-                    """
-                    try:
-                        draft = call_gpt_text(prompt)
-                        st.session_state["full_policy_draft"] = draft
-                        st.success("✅ DPDPA-compliant draft generated successfully!")
-                    except Exception as e:
-                        st.error(f"❌ GPT Error: {e}")
+                details = {
+                    "policy_type": policy_type,
+                    "org_name": org_name,
+                    "sector": sector_final,
+                    "data_types": data_types_final,
+                    "children_data": children_data,
+                    "cross_border": cross_border,
+                    "lawful_purpose": lawful_purpose,
+                    "consent_type": consent_type,
+                    "special_uses": special_uses,
+                    "retention_period": retention_period,
+                    "grievance_email": grievance_email
+                }
+
+                if generation_mode == "Single draft":
+                    st.session_state.pop("full_policy_failed", None)
+                    with st.spinner("Generating policy... please wait."):
+                        prompt = create_policy_generation_prompt(details)
+                        try:
+                            draft = stream_draft(prompt, "generator:full-policy")
+                            st.session_state["full_policy_draft"] = draft
+                            st.session_state["full_policy_generated_at"] = str(datetime.datetime.now())
+                            st.success("✅ DPDPA-compliant draft generated successfully!")
+                        except Exception as e:
+                            st.error(f"❌ GPT Error: {e}")
+                else:
+                    parts = policy_generation_parts(include_children=children_data == "Yes")
+                    st.session_state["full_policy_details"] = details
+                    st.session_state["full_policy_parts"] = parts
+                    st.session_state["full_policy_part_texts"] = {}
+                    generate_policy_in_parts(details, parts, parts)
+
+        # --- Regenerate Failed Sections ---
+        if st.session_state.get("full_policy_failed"):
+            failed_keys = st.session_state["full_policy_failed"]
+            all_parts = st.session_state["full_policy_parts"]
+            st.warning(f"{len(failed_keys)} section(s) failed to generate and are missing from the draft.")
+            if st.button("🔁 Regenerate Failed Sections"):
+                failed_parts = [part for part in all_parts if part["key"] in failed_keys]
+                generate_policy_in_parts(st.session_state["full_policy_details"], failed_parts, all_parts)
     
         # --- Output Editor ---
         if "full_policy_draft" in st.session_state:
@@ -532,48 +728,18 @@ elif menu == "Policy Generator":
                     st.session_state["saved_full_policy"] = edited
                     st.success("Draft saved temporarily in session.")
             
-            # --- Export to .docx ---
-            with col2:
-                if st.button("⬇️ Export to Word (.docx)"):
-                    doc = Document()
-                    doc.add_heading(f"{policy_type} - Generated Policy", level=1)
-                    for para in edited.split("\n"):
-                        doc.add_paragraph(para)
-                    buffer = io.BytesIO()
-                    doc.save(buffer)
-                    buffer.seek(0)
-                    st.download_button(
-                        label="📄 Download Word File",
-                        data=buffer,
-                        file_name=f"{org_name.replace(' ', '_')}_DPDPA_policy.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-            
-            # --- Export to .txt ---
-            with col3:
-                if st.button("⬇️ Export to TXT"):
-                    st.download_button(
-                        label="📄 Download TXT File",
-                        data=edited,
-                        file_name=f"{org_name.replace(' ', '_')}_DPDPA_policy.txt",
-                        mime="text/plain"
-                    )
-            
-            # --- Save Draft to JSON ---
-            with col4:
-                if st.button("💾 Save to File (.json)"):
-                    draft_data = {
-                        "policy": edited,
-                        "timestamp": str(datetime.datetime.now()),
-                        "org_name": org_name,
-                        "policy_type": policy_type
-                    }
-                    st.download_button(
-                        label="📁 Download Draft as JSON",
-                        data=json.dumps(draft_data, indent=2),
-                        file_name=f"{org_name.replace(' ', '_')}_DPDPA_draft.json",
-                        mime="application/json"
-                    )
+            # --- Word, TXT and JSON Downloads ---
+            draft_download_buttons(
+                [col2, col3, col4], "full_policy", f"{policy_type} - Generated Policy", edited,
+                f"{org_name.replace(' ', '_')}_DPDPA_policy", f"{org_name.replace(' ', '_')}_DPDPA_draft",
+                {
+                    "policy": edited,
+                    # Generation time, not render time, so the memoised export survives reruns
+                    "timestamp": st.session_state.get("full_policy_generated_at", ""),
+                    "org_name": org_name,
+                    "policy_type": policy_type
+                }
+            )
 
     with tab2:
         with tab2:
@@ -581,15 +747,6 @@ elif menu == "Policy Generator":
             st.caption("Use this tool to draft a single section aligned with a DPDPA requirement.")
         
             # --- Section Selection ---
-            section_map = {
-                "Section 4 — Grounds for Processing Personal Data": "4",
-                "Section 5 — Notice to Data Principal": "5",
-                "Section 6 — Consent & Withdrawal": "6",
-                "Section 7 — Legitimate Use Cases": "7",
-                "Section 8 — Accuracy, Retention & Security": "8",
-                "Section 9 — Processing Children's Data": "9",
-                "Section 10 — Grievance Redressal": "10"
-            }
         
             st.markdown("**Select DPDPA Section***")
             section_label = st.selectbox("", list(section_map.keys()))
@@ -611,22 +768,11 @@ elif menu == "Policy Generator":
                     st.warning("Please describe what you want GPT to generate.")
                 else:
                     with st.spinner("Generating policy section..."):
-                        section_prompt = f"""
-        You are a legal assistant drafting a policy section aligned with India's Digital Personal Data Protection Act (DPDPA), 2023.
-        
-        Draft a clear, compliant, and standalone section for:
-        
-        **DPDPA Section {section_id} – {section_label.split('—')[-1].strip()}**
-        
-        Instruction from user: "{custom_instruction.strip()}"
-        
-        {f'Context: {org_context.strip()}' if org_context.strip() else ''}
-        
-        Write in plain legal English. Make it usable as-is inside a larger privacy policy.
-        Return only the section text. Do not include headings or disclaimers.
-                        """
+                        section_prompt = create_section_draft_prompt(
+                            section_id, dpdpa_checklists[section_id]['title'], custom_instruction, org_context
+                        )
                         try:
-                            section_output = call_gpt_text(section_prompt)
+                            section_output = stream_draft(section_prompt, "generator:section")
                             st.session_state["section_output"] = section_output
                             st.success("✅ Section draft generated successfully!")
                         except Exception as e:
@@ -645,58 +791,23 @@ elif menu == "Policy Generator":
                         st.session_state["saved_section"] = edited_section
                         st.success("Section saved temporarily in session.")
         
-                with col2:
-                    if st.button("⬇️ Export as Word", key="export_section_docx"):
-                        doc = Document()
-                        doc.add_heading(section_label, level=1)
-                        for para in edited_section.split("\n"):
-                            doc.add_paragraph(para)
-                        buffer = io.BytesIO()
-                        doc.save(buffer)
-                        buffer.seek(0)
-                        st.download_button(
-                            label="📄 Download Word File",
-                            data=buffer,
-                            file_name=f"DPDPA_Section_{section_id}.docx",
-                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                        )
-        
-                with col3:
-                    if st.button("⬇️ Export as TXT", key="export_section_txt"):
-                        st.download_button(
-                            label="📄 Download TXT File",
-                            data=edited_section,
-                            file_name=f"DPDPA_Section_{section_id}.txt",
-                            mime="text/plain"
-                        )
-        
-                with col4:
-                    if st.button("💾 Save to File (JSON)", key="export_section_json"):
-                        section_data = {
-                            "section": section_id,
-                            "title": section_label,
-                            "content": edited_section,
-                            "user_instruction": custom_instruction,
-                            "org_context": org_context
-                        }
-                        st.download_button(
-                            label="📁 Download JSON Draft",
-                            data=json.dumps(section_data, indent=2),
-                            file_name=f"DPDPA_Section_{section_id}_Draft.json",
-                            mime="application/json"
-                        )
+                draft_download_buttons(
+                    [col2, col3, col4], "section", section_label, edited_section,
+                    f"DPDPA_Section_{section_id}", f"DPDPA_Section_{section_id}_Draft",
+                    {
+                        "section": section_id,
+                        "title": section_label,
+                        "content": edited_section,
+                        "user_instruction": custom_instruction,
+                        "org_context": org_context
+                    }
+                )
 
     with tab3:
         st.markdown("### Generate Policy by Data Lifecycle Stage")
         st.caption("Use this to generate a specific part of your privacy or retention policy aligned with how data is collected, processed, stored, or shared.")
     
         # --- Lifecycle Options ---
-        lifecycle_options = {
-            "Data Collection": "Describe what data is collected, from whom, how, and with what consent.",
-            "Data Processing": "Explain the purpose and method of processing the data, along with any automation or profiling.",
-            "Data Storage": "Detail where data is stored, for how long, and the technical and organizational safeguards.",
-            "Data Sharing": "Outline what data is shared, with whom (internal or third party), and under what agreements."
-        }
     
         st.markdown("#### Select Lifecycle Stage")
         lifecycle_stage = st.selectbox("", list(lifecycle_options.keys()))
@@ -718,18 +829,9 @@ elif menu == "Policy Generator":
                 st.warning("Please enter or confirm the prompt.")
             else:
                 with st.spinner("Generating section..."):
-                    lifecycle_prompt_text = f"""
-    You are a policy assistant generating a data privacy policy section for a specific lifecycle stage.
-    
-    **Lifecycle Stage**: {lifecycle_stage}
-    **Instruction**: {lifecycle_prompt.strip()}
-    {f"Context: {lifecycle_context.strip()}" if lifecycle_context.strip() else ''}
-    
-    The section should be written in professional, legally sound English and suitable for direct inclusion in a privacy or retention policy. Keep it DPDPA-aligned where applicable.
-    Only output the draft content, no explanations or headings.
-                    """
+                    lifecycle_prompt_text = create_lifecycle_prompt(lifecycle_stage, lifecycle_prompt, lifecycle_context)
                     try:
-                        lifecycle_output = call_gpt_text(lifecycle_prompt_text)
+                        lifecycle_output = stream_draft(lifecycle_prompt_text, "generator:lifecycle")
                         st.session_state["lifecycle_output"] = lifecycle_output
                         st.success("✅ Section generated successfully!")
                     except Exception as e:
@@ -748,45 +850,16 @@ elif menu == "Policy Generator":
                     st.session_state["saved_lifecycle"] = edited_lifecycle
                     st.success("Saved in session.")
     
-            with col2:
-                if st.button("⬇️ Export as Word", key="export_lifecycle_docx"):
-                    doc = Document()
-                    doc.add_heading(f"{lifecycle_stage} Policy", level=1)
-                    for para in edited_lifecycle.split("\n"):
-                        doc.add_paragraph(para)
-                    buffer = io.BytesIO()
-                    doc.save(buffer)
-                    buffer.seek(0)
-                    st.download_button(
-                        label="📄 Download Word File",
-                        data=buffer,
-                        file_name=f"{lifecycle_stage.replace(' ', '_')}_Policy.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-    
-            with col3:
-                if st.button("⬇️ Export as TXT", key="export_lifecycle_txt"):
-                    st.download_button(
-                        label="📄 Download TXT File",
-                        data=edited_lifecycle,
-                        file_name=f"{lifecycle_stage.replace(' ', '_')}_Policy.txt",
-                        mime="text/plain"
-                    )
-    
-            with col4:
-                if st.button("💾 Save as JSON", key="export_lifecycle_json"):
-                    lifecycle_data = {
-                        "stage": lifecycle_stage,
-                        "prompt": lifecycle_prompt,
-                        "context": lifecycle_context,
-                        "content": edited_lifecycle
-                    }
-                    st.download_button(
-                        label="📁 Download JSON Draft",
-                        data=json.dumps(lifecycle_data, indent=2),
-                        file_name=f"{lifecycle_stage.replace(' ', '_')}_Draft.json",
-                        mime="application/json"
-                    )
+            draft_download_buttons(
+                [col2, col3, col4], "lifecycle", f"{lifecycle_stage} Policy", edited_lifecycle,
+                f"{lifecycle_stage.replace(' ', '_')}_Policy", f"{lifecycle_stage.replace(' ', '_')}_Draft",
+                {
+                    "stage": lifecycle_stage,
+                    "prompt": lifecycle_prompt,
+                    "context": lifecycle_context,
+                    "content": edited_lifecycle
+                }
+            )
 
 
     with tab4:
@@ -814,19 +887,9 @@ elif menu == "Policy Generator":
                 st.warning("Please enter a prompt.")
             else:
                 with st.spinner("Generating your draft..."):
-                    prompt_draft_text = f"""
-    You are a policy assistant helping a user draft a professional snippet of policy language.
-    
-    Instruction: {free_prompt.strip()}
-    
-    {f"Sector: {sector_tag}" if sector_tag else ''}
-    {f"Scope: {scope_tag}" if scope_tag else ''}
-    {f"Data Category: {category_tag}" if category_tag else ''}
-    
-    Write in clear, professional policy language. Avoid filler text, disclaimers, or general advice. Return only the content of the policy.
-                    """
+                    prompt_draft_text = create_custom_draft_prompt(free_prompt, sector_tag, scope_tag, category_tag)
                     try:
-                        gpt_draft_output = call_gpt_text(prompt_draft_text)
+                        gpt_draft_output = stream_draft(prompt_draft_text, "generator:custom")
                         st.session_state["gpt_draft_output"] = gpt_draft_output
                         st.success("✅ Draft generated!")
                     except Exception as e:
@@ -845,46 +908,17 @@ elif menu == "Policy Generator":
                     st.session_state["saved_gpt_draft"] = edited_gpt_draft
                     st.success("Saved in session.")
     
-            with col2:
-                if st.button("⬇️ Export as Word", key="export_gpt_draft_docx"):
-                    doc = Document()
-                    doc.add_heading("Custom Policy Draft", level=1)
-                    for para in edited_gpt_draft.split("\n"):
-                        doc.add_paragraph(para)
-                    buffer = io.BytesIO()
-                    doc.save(buffer)
-                    buffer.seek(0)
-                    st.download_button(
-                        label="📄 Download Word File",
-                        data=buffer,
-                        file_name=f"Custom_Policy_Draft.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-    
-            with col3:
-                if st.button("⬇️ Export as TXT", key="export_gpt_draft_txt"):
-                    st.download_button(
-                        label="📄 Download TXT File",
-                        data=edited_gpt_draft,
-                        file_name=f"Custom_Policy_Draft.txt",
-                        mime="text/plain"
-                    )
-    
-            with col4:
-                if st.button("💾 Save as JSON", key="export_gpt_draft_json"):
-                    gpt_draft_data = {
-                        "prompt": free_prompt,
-                        "sector": sector_tag,
-                        "scope": scope_tag,
-                        "category": category_tag,
-                        "content": edited_gpt_draft
-                    }
-                    st.download_button(
-                        label="📁 Download JSON Draft",
-                        data=json.dumps(gpt_draft_data, indent=2),
-                        file_name="Custom_Policy_Draft.json",
-                        mime="application/json"
-                    )
+            draft_download_buttons(
+                [col2, col3, col4], "gpt_draft", "Custom Policy Draft", edited_gpt_draft,
+                "Custom_Policy_Draft", "Custom_Policy_Draft",
+                {
+                    "prompt": free_prompt,
+                    "sector": sector_tag,
+                    "scope": scope_tag,
+                    "category": category_tag,
+                    "content": edited_gpt_draft
+                }
+            )
 
 
     with tab5:
@@ -931,42 +965,12 @@ elif menu == "Policy Generator":
                         del st.session_state[f"saved_{selected.replace(' ', '_').lower()}"]
                     st.success("✅ Draft renamed successfully. Refresh the dropdown to see updated name.")
     
-            # --- Export .docx ---
-            with col2:
-                if st.button("⬇️ Export as Word (.docx)", key="export_word_saved"):
-                    doc = Document()
-                    doc.add_heading(f"{selected} Draft", level=1)
-                    for para in edited_draft.split("\n"):
-                        doc.add_paragraph(para)
-                    buffer = io.BytesIO()
-                    doc.save(buffer)
-                    buffer.seek(0)
-                    st.download_button(
-                        label="📄 Download Word File",
-                        data=buffer,
-                        file_name=f"{selected.replace(' ', '_')}.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
-    
-            # --- Export .txt ---
-            with col3:
-                if st.button("⬇️ Export as TXT", key="export_txt_saved"):
-                    st.download_button(
-                        label="📄 Download TXT File",
-                        data=edited_draft,
-                        file_name=f"{selected.replace(' ', '_')}.txt",
-                        mime="text/plain"
-                    )
-    
-            # --- Export .json ---
-            with col4:
-                if st.button("💾 Download JSON", key="export_json_saved"):
-                    st.download_button(
-                        label="📁 Download JSON File",
-                        data=json.dumps({"name": selected, "content": edited_draft}, indent=2),
-                        file_name=f"{selected.replace(' ', '_')}.json",
-                        mime="application/json"
-                    )
+            # --- Word, TXT and JSON Downloads ---
+            draft_download_buttons(
+                [col2, col3, col4], "saved", f"{selected} Draft", edited_draft,
+                selected.replace(' ', '_'), selected.replace(' ', '_'),
+                {"name": selected, "content": edited_draft}
+            )
     
             # --- Delete from session ---
             if st.button("🗑️ Delete Draft", key="delete_draft_btn"):
@@ -985,8 +989,25 @@ elif menu == "Policy Compliance Checker":
     #st.header("1. Upload Your Policy Document")
     st.markdown("<h3 style='font-size:24px; font-weight:700;'>1. Upload Your Policy Document</h3>", unsafe_allow_html=True)
 
-    upload_option = st.radio("Choose input method:", ["Paste text", "Upload PDF"])
-    if upload_option == "Paste text":
+    upload_option = st.radio("Choose input method:", ["Paste text", "Upload PDF", "Compare documents"])
+    document_name = "Pasted text"
+    compare_mode = upload_option == "Compare documents"
+    compare_documents = []
+    if compare_mode:
+        policy_text = ""
+        uploaded_files = st.file_uploader(
+            "Upload two or more policies (versions or entities) to evaluate side by side",
+            type=["pdf", "txt", "docx"],
+            accept_multiple_files=True
+        )
+        for name, uploaded_file in zip(unique_document_names([f.name for f in uploaded_files or []]), uploaded_files or []):
+            try:
+                compare_documents.append((name, extract_uploaded_text(uploaded_file)))
+            except (PdfTooLargeError, ValueError) as e:
+                st.error(f"❌ {name}: {e}")
+        if compare_documents:
+            st.caption("📄 " + " · ".join(f"{name} ({len(text):,} chars)" for name, text in compare_documents))
+    elif upload_option == "Paste text":
         policy_text = st.text_area("Paste your Privacy Policy text:", height=300)
     elif upload_option == "Upload PDF":
         uploaded_pdf = st.file_uploader("Upload PDF file", type="pdf", label_visibility="collapsed")
@@ -999,13 +1020,25 @@ elif menu == "Policy Compliance Checker":
             📄 Uploaded file: {uploaded_pdf.name}
             </div>
             """, unsafe_allow_html=True)
+            document_name = uploaded_pdf.name
 
-            policy_text = extract_text_from_pdf(uploaded_pdf)
+            # Only drawn when the PDF actually has to be parsed (memo and disk cache misses)
+            progress_slot = st.empty()
+            try:
+                policy_text = extract_text_from_pdf(
+                    uploaded_pdf,
+                    progress=lambda done, total: progress_slot.progress(done / total, text=f"Extracting page {done} of {total}...")
+                )
+            except PdfTooLargeError as e:
+                st.error(f"❌ {e}")
+                policy_text = ""
+            progress_slot.empty()
         else:
             policy_text = ""
 
     #st.header("4. Industry Context (Optional)")
     st.markdown("<h3 style='font-size:24px; font-weight:700;'>2. Industry Context (Optional)</h3>", unsafe_allow_html=True)
+    organization = st.text_input("Organization name", help="Groups this check with earlier ones on the Dashboard & Reports page.")
     industry = st.selectbox("", ["General", "Automotive", "Healthcare", "Fintech", "Other"])
     if industry == "Other":
         custom_industry = st.text_input("Specify your industry")
@@ -1016,67 +1049,108 @@ elif menu == "Policy Compliance Checker":
     # section_options = list(dpdpa_checklists.keys()) + ["All Sections"]
     section_options = [f"{sid} — {dpdpa_checklists[sid]['title']}" for sid in dpdpa_checklists] + ["All Sections"]
     section_id = st.selectbox("", options=section_options)
+    st.caption(f"Checklist: {checklist_registry.version} · {len(checklist_registry.items)} items · {checklist_registry.fingerprint}")
+    batched_mode = False
+    if section_id == "All Sections" and not compare_mode:
+        batched_mode = st.checkbox(
+            "Batched mode: send the policy once for several sections",
+            help="Combines section checklists into as few GPT requests as the model's context window allows."
+        )
 
     st.markdown("<h3 style='font-size:24px; font-weight:700;'>4. Run Compliance Check</h3>", unsafe_allow_html=True)
+    retrieval_mode = st.checkbox(
+        "Send only the most relevant policy passages to GPT",
+        disabled=batched_mode,
+        help="Ranks policy paragraphs against each checklist item (BM25) and sends only the top matches with their character offsets. Recommended for very long policies."
+    )
+    retrieval_top_k = None
+    if retrieval_mode and not batched_mode:
+        retrieval_top_k = int(st.number_input("Passages per checklist item", min_value=1, max_value=10, value=3))
+    use_cache = st.checkbox("Reuse cached results for unchanged policies", value=True)
+    use_prescreen = st.checkbox(
+        "Pre-screen obvious checklist items locally",
+        value=True,
+        help="Keyword and pattern rules confirm or rule out clear-cut items (e.g. the Act is never mentioned, DPO contact details are present) so only ambiguous items are sent to GPT."
+    )
+    # Last evaluated text and result per section, used to re-check only what an edit touched
+    baselines = st.session_state.setdefault("evaluation_baseline", {})
+    incremental_mode = False
+    if baselines and not batched_mode and not compare_mode:
+        incremental_mode = st.checkbox(
+            "Incremental re-check: only re-evaluate checklist items affected by edits since the last run",
+            value=True
+        )
+    cache_stats = result_cache.stats()
+    st.caption(f"Result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses · {cache_stats['entries']} stored evaluations")
+    prescreen_stats = prescreen.stats.snapshot()
+    st.caption(f"Pre-screen: {prescreen_stats['items_resolved']} of {prescreen_stats['items']} items resolved locally · {prescreen_stats['calls_saved']} GPT calls saved")
     if st.button("Run Compliance Check"):
-        if policy_text:
+        if compare_mode:
+            if len(compare_documents) < 2:
+                st.warning("Upload at least two policies to compare.")
+            else:
+                compare_sections = list(dpdpa_checklists) if section_id == "All Sections" else [section_id.split(" — ")[0]]
+                named_results = {}
+                with st.status(f"Evaluating {len(compare_documents)} policies in parallel...", expanded=True) as status:
+                    texts = dict(compare_documents)
+                    for names, results in compare_policies(
+                        compare_documents, compare_sections,
+                        use_cache=use_cache, retrieval_top_k=retrieval_top_k, prescreen=use_prescreen
+                    ):
+                        for name in names:
+                            named_results[name] = results
+                            evaluation_store.record_run(
+                                results, policy_text=texts[name], organization=organization,
+                                industry=custom_industry or industry, document=name, source="comparison"
+                            )
+                        shared = f" (identical text: {', '.join(names)})" if len(names) > 1 else ""
+                        st.write(f"✅ {names[0]}{shared}")
+                    status.update(label=f"Evaluated {len(compare_documents)} policies", state="complete")
+                names = [name for name, _ in compare_documents]
+                st.session_state["policy_comparison"] = {
+                    "names": names,
+                    "results": {name: named_results[name] for name in names}
+                }
+        elif policy_text:
             result = []
             with st.spinner("Running GPT-based compliance evaluation..."):
                 if section_id == "All Sections":
                     all_results = []  # 🔁 collect each section's result
+                    section_order = list(dpdpa_checklists)
 
-                    for sid in dpdpa_checklists:
-                        st.markdown(f"## ✅ Processing Section {sid} — {dpdpa_checklists[sid]['title']}")
-                        checklist = dpdpa_checklists[sid]["items"]
-                        result = analyze_policy_section(sid, checklist, policy_text)
+                    # One slot per section so results appear in section order as they finish
+                    slots = {}
+                    for sid in section_order:
+                        slots[sid] = st.empty()
+                        slots[sid].markdown(f"## ⏳ Processing Section {sid} — {dpdpa_checklists[sid]['title']}")
+
+                    if batched_mode:
+                        section_results = analyze_sections_batched(section_order, policy_text, use_cache=use_cache, prescreen=use_prescreen)
+                    elif incremental_mode:
+                        section_results = reanalyze_sections_incrementally(
+                            section_order, policy_text, baselines,
+                            use_cache=use_cache, retrieval_top_k=retrieval_top_k, prescreen=use_prescreen
+                        )
+                    elif service_client is not None:
+                        section_results = service_section_results(
+                            section_order, policy_text, use_cache=use_cache, retrieval_top_k=retrieval_top_k,
+                            prescreen=use_prescreen, document=document_name, organization=organization
+                        )
+                    else:
+                        section_results = analyze_sections_concurrently(section_order, policy_text, use_cache=use_cache, retrieval_top_k=retrieval_top_k, prescreen=use_prescreen)
+                    for result in section_results:
                         all_results.append(result)
-            
-                        with st.expander(f"Section {result['Section']} — {result['Title']}", expanded=True):
-                            level_color = {
-                                "Fully Compliant": "#198754",
-                                "Partially Compliant": "#FFC107",
-                                "Non-Compliant": "#DC3545"
-                            }
-                            match_level = result["Match Level"]
-                            color = level_color.get(match_level, "#6C757D")
-            
-                            st.markdown(f"""
-                            <div style="margin-bottom: 1rem;">
-                              <b>Compliance Score:</b>
-                              <span style="background-color:#0d6efd; color:white; padding:4px 10px; border-radius:5px; font-size:0.85rem;">
-                                {result["Compliance Score"]}
-                              </span><br>
-                              <b>Match Level:</b>
-                              <span style="background-color:{color}; color:black; padding:4px 10px; border-radius:5px; font-size:0.85rem;">
-                                {match_level}
-                              </span>
-                            </div>
-                            """, unsafe_allow_html=True)
-            
-                            st.markdown("### 📋 Checklist Items Matched:")
-                            for item in result["Checklist Items Matched"]:
-                                st.markdown(f"- {item}")
-            
-                            st.markdown("### 🔍 Matched Details:")
-                            for item in result["Matched Details"]:
-                                status = item.get("Status", "Missing")
-                                badge_color = {
-                                    "Explicitly Mentioned": "#198754",
-                                    "Partially Mentioned": "#FFC107",
-                                    "Missing": "#DC3545"
-                                }.get(status, "#6c757d")
-            
-                                st.markdown(f"""
-                                **{item['Checklist Item ID']} — {item['Checklist Text']}**  
-                                <span style="color:white;background-color:{badge_color};padding:3px 10px;border-radius:6px;font-size:13px;">{status}</span>  
-                                <br><small>📝 {item.get("Justification", "No justification")}</small>
-                                """, unsafe_allow_html=True)
-            
-                            st.markdown("### ✏️ Suggested Rewrite:")
-                            st.info(result["Suggested Rewrite"])
-            
-                            st.markdown("### 🧾 Simplified Legal Meaning:")
-                            st.success(result["Simplified Legal Meaning"])
+                        if result["Match Level"] != "Error":
+                            baselines[result["Section"]] = {"policy_text": policy_text, "result": result}
+                        with slots[result["Section"]].container():
+                            st.markdown(f"## ✅ Processed Section {result['Section']} — {result['Title']}")
+                            render_section_result(result)
+
+                    all_results.sort(key=lambda r: section_order.index(r["Section"]))
+                    evaluation_store.record_run(
+                        all_results, policy_text=policy_text, organization=organization,
+                        industry=custom_industry or industry, document=document_name, source="checker"
+                    )
             
                     # ✅ Combined Export Section
                     st.markdown("## 📥 Export Combined Results")
@@ -1092,20 +1166,7 @@ elif menu == "Policy Compliance Checker":
                     )
             
                     # --- CSV Export ---
-                    combined_rows = []
-                    for result in all_results:
-                        for item in result["Matched Details"]:
-                            combined_rows.append({
-                                "Section": result["Section"],
-                                "Checklist Item ID": item["Checklist Item ID"],
-                                "Checklist Text": item["Checklist Text"],
-                                "Status": item["Status"],
-                                "Justification": item["Justification"],
-                                "Match Level": result["Match Level"],
-                                "Score": result["Compliance Score"]
-                            })
-            
-                    combined_csv = pd.DataFrame(combined_rows)
+                    combined_csv = pd.DataFrame(combined_rows(all_results))
                     combined_csv_bytes = io.BytesIO()
                     combined_csv.to_csv(combined_csv_bytes, index=False)
                     combined_csv_bytes.seek(0)
@@ -1116,89 +1177,337 @@ elif menu == "Policy Compliance Checker":
                         file_name="DPDPA_All_Sections_Evaluation.csv",
                         mime="text/csv"
                     )
+
+                    # --- Excel Export ---
+                    combined_xlsx_bytes = io.BytesIO()
+                    write_compliance_report([(document_name, all_results)], combined_xlsx_bytes)
+                    st.download_button(
+                        label="📥 Download Combined Excel",
+                        data=combined_xlsx_bytes.getvalue(),
+                        file_name="DPDPA_All_Sections_Report.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
                 else:
                     section_num = section_id.split(" — ")[0] if " — " in section_id else section_id
                     checklist = dpdpa_checklists[section_num]['items']
 
-                    result = analyze_policy_section(section_num, checklist, policy_text)
-                    st.markdown(f"""
-                    <div style='font-size:20px; font-weight:700; margin-top:25px; margin-bottom:-10px;'>
-                    📘 Section {result['Section']} — {result['Title']}
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    with st.expander("", expanded=True):
-
-                        # Set color for Match Level badge
-                        level_color = {
-                            "Fully Compliant": "#198754",     # green
-                            "Partially Compliant": "#FFC107", # yellow
-                            "Non-Compliant": "#DC3545"        # red
-                        }
-                        match_level = result["Match Level"]
-                        color = level_color.get(match_level, "#6C757D")  # fallback grey
-                        
-                        st.markdown(f"""
-                        <div style="margin-bottom: 1rem;">
-                          <b>Compliance Score:</b>
-                          <span style="background-color:#0d6efd; color:white; padding:4px 10px; border-radius:5px; font-size:0.85rem;">
-                            {result["Compliance Score"]}
-                          </span><br>
-                          <b>Match Level:</b>
-                          <span style="background-color:{color}; color:black; padding:4px 10px; border-radius:5px; font-size:0.85rem;">
-                            {match_level}
-                          </span>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-                    
-                        st.markdown("### 📋 Checklist Items Matched:")
-                        for i, item in enumerate(result["Checklist Items Matched"]):
-                            st.markdown(f"- {item}")
-            
-                        st.markdown("### 🔍 Matched Details:")
-                        for item in result["Matched Details"]:
-                            status = item.get("Status", "Missing")
-                            color = {
-                                "Explicitly Mentioned": "#198754",
-                                "Partially Mentioned": "#FFC107",
-                                "Missing": "#DC3545"
-                            }.get(status, "#6c757d")
-                        
-                            item_id = item.get("Checklist Item ID", "❓")
-                            item_text = item.get("Checklist Text", "❓")
-                            justification = item.get("Justification", "No justification found.")
-                        
-                            st.markdown(f"""
-                        **{item_id} — {item_text}**  
-                        <span style="color:white;background-color:{color};padding:3px 10px;border-radius:6px;font-size:13px;">{status}</span>  
-                        <br><small>📝 {justification}</small>
-                        """, unsafe_allow_html=True)
-                    
-                        st.markdown("### ✏️ Suggested Rewrite:")
-                        st.info(result["Suggested Rewrite"])
-                    
-                        st.markdown("### 🧾 Simplified Legal Meaning:")
-                        st.success(result["Simplified Legal Meaning"])
-
-                        # --- JSON Export ---
-                        json_str = json.dumps(result, indent=2)
-                        json_bytes = io.BytesIO(json_str.encode("utf-8"))
-                        st.download_button(
-                            label="📥 Download JSON Report",
-                            data=json_bytes,
-                            file_name=f"DPDPA_Section_{result['Section']}.json",
-                            mime="application/json"
+                    if incremental_mode and section_num in baselines:
+                        baseline = baselines[section_num]
+                        result = analyze_policy_section_incremental(
+                            section_num, checklist, policy_text, baseline["policy_text"], baseline["result"],
+                            use_cache=use_cache, retrieval_top_k=retrieval_top_k, prescreen=use_prescreen
                         )
-                        
-                        # --- CSV Export ---
-                        csv_df = pd.DataFrame(result["Matched Details"])
-                        csv_bytes = io.BytesIO()
-                        csv_df.to_csv(csv_bytes, index=False)
-                        csv_bytes.seek(0)
-                        st.download_button(
-                            label="📥 Download Checklist Evaluation CSV",
-                            data=csv_bytes,
-                            file_name=f"DPDPA_Section_{result['Section']}.csv",
-                            mime="text/csv"
+                    else:
+                        result = analyze_policy_section(
+                            section_num, checklist, policy_text,
+                            use_cache=use_cache, retrieval_top_k=retrieval_top_k, prescreen=use_prescreen
                         )
+                    if result["Match Level"] != "Error":
+                        baselines[section_num] = {"policy_text": policy_text, "result": result}
+                    evaluation_store.record_run(
+                        [result], policy_text=policy_text, organization=organization,
+                        industry=custom_industry or industry, document=document_name, source="checker"
+                    )
+                    render_section_result(result)
+
+                    # --- JSON Export ---
+                    json_str = json.dumps(result, indent=2)
+                    json_bytes = io.BytesIO(json_str.encode("utf-8"))
+                    st.download_button(
+                        label="📥 Download JSON Report",
+                        data=json_bytes,
+                        file_name=f"DPDPA_Section_{result['Section']}.json",
+                        mime="application/json"
+                    )
+
+                    # --- CSV Export ---
+                    csv_df = pd.DataFrame(result["Matched Details"])
+                    csv_bytes = io.BytesIO()
+                    csv_df.to_csv(csv_bytes, index=False)
+                    csv_bytes.seek(0)
+                    st.download_button(
+                        label="📥 Download Checklist Evaluation CSV",
+                        data=csv_bytes,
+                        file_name=f"DPDPA_Section_{result['Section']}.csv",
+                        mime="text/csv"
+                    )
+
+    # Kept in the session so filtering the matrix does not re-run the comparison
+    if compare_mode and "policy_comparison" in st.session_state:
+        render_policy_comparison(st.session_state["policy_comparison"])
+
+# --- Dashboard & Reports ---
+elif menu == "Dashboard & Reports":
+    st.markdown("<h1 style='font-size:38px; font-weight:800;'>Dashboard & Reports</h1>", unsafe_allow_html=True)
+    st.caption("Compliance history of every check run in the Policy Compliance Checker and the batch audit.")
+
+    filter_cols = st.columns(3)
+    with filter_cols[0]:
+        org_filter = st.selectbox("Organization", ["All organizations"] + evaluation_store.organizations())
+    with filter_cols[1]:
+        period = st.selectbox("Period", ["Last 30 days", "Last 90 days", "Last 12 months", "All time"])
+    with filter_cols[2]:
+        section_filter = st.multiselect(
+            "Sections",
+            options=list(dpdpa_checklists),
+            format_func=lambda sid: f"{sid} — {dpdpa_checklists[sid]['title']}"
+        )
+
+    period_days = {"Last 30 days": 30, "Last 90 days": 90, "Last 12 months": 365}.get(period)
+    filters = {
+        "organization": None if org_filter == "All organizations" else org_filter,
+        "since": (datetime.date.today() - datetime.timedelta(days=period_days)).isoformat() if period_days else None,
+        "sections": section_filter or None
+    }
+
+    summary = evaluation_store.summary(**filters)
+    if not summary["evaluations"]:
+        st.info("No evaluations recorded for this selection yet. Run a compliance check to populate the dashboard.")
+    else:
+        kpi_cols = st.columns(4)
+        kpi_cols[0].metric("Compliance Checks", summary["runs"])
+        kpi_cols[1].metric("Section Evaluations", summary["evaluations"])
+        kpi_cols[2].metric("Average Score", f"{summary['average_score']:.2f}")
+        kpi_cols[3].metric("Fully Compliant", f"{summary['fully_compliant_ratio']:.0%}")
+
+        st.markdown("### 📈 Compliance Trend")
+        trend = evaluation_store.score_trend(**filters)
+        trend_chart = trend.pivot(index="created_date", columns="section", values="average_score")
+        trend_chart.columns = [f"Section {sid}" for sid in trend_chart.columns]
+        st.line_chart(trend_chart)
+
+        st.markdown("### 🧮 Match Levels by Section")
+        levels = evaluation_store.match_level_counts(**filters)
+        level_chart = levels.pivot(index="section", columns="match_level", values="evaluations").fillna(0)
+        level_chart.index = [f"Section {sid}" for sid in level_chart.index]
+        st.bar_chart(level_chart)
+
+        st.markdown("### ⚠️ Most Frequently Failed Checklist Items")
+        failures = evaluation_store.item_failure_rates(**filters)
+        item_text = {item["id"]: item["text"] for sid in dpdpa_checklists for item in dpdpa_checklists[sid]["items"]}
+        failures["Checklist Text"] = failures["item_id"].map(item_text)
+        failures = failures.rename(columns={
+            "section": "Section",
+            "item_id": "Checklist Item ID",
+            "evaluations": "Evaluations",
+            "missing": "Missing",
+            "partial": "Partially Mentioned",
+            "missing_rate": "Missing Rate",
+            "failure_rate": "Failure Rate"
+        })
+        st.dataframe(
+            failures[["Section", "Checklist Item ID", "Checklist Text", "Evaluations", "Missing", "Partially Mentioned", "Missing Rate", "Failure Rate"]],
+            hide_index=True,
+            column_config={
+                "Missing Rate": st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=1),
+                "Failure Rate": st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=1)
+            }
+        )
+
+        st.markdown("### 🗂️ History")
+        history = evaluation_store.run_history(**filters)
+        history["created_at"] = pd.to_datetime(history["created_at"], unit="s").dt.strftime("%Y-%m-%d %H:%M")
+        history = history.rename(columns={
+            "created_at": "Checked At (UTC)",
+            "organization": "Organization",
+            "industry": "Industry",
+            "document": "Document",
+            "source": "Source",
+            "sections": "Sections",
+            "average_score": "Average Score",
+            "errors": "Errors"
+        })
+        st.dataframe(history.drop(columns=["run_id"]), hide_index=True)
+
+        history_csv = io.BytesIO()
+        history.to_csv(history_csv, index=False)
+        history_csv.seek(0)
+        st.download_button(
+            label="📥 Download History CSV",
+            data=history_csv,
+            file_name="DPDPA_Evaluation_History.csv",
+            mime="text/csv"
+        )
+
+        run_labels = {
+            row["run_id"]: f"{row['Checked At (UTC)']} · {row['Organization'] or 'Unnamed'} · {row['Document']} (Sections {row['Sections']})"
+            for _, row in history.iterrows()
+        }
+        selected_run = st.selectbox("Open a past check", options=list(run_labels), format_func=run_labels.get)
+        if selected_run:
+            for result in evaluation_store.run_results(selected_run):
+                render_section_result(result)
+
+# --- Knowledge Assistant ---
+elif menu == "Knowledge Assistant":
+    st.markdown("<h1 style='font-size:38px; font-weight:800;'>Knowledge Assistant</h1>", unsafe_allow_html=True)
+    st.caption("Ask questions about the DPDPA, its checklist requirements, or how past policies were assessed.")
+
+    knowledge_index = load_knowledge_index()
+    if knowledge_index is None:
+        st.info(
+            "The knowledge index has not been built yet. Build it offline with:\n\n"
+            f"`python build_knowledge_index.py --act <DPDPA Act PDF/TXT/DOCX> --output {KNOWLEDGE_INDEX_PATH}`"
+        )
+    else:
+        manifest = knowledge_index.manifest
+        st.caption(
+            f"Index built {manifest['built_at']} · {manifest['passages']} passages ("
+            + ", ".join(f"{count} {source}" for source, count in manifest["sources"].items())
+            + ")"
+        )
+
+        question = st.text_input("Your question", placeholder="e.g. What must a notice to the Data Principal contain?")
+        option_cols = st.columns(3)
+        with option_cols[0]:
+            knowledge_sources = st.multiselect("Search in", KNOWLEDGE_SOURCES, default=KNOWLEDGE_SOURCES)
+        with option_cols[1]:
+            knowledge_top_k = int(st.number_input("Passages to retrieve", min_value=1, max_value=15, value=5))
+        with option_cols[2]:
+            use_gpt_answer = st.checkbox("Answer with GPT", value=True, help="Off: show the retrieved passages only, without a model call.")
+
+        if st.button("Ask") and question.strip():
+            with st.spinner("Searching the knowledge index..."):
+                answer = answer_knowledge_question(
+                    question.strip(), knowledge_index,
+                    top_k=knowledge_top_k, sources=knowledge_sources or None, use_llm=use_gpt_answer
+                )
+            st.session_state.setdefault("knowledge_history", []).insert(0, answer)
+
+        for i, answer in enumerate(st.session_state.get("knowledge_history", [])[:10]):
+            st.markdown(f"#### ❓ {answer['Question']}")
+            if answer.get("Error"):
+                st.warning(f"GPT was unavailable ({answer['Error']}); showing the retrieved passages instead.")
+            st.markdown(answer["Answer"])
+            st.caption(f"{answer['Mode']}{' · from cache' if answer['Cached'] else ''} · {len(answer['Sources'])} passages")
+            with st.expander("Sources", expanded=False):
+                for n, passage in enumerate(answer["Sources"], start=1):
+                    st.markdown(f"**[{n}] {passage['source']} — {passage['ref']}** (score {passage['score']})")
+                    # Passages quote uploaded policies verbatim, so they are never rendered as HTML
+                    st.caption(passage["text"])
+            st.markdown("---")
+
+# --- Admin Settings ---
+elif menu == "Admin Settings":
+    st.markdown("<h1 style='font-size:38px; font-weight:800;'>Admin Settings</h1>", unsafe_allow_html=True)
+    st.caption(f"Saved to {settings_store.path} and applied to every session on its next interaction, without restarting the server.")
+
+    admin_password = st.secrets.get("ADMIN_PASSWORD")
+    if admin_password and st.text_input("Admin password", type="password") != admin_password:
+        st.info("Enter the admin password to change settings.")
+    else:
+        if settings_store.error:
+            st.error(f"❌ The settings file could not be applied, so the last valid settings are still in use. {settings_store.error}")
+
+        # --- Usage ---
+        used_today = request_scheduler.budget.used_today()
+        budget = admin_settings["daily_token_budget"]
+        cache_stats = result_cache.stats()
+        usage_cols = st.columns(3)
+        usage_cols[0].metric("Tokens Used Today (UTC)", f"{used_today:,}", help="Shared by the app, the API and batch audits using the same result cache.")
+        usage_cols[1].metric("Daily Token Budget", f"{budget:,}" if budget else "Unlimited")
+        usage_cols[2].metric("Cached Evaluations", f"{cache_stats['entries']:,}", help=f"{cache_stats['bytes'] / 1024 / 1024:.1f} MB · {cache_stats['hit_rate']:.0%} hit rate")
+        if budget:
+            st.progress(min(1.0, used_today / budget), text=f"{used_today / budget:.0%} of today's token budget used")
+
+        task_labels = {
+            "evaluation": "Compliance evaluation",
+            "drafting": "Policy drafting",
+            "knowledge": "Knowledge Assistant",
+            "triage": "Cascade triage"
+        }
+        with st.form("admin_settings_form"):
+            st.markdown("### 🤖 Models")
+            st.caption("Use a cheaper model for drafting and a stronger one for evaluation, e.g. gpt-4o-mini for drafting and gpt-4o for evaluation.")
+            models, temperatures = {}, {}
+            for task in TASKS:
+                model_col, temperature_col = st.columns([3, 1])
+                with model_col:
+                    models[task] = st.text_input(f"{task_labels[task]} model", value=admin_settings["models"][task])
+                with temperature_col:
+                    temperatures[task] = st.number_input(
+                        f"{task_labels[task]} temperature",
+                        min_value=0.0, max_value=2.0, step=0.1,
+                        value=float(admin_settings["temperatures"][task])
+                    )
+
+            st.markdown("### 🪜 Model Cascade")
+            st.caption("Listed sections are evaluated by the triage model first; only items it rates Partially Mentioned or below the confidence threshold are re-asked to the evaluation model.")
+            cascade_cols = st.columns([3, 1])
+            with cascade_cols[0]:
+                cascade_sections = st.multiselect(
+                    "Cascade sections",
+                    options=list(dpdpa_checklists),
+                    # Sections missing from a swapped-in checklist would make Streamlit raise
+                    default=[sid for sid in admin_settings["cascade_sections"] if sid in dpdpa_checklists],
+                    format_func=lambda sid: f"Section {sid}: {dpdpa_checklists[sid]['title']}"
+                )
+            with cascade_cols[1]:
+                cascade_confidence_threshold = st.number_input(
+                    "Confidence threshold",
+                    min_value=0.0, max_value=1.0, step=0.05,
+                    value=float(admin_settings["cascade_confidence_threshold"])
+                )
+
+            st.markdown("### ⚙️ Throughput")
+            throughput_cols = st.columns(3)
+            with throughput_cols[0]:
+                max_concurrent_sections = st.number_input("Max concurrent GPT requests per check", min_value=1, max_value=50, value=admin_settings["max_concurrent_sections"])
+                max_retries = st.number_input("Max retries per request", min_value=0, max_value=20, value=admin_settings["max_retries"])
+            with throughput_cols[1]:
+                requests_per_minute = st.number_input("Requests per minute", min_value=1, value=admin_settings["requests_per_minute"])
+                tokens_per_minute = st.number_input("Tokens per minute", min_value=1000, step=1000, value=admin_settings["tokens_per_minute"])
+            with throughput_cols[2]:
+                timeout_seconds = st.number_input("Request timeout (seconds)", min_value=1.0, step=5.0, value=float(admin_settings["timeout_seconds"]))
+
+            st.markdown("### 🗄️ Result Cache")
+            cache_cols = st.columns(2)
+            with cache_cols[0]:
+                cache_max_mb = st.number_input("Maximum size (MB)", min_value=1, value=admin_settings["cache_max_mb"])
+            with cache_cols[1]:
+                cache_ttl_days = st.number_input("Keep results for (days)", min_value=1, value=admin_settings["cache_ttl_days"])
+
+            st.markdown("### 💰 Budget")
+            daily_token_budget = st.number_input(
+                "Daily token budget (0 = unlimited)",
+                min_value=0, step=10000, value=admin_settings["daily_token_budget"],
+                help="Once reached, further GPT requests fail until midnight UTC."
+            )
+
+            if st.form_submit_button("💾 Save Settings"):
+                try:
+                    settings_store.save({
+                        "models": models,
+                        "temperatures": temperatures,
+                        "cascade_sections": cascade_sections,
+                        "cascade_confidence_threshold": cascade_confidence_threshold,
+                        "max_concurrent_sections": max_concurrent_sections,
+                        "requests_per_minute": requests_per_minute,
+                        "tokens_per_minute": tokens_per_minute,
+                        "max_retries": max_retries,
+                        "timeout_seconds": timeout_seconds,
+                        "cache_max_mb": cache_max_mb,
+                        "cache_ttl_days": cache_ttl_days,
+                        "daily_token_budget": daily_token_budget
+                    })
+                except ValueError as e:
+                    st.error(f"❌ {e}")
+                else:
+                    st.session_state["admin_settings_saved"] = True
+                    st.rerun()
+
+        if st.session_state.pop("admin_settings_saved", False):
+            st.success("✅ Settings saved and applied.")
+
+        action_cols = st.columns(2)
+        with action_cols[0]:
+            if st.button("↩️ Reset to Defaults"):
+                settings_store.reset()
+                st.rerun()
+        with action_cols[1]:
+            if st.button("🗑️ Clear Result Cache"):
+                result_cache.clear()
+                st.rerun()
+
+        with st.expander("Effective settings", expanded=False):
+            st.json(admin_settings)
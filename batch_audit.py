@@ -0,0 +1,203 @@
+"""Headless batch audit of a folder of policies against all DPDPA sections.
+
+Usage:
+    OPENAI_API_KEY=... python batch_audit.py policies/ --output-dir audit_results
+
+Every finished document is appended to ``progress.jsonl`` in the output
+directory, so an interrupted run picks up where it stopped when started again.
+The combined CSV, Excel and JSON exports are rewritten from that file at the end.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import dpdpa_engine
+import prescreen
+from dpdpa_engine import COMBINED_COLUMNS, SUPPORTED_EXTENSIONS, combined_rows, evaluate_policy, extract_text_from_file
+from evaluation_store import EvaluationStore
+from gpt_scheduler import RequestScheduler
+from pdf_extract import file_hash
+from result_cache import ResultCache, policy_hash
+from telemetry import Telemetry
+from xlsx_report import ComplianceReportWriter
+
+
+PROGRESS_FILE = "progress.jsonl"
+
+
+def find_policy_files(input_dir):
+    paths = []
+    for root, _, files in os.walk(input_dir):
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+def load_progress(progress_path):
+    """Return the finished documents keyed by (relative path, file hash)."""
+    done = {}
+    if not os.path.exists(progress_path):
+        return done
+    with open(progress_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves at most one truncated line
+                continue
+            done[(record["Document"], record["File Hash"])] = record
+    return done
+
+def audit_document(path, document, digest, args):
+    """Evaluate one file; returns its progress record and the hash of its extracted text."""
+    text = extract_text_from_file(path, max_pages=args.max_pages, max_bytes=args.max_mb * 1024 * 1024)
+    results = evaluate_policy(
+        text,
+        model=args.model,
+        batched=args.batched,
+        use_cache=not args.no_cache,
+        retrieval_top_k=args.retrieval_top_k,
+        max_workers=args.section_concurrency,
+        prescreen=not args.no_prescreen
+    )
+    record = {
+        "Document": document,
+        "File Hash": digest,
+        "Results": results
+    }
+    return record, policy_hash(text)
+
+def write_exports(records, output_dir):
+    # CSV and Excel rows are streamed to disk in one pass over the records
+    csv_path = os.path.join(output_dir, "DPDPA_Batch_Evaluation.csv")
+    xlsx_path = os.path.join(output_dir, "DPDPA_Batch_Report.xlsx")
+    report = ComplianceReportWriter()
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["Document", *COMBINED_COLUMNS])
+        writer.writeheader()
+        for record in records:
+            for row in combined_rows(record["Results"]):
+                writer.writerow({"Document": record["Document"], **row})
+            report.add_document(record["Document"], record["Results"])
+    report.save(xlsx_path)
+
+    json_path = os.path.join(output_dir, "DPDPA_Batch_Combined.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({record["Document"]: record["Results"] for record in records}, f, indent=2)
+    return csv_path, xlsx_path, json_path
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Audit a folder of policy documents against every DPDPA checklist section.")
+    parser.add_argument("input_dir", help="Folder containing .pdf, .txt or .docx policies (searched recursively).")
+    parser.add_argument("--output-dir", default="audit_results", help="Where progress and exports are written.")
+    parser.add_argument("--model", help="Evaluation model (default: the engine's evaluation model).")
+    parser.add_argument("--jobs", type=int, default=4, help="Documents evaluated at the same time.")
+    parser.add_argument("--section-concurrency", type=int, default=5, help="Concurrent GPT requests per document.")
+    parser.add_argument("--batched", action="store_true", help="Send the policy once for several sections.")
+    parser.add_argument("--retrieval-top-k", type=int, default=None, help="Send only the top-k passages per checklist item.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached section results.")
+    parser.add_argument("--no-prescreen", action="store_true", help="Send every checklist item to GPT, skipping the local rules.")
+    parser.add_argument("--cascade", nargs="*", default=[], metavar="SECTION", help="Sections evaluated by --triage-model first, escalating only uncertain items.")
+    parser.add_argument("--triage-model", help="Cascade triage model (default: the engine's triage model).")
+    parser.add_argument("--cascade-threshold", type=float, default=0.8, help="Triage confidence below which an item is escalated.")
+    parser.add_argument("--cache-path", default=".cache/dpdpa_results.sqlite")
+    parser.add_argument("--store-path", default="data/dpdpa_evaluations.sqlite", help="Evaluation history shown on the dashboard.")
+    parser.add_argument("--organization", default="", help="Organization recorded with every evaluation in the history.")
+    parser.add_argument("--telemetry-log", default="data/llm_calls.jsonl", help="JSONL log of every GPT call (tokens, latency, retries).")
+    parser.add_argument("--metrics-path", default=None, help="Also write Prometheus metrics here for a textfile collector.")
+    parser.add_argument("--rpm", type=int, default=60, help="OpenAI requests per minute quota.")
+    parser.add_argument("--tpm", type=int, default=80000, help="OpenAI tokens per minute quota.")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds.")
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--max-pages", type=int, default=500)
+    parser.add_argument("--max-mb", type=int, default=25)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not os.environ.get("OPENAI_API_KEY"):
+        sys.exit("OPENAI_API_KEY must be set in the environment.")
+
+    telemetry = Telemetry(log_path=args.telemetry_log, metrics_path=args.metrics_path)
+    cache = ResultCache(args.cache_path)
+    dpdpa_engine.configure(
+        cache=cache,
+        call_telemetry=telemetry,
+        models={"triage": args.triage_model},
+        cascade_sections=args.cascade,
+        cascade_threshold=args.cascade_threshold,
+        max_concurrency=args.section_concurrency,
+        request_scheduler=RequestScheduler(
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            max_retries=args.max_retries,
+            timeout=args.timeout,
+            budget_store=cache
+        )
+    )
+    # Resolved once so the evaluations and the recorded history name the same model
+    args.model = dpdpa_engine.model_for("evaluation", args.model)
+    os.makedirs(args.output_dir, exist_ok=True)
+    progress_path = os.path.join(args.output_dir, PROGRESS_FILE)
+    done = load_progress(progress_path)
+    store = EvaluationStore(args.store_path)
+
+    keys = {}
+    for path in find_policy_files(args.input_dir):
+        with open(path, "rb") as f:
+            keys[path] = (os.path.relpath(path, args.input_dir), file_hash(f.read()))
+    pending = [path for path, key in keys.items() if key not in done]
+    print(f"{len(keys)} policies found, {len(keys) - len(pending)} already done, {len(pending)} to evaluate.")
+
+    failures = 0
+    with open(progress_path, "a", encoding="utf-8") as progress_file, \
+            ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {executor.submit(audit_document, path, *keys[path], args): path for path in pending}
+        for i, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                record, text_hash = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"[{i}/{len(pending)}] ❌ {path}: {e}")
+                continue
+            errors = [r["Section"] for r in record["Results"] if r["Match Level"] == "Error"]
+            if errors:
+                # Not checkpointed: the next run retries it, reusing cached sections
+                failures += 1
+                print(f"[{i}/{len(pending)}] ⚠️ {record['Document']}: sections {', '.join(errors)} failed")
+                continue
+            progress_file.write(json.dumps(record) + "\n")
+            progress_file.flush()
+            done[keys[path]] = record
+            # Recorded only once every section succeeded, like the checkpoint, so a retried
+            # document is not counted twice in the dashboard history
+            store.record_run(
+                record["Results"], policy_hash=text_hash, organization=args.organization,
+                document=record["Document"], model=args.model, source="batch"
+            )
+            print(f"[{i}/{len(pending)}] ✅ {record['Document']}")
+
+    # Only export the current version of each file still present in the folder
+    records = [done[key] for key in sorted(keys.values()) if key in done]
+    csv_path, xlsx_path, json_path = write_exports(records, args.output_dir)
+    print(f"Wrote {csv_path}, {xlsx_path} and {json_path}")
+    screened = prescreen.stats.snapshot()
+    if screened["items"]:
+        print(f"Pre-screen resolved {screened['items_resolved']}/{screened['items']} items locally, saving {screened['calls_saved']} GPT calls.")
+    for row in telemetry.escalation_summary():
+        print(f"Cascade section {row['section']}: escalated {row['escalated']}/{row['items']} items ({row['escalation_rate']:.0%}).")
+    for row in telemetry.summary():
+        print(f"{row['feature']} ({row['model']}): {row['calls']} calls, {row['cache_hits']} cached, "
+              f"{row['prompt_tokens'] + row['completion_tokens']:,} tokens, {row['avg_latency_ms']:.0f} ms avg")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""Offline benchmark of the compliance pipeline against a local mock OpenAI server.
+
+Usage:
+    python benchmark.py --sizes 5 20 50 100 --latency-ms 800 --concurrency 5
+
+For each synthetic policy size the harness times PDF extraction, prompt
+construction and the all-sections evaluation, and reports prompt tokens,
+throughput and peak RSS. No network access or API key is needed.
+"""
+import argparse
+import json
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fitz
+import openai
+
+import dpdpa_engine
+import prescreen
+from dpdpa_engine import (
+    DEFAULT_CONTEXT_TOKENS, MODEL_CONTEXT_TOKENS, create_full_policy_prompt, dpdpa_checklists, estimate_tokens, evaluate_policy
+)
+from gpt_scheduler import RequestScheduler
+from pdf_extract import extract_pdf_text
+from result_cache import ResultCache
+
+
+# --- Mock Chat Completions Server ---
+class MockOpenAIServer:
+    """Threaded fake of POST /v1/chat/completions returning canned evaluation JSON."""
+
+    def __init__(self, latency_ms=500, jitter_ms=100, seed=0, error_rate=0.0, bad_json_rate=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.bad_json_rate = bad_json_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.rate_limited = self.prompt_tokens = self.completion_tokens = 0
+
+    def reply_for(self, prompt):
+        item_ids = re.findall(r"^\s*(\d+\.\d+)\. ", prompt, flags=re.M)
+        statuses = ["Explicitly Mentioned", "Partially Mentioned", "Missing"]
+        evaluations = [
+            {"Checklist Item ID": item_id, "Status": statuses[i % 3], "Justification": "Mock justification."}
+            for i, item_id in enumerate(item_ids)
+        ]
+        if '"Confidence"' in prompt:
+            # Cascade triage prompt: every fourth item comes back unsure
+            for i, evaluation in enumerate(evaluations):
+                evaluation["Confidence"] = 0.6 if i % 4 == 3 else 0.95
+        section_reply = {
+            "Match Level": "Partially Compliant",
+            "Compliance Score": 0.5,
+            "Suggested Rewrite": "Mock rewrite.",
+            "Simplified Legal Meaning": "Mock meaning."
+        }
+        if '"Sections"' in prompt:
+            sections = {}
+            for evaluation in evaluations:
+                sid = evaluation["Checklist Item ID"].split(".")[0]
+                sections.setdefault(sid, dict(section_reply, **{"Checklist Evaluation": []}))
+                sections[sid]["Checklist Evaluation"].append(evaluation)
+            return json.dumps({"Sections": sections})
+        return json.dumps(dict(section_reply, **{"Checklist Evaluation": evaluations}))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                # Repair re-prompts carry the original prompt as the first message
+                prompt = body["messages"][0]["content"]
+                with server._lock:
+                    roll = server.random.random()
+                if roll < server.error_rate:
+                    with server._lock:
+                        server.rate_limited += 1
+                    return self._send(429, {"error": {"message": "Mock rate limit", "type": "rate_limit_error"}}, {"retry-after": "0.2"})
+
+                context = MODEL_CONTEXT_TOKENS.get(body.get("model"), DEFAULT_CONTEXT_TOKENS)
+                if sum(estimate_tokens(m["content"]) for m in body["messages"]) > context:
+                    return self._send(400, {"error": {
+                        "message": f"This model's maximum context length is {context} tokens.",
+                        "type": "invalid_request_error",
+                        "code": "context_length_exceeded"
+                    }})
+
+                content = server.reply_for(prompt)
+                if roll < server.error_rate + server.bad_json_rate:
+                    content = f"Here is the evaluation:\n```json\n{content}\n```"
+                delay = max(0.0, server.latency_ms + server.random.uniform(-server.jitter_ms, server.jitter_ms))
+                time.sleep(delay / 1000)
+
+                prompt_tokens = sum(estimate_tokens(m["content"]) for m in body["messages"])
+                completion_tokens = estimate_tokens(content)
+                with server._lock:
+                    server.requests += 1
+                    server.prompt_tokens += prompt_tokens
+                    server.completion_tokens += completion_tokens
+
+                self._send(200, {
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "gpt-4"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens
+                    }
+                })
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+# --- Synthetic Corpus ---
+POLICY_SENTENCES = [
+    "We process personal data only in accordance with the Digital Personal Data Protection Act, 2023.",
+    "Personal data is processed for lawful purposes that are not expressly forbidden by law.",
+    "Every request for consent is preceded by a notice describing the personal data and the purpose of processing.",
+    "You may withdraw your consent at any time through the privacy settings page or by emailing us.",
+    "Withdrawal of consent does not affect the lawfulness of processing carried out before the withdrawal.",
+    "Our Data Protection Officer can be reached at dpo@example.com or +91 22 5555 0100.",
+    "We implement reasonable security safeguards, including encryption and access controls, to prevent breaches.",
+    "In the event of a personal data breach we will inform the Data Protection Board and each affected Data Principal.",
+    "Personal data is erased once the specified purpose is no longer served or consent is withdrawn.",
+    "Data Processors engaged by us act only under a valid contract and follow our instructions.",
+    "Grievances can be raised with our Grievance Officer, who will respond within the prescribed period.",
+    "We use cookies and similar technologies to remember your preferences and measure site usage.",
+    "Information may be shared with payment partners strictly to complete the transactions you request.",
+    "The notice is available in English and in the languages listed in the Eighth Schedule to the Constitution."
+]
+
+def synthetic_policy_pdf(pages, seed=0, paragraphs_per_page=6):
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        paragraphs = [
+            f"{page_number + 1}.{i + 1} " + " ".join(rng.sample(POLICY_SENTENCES, 3))
+            for i in range(paragraphs_per_page)
+        ]
+        page.insert_textbox(fitz.Rect(54, 54, 558, 788), "\n\n".join(paragraphs), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+# --- Benchmark ---
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_case(server, pages, args):
+    data = synthetic_policy_pdf(pages)
+    server.reset_counters()
+    prescreen.stats.reset()
+
+    started = time.perf_counter()
+    policy_text = extract_pdf_text(data)
+    extracted = time.perf_counter()
+
+    prompts = [
+        create_full_policy_prompt(sid, policy_text, dpdpa_checklists[sid]["items"])
+        for sid in dpdpa_checklists
+    ]
+    prompted = time.perf_counter()
+
+    results = []
+    for _ in range(args.repeat):
+        results = evaluate_policy(
+            policy_text,
+            model=args.model,
+            batched=args.batched,
+            use_cache=args.cache,
+            retrieval_top_k=args.retrieval_top_k,
+            max_workers=args.concurrency,
+            prescreen=not args.no_prescreen
+        )
+    evaluated = time.perf_counter()
+
+    evaluation_seconds = evaluated - prompted
+    screened = prescreen.stats.snapshot()
+    cascaded = [r for r in results if "Escalated Items" in r]
+    cascade_items = sum(len(r["Matched Details"]) - len(r.get("Pre-screened Items", [])) for r in cascaded)
+    return {
+        "pages": pages,
+        "policy_chars": len(policy_text),
+        "extract_s": round(extracted - started, 3),
+        "prompt_build_s": round(prompted - extracted, 4),
+        "evaluate_s": round(evaluation_seconds, 3),
+        "full_prompt_tokens": sum(estimate_tokens(p) for p in prompts),
+        "sent_prompt_tokens": server.prompt_tokens,
+        "completion_tokens": server.completion_tokens,
+        "requests": server.requests,
+        "rate_limited": server.rate_limited,
+        "prescreened_items": screened["items_resolved"],
+        "calls_saved": screened["calls_saved"],
+        "escalation_rate": round(sum(len(r["Escalated Items"]) for r in cascaded) / cascade_items, 2) if cascade_items else None,
+        "errors": sum(1 for r in results if r["Match Level"] == "Error"),
+        "policies_per_min": round(60 * args.repeat / evaluation_seconds, 2) if evaluation_seconds else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+def print_table(rows):
+    columns = list(rows[0])
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in columns}
+    print("  ".join(c.rjust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c]).rjust(widths[c]) for c in columns))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DPDPA compliance pipeline offline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 20, 50, 100], help="Synthetic policy sizes in pages.")
+    parser.add_argument("--latency-ms", type=float, default=500, help="Mean mock completion latency.")
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock requests answered with HTTP 429.")
+    parser.add_argument("--bad-json-rate", type=float, default=0.0, help="Fraction of mock replies wrapped in prose/code fences.")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=1, help="Evaluations per policy (use with --cache to measure hits).")
+    parser.add_argument("--model", default="gpt-4-turbo", help="Model name sent to the mock; sets the context budget.")
+    parser.add_argument("--rpm", type=int, default=100_000, help="Scheduler requests/min limit (high = unthrottled).")
+    parser.add_argument("--tpm", type=int, default=100_000_000, help="Scheduler tokens/min limit (high = unthrottled).")
+    parser.add_argument("--batched", action="store_true")
+    parser.add_argument("--retrieval-top-k", type=int, default=None)
+    parser.add_argument("--no-prescreen", action="store_true", help="Disable the local pre-screen rules.")
+    parser.add_argument("--cascade", action="store_true", help="Evaluate every section as a triage-model-first cascade.")
+    parser.add_argument("--triage-model", default="gpt-4o-mini", help="Cheap model used first in --cascade mode.")
+    parser.add_argument("--cache", action="store_true", help="Enable the result cache (a fresh one per run).")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    with MockOpenAIServer(args.latency_ms, args.jitter_ms, error_rate=args.error_rate, bad_json_rate=args.bad_json_rate) as server, tempfile.TemporaryDirectory() as cache_dir:
+        dpdpa_engine.configure(
+            openai_client=openai.OpenAI(base_url=server.base_url, api_key="benchmark"),
+            max_concurrency=args.concurrency,
+            request_scheduler=RequestScheduler(requests_per_minute=args.rpm, tokens_per_minute=args.tpm),
+            models={"triage": args.triage_model},
+            cascade_sections=list(dpdpa_checklists) if args.cascade else []
+        )
+        if args.cache:
+            dpdpa_engine.configure(cache=ResultCache(f"{cache_dir}/results.sqlite"))
+        rows = [run_case(server, pages, args) for pages in args.sizes]
+
+    print_table(rows)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""Offline build of the Knowledge Assistant's search index.
+
+Usage:
+    python build_knowledge_index.py --act dpdpa_2023.pdf --output data/knowledge_index
+
+Indexes the DPDPA Act text (PDF, TXT or DOCX), every checklist item and the
+justifications of past evaluations from the evaluation store. The app
+memory-maps the result at startup; re-run this script to pick up new
+evaluations or an updated Act text.
+"""
+import argparse
+import os
+import sys
+import time
+
+from dpdpa_engine import dpdpa_checklists, extract_text_from_file
+from evaluation_store import EvaluationStore
+from knowledge_index import act_documents, build_index, checklist_documents, evaluation_documents
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the Knowledge Assistant index.")
+    parser.add_argument("--act", help="DPDPA Act text as .pdf, .txt or .docx; omitted passages are simply not indexed.")
+    parser.add_argument("--store-path", default="data/dpdpa_evaluations.sqlite", help="Evaluation history to index justifications from.")
+    parser.add_argument("--max-justifications", type=int, default=20000, help="Most recent distinct verdicts to include.")
+    parser.add_argument("--output", default="data/knowledge_index", help="Index directory (replaced atomically).")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    documents = []
+    if args.act:
+        documents += act_documents(extract_text_from_file(args.act))
+    else:
+        print("No --act given: the index will only cover checklists and past evaluations.")
+    documents += checklist_documents(dpdpa_checklists)
+    if os.path.exists(args.store_path):
+        documents += evaluation_documents(EvaluationStore(args.store_path).justifications(args.max_justifications))
+
+    manifest = build_index(documents, args.output)
+    counts = ", ".join(f"{count} {source}" for source, count in manifest["sources"].items())
+    print(f"Indexed {manifest['passages']} passages ({counts}) into {args.output} in {time.perf_counter() - started:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
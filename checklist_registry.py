@@ -0,0 +1,130 @@
+import glob
+import hashlib
+import json
+import os
+
+from result_cache import checklist_fingerprint
+
+
+# Shipped with the code; point DPDPA_CHECKLIST_PATH elsewhere to override
+DEFAULT_CHECKLIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checklists")
+
+# --- Loading ---
+def configured_checklist_path():
+    """The checklist path every entry point uses: DPDPA_CHECKLIST_PATH, else the shipped checklists."""
+    return os.environ.get("DPDPA_CHECKLIST_PATH") or DEFAULT_CHECKLIST_PATH
+
+def checklist_files(path):
+    """The registry files at ``path``: the file itself, or every *.json in a directory in name order."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.json")))
+    return [path]
+
+def files_signature(path):
+    """Cheap change marker for ``path`` (file names, sizes and mtimes) used to reload an edited registry."""
+    signature = []
+    for file in checklist_files(path):
+        stat = os.stat(file)
+        signature.append((file, stat.st_size, stat.st_mtime))
+    return tuple(signature)
+
+def _validate_document(document, file):
+    if not isinstance(document, dict) or not isinstance(document.get("sections"), list):
+        raise ValueError(f"{file}: expected an object with a \"sections\" list.")
+    for section in document["sections"]:
+        if not section.get("id") or not section.get("title") or not isinstance(section.get("items"), list):
+            raise ValueError(f"{file}: every section needs an id, a title and an items list.")
+        for item in section["items"]:
+            if not item.get("id") or not str(item.get("text", "")).strip():
+                raise ValueError(f"{file}: section {section['id']} has an item without an id or text.")
+
+# --- Registry ---
+class ChecklistRegistry:
+    """Checklist sections loaded once from versioned JSON files.
+
+    A directory may hold several files (the Act, the Rules, client-specific
+    additions); their sections are appended in file name order and a section
+    or item id may only be defined once. Everything the evaluation path needs
+    per call is computed here up front: the "id. text" prompt lines, each
+    section's rendered checklist block, id→text indexes and the checklist
+    fingerprints used in result cache keys.
+    """
+
+    def __init__(self, documents):
+        self.documents = []
+        self.checklists = {}
+        self.items = {}
+        self._rendered = {}
+        self._blocks = {}
+        self._indexes = {}
+        self._fingerprints = {}
+
+        for file, document in documents:
+            _validate_document(document, file)
+            self.documents.append({
+                "file": os.path.basename(file),
+                "name": document.get("name", os.path.basename(file)),
+                "version": str(document.get("version", "")),
+                "source": document.get("source", "")
+            })
+            for section in document["sections"]:
+                sid = str(section["id"])
+                if sid in self.checklists:
+                    raise ValueError(f"{file}: section {sid} is already defined by another checklist file.")
+                items = [{"id": str(item["id"]), "text": item["text"]} for item in section["items"]]
+                for item in items:
+                    if item["id"] in self.items:
+                        raise ValueError(f"{file}: checklist item {item['id']} is defined twice.")
+                    self.items[item["id"]] = dict(item, section=sid)
+                    self._rendered[item["id"]] = f"{item['id']}. {item['text']}"
+                self.checklists[sid] = {"title": section["title"], "items": items}
+                self._blocks[sid] = "\n".join(self._rendered[item["id"]] for item in items)
+                self._indexes[sid] = {item["id"]: item["text"] for item in items}
+                self._fingerprints[sid] = checklist_fingerprint(items)
+
+        payload = json.dumps(
+            [self.documents, [[sid, section["title"], section["items"]] for sid, section in self.checklists.items()]],
+            ensure_ascii=False, sort_keys=True
+        )
+        self.fingerprint = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, path=DEFAULT_CHECKLIST_PATH):
+        documents = []
+        for file in checklist_files(path):
+            with open(file, encoding="utf-8") as f:
+                documents.append((file, json.load(f)))
+        if not documents:
+            raise ValueError(f"No checklist files found at {path}.")
+        return cls(documents)
+
+    @property
+    def version(self):
+        return ", ".join(f"{d['name']} v{d['version']}" if d["version"] else d["name"] for d in self.documents)
+
+    # --- Lookups ---
+    def _is_full_section(self, section_id, checklist):
+        section = self.checklists.get(str(section_id))
+        return section is not None and checklist is section["items"]
+
+    def render(self, section_id, checklist):
+        """The checklist as prompt lines; the whole section comes pre-joined."""
+        if self._is_full_section(section_id, checklist):
+            return self._blocks[str(section_id)]
+        return "\n".join(self._rendered.get(item["id"]) or f"{item['id']}. {item['text']}" for item in checklist)
+
+    def texts(self, section_id, checklist):
+        """Item id → text for ``checklist``."""
+        if self._is_full_section(section_id, checklist):
+            return self._indexes[str(section_id)]
+        return {item["id"]: item["text"] for item in checklist}
+
+    def fingerprint_for(self, section_id, checklist):
+        """The result cache fingerprint of ``checklist`` (precomputed for whole sections)."""
+        if self._is_full_section(section_id, checklist):
+            return self._fingerprints[str(section_id)]
+        return checklist_fingerprint(checklist)
+
+    def section_of(self, item_id):
+        item = self.items.get(item_id)
+        return item["section"] if item else None
@@ -0,0 +1,1423 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
+
+from checklist_registry import ChecklistRegistry, configured_checklist_path
+from result_cache import make_cache_key, policy_hash
+from retrieval import TOKENIZER_VERSION, chunk_policy_windows, format_passages, items_touched_by_edit, select_passages
+from pdf_extract import extract_pdf_text
+from prescreen import CONTACT_PATTERN, WITHDRAWAL_PATTERN, prescreen_checklist, rules_fingerprint
+from gpt_scheduler import RequestScheduler
+from telemetry import Telemetry, llm_feature
+from structured_output import (
+    CONFIDENCE_SECTION_REPLY_SCHEMA, SECTION_REPLY_SCHEMA, extract_json, multi_section_schema, multi_section_validator,
+    response_format_for, validate_section_reply
+)
+
+# Evaluation engine shared by the Streamlit app and the headless tools.
+# Nothing in this module may import Streamlit or read st.secrets.
+
+# --- Runtime Configuration ---
+client = None
+result_cache = None
+scheduler = RequestScheduler()
+telemetry = Telemetry()
+MAX_CONCURRENT_SECTIONS = 5
+_client_lock = threading.Lock()
+
+# Model and sampling temperature used by each kind of GPT call unless a caller passes a model
+TASK_MODELS = {"evaluation": "gpt-4", "drafting": "gpt-4", "knowledge": "gpt-4", "triage": "gpt-4o-mini"}
+TASK_TEMPERATURES = {"evaluation": 0.0, "drafting": 0.5, "knowledge": 0.5, "triage": 0.0}
+
+# Sections evaluated as a cascade: the triage model first, then the evaluation model
+# only for items it rated "Partially Mentioned" or below the confidence threshold
+CASCADE_SECTIONS = frozenset()
+CASCADE_CONFIDENCE_THRESHOLD = 0.8
+
+def configure(openai_client=None, cache=None, max_concurrency=None, request_scheduler=None, models=None, temperatures=None,
+              call_telemetry=None, cascade_sections=None, cascade_threshold=None, checklists=None):
+    """Install the OpenAI client, result cache, concurrency limit, request scheduler, per-task models,
+    telemetry, cascade settings and checklist registry used by the engine.
+
+    Called on every app rerun while section workers are running, so shared tables
+    are never edited in place: changed ones are rebuilt and swapped in with one
+    assignment, and unchanged ones are left alone.
+    """
+    global client, result_cache, scheduler, MAX_CONCURRENT_SECTIONS, telemetry, CASCADE_CONFIDENCE_THRESHOLD
+    global TASK_MODELS, TASK_TEMPERATURES, CASCADE_SECTIONS
+    if openai_client is not None:
+        client = openai_client
+    if cache is not None:
+        result_cache = cache
+    if max_concurrency is not None:
+        MAX_CONCURRENT_SECTIONS = max(1, int(max_concurrency))
+    if request_scheduler is not None:
+        scheduler = request_scheduler
+    if models:
+        updated = dict(TASK_MODELS, **{task: name for task, name in models.items() if name})
+        if updated != TASK_MODELS:
+            TASK_MODELS = updated
+    if temperatures:
+        updated = dict(TASK_TEMPERATURES, **{task: float(value) for task, value in temperatures.items()})
+        if updated != TASK_TEMPERATURES:
+            TASK_TEMPERATURES = updated
+    if call_telemetry is not None:
+        telemetry = call_telemetry
+    if cascade_sections is not None:
+        sections = frozenset(str(sid) for sid in cascade_sections)
+        if sections != CASCADE_SECTIONS:
+            CASCADE_SECTIONS = sections
+    if cascade_threshold is not None:
+        CASCADE_CONFIDENCE_THRESHOLD = float(cascade_threshold)
+    if checklists is not None:
+        use_checklists(checklists)
+
+def model_for(task, model=None):
+    return model or TASK_MODELS[task]
+
+def get_client():
+    # Falls back to an OPENAI_API_KEY environment variable for headless use
+    global client
+    with _client_lock:
+        if client is None:
+            client = openai.OpenAI()
+    return client
+
+# --- Section Checklists ---
+# Loaded once per process from the versioned files in checklists/ (see checklist_registry).
+# dpdpa_checklists keeps the {section: {"title", "items"}} shape and is updated in place,
+# so modules that imported it by name always see the installed registry. section_map
+# ({"Section 4 — <title>": "4"}) is rebuilt from the same titles for the drafting pickers.
+# Both are only touched when a different registry is installed, and never emptied on the
+# way, so running section workers keep finding their sections.
+dpdpa_checklists = {}
+section_map = {}
+checklist_registry = None
+
+def use_checklists(registry):
+    global checklist_registry
+    if registry is checklist_registry:
+        return
+    checklist_registry = registry
+    _replace_contents(dpdpa_checklists, registry.checklists)
+    _replace_contents(section_map, {f"Section {sid} — {section['title']}": sid for sid, section in registry.checklists.items()})
+
+def _replace_contents(table, contents):
+    table.update(contents)
+    for key in [key for key in table if key not in contents]:
+        del table[key]
+
+use_checklists(ChecklistRegistry.load(configured_checklist_path()))
+
+# --- Pre-screen Rules ---
+# Per-item rules for prescreen.prescreen_checklist. "present" lists regex groups
+# that must all match one sentence for the item to count as explicitly
+# mentioned; when none of the "requires" regexes appear anywhere, the item is
+# missing. Anything else is left to GPT, so keep both sides conservative: a
+# "present" group must cover every element of its item, and "requires" must
+# list every way a policy could phrase the topic.
+prescreen_rules = {
+    "4.1": {
+        "present": [[r"digital personal data protection act,?\s*(?:of\s*)?2023", r"\b(?:in accordance with|as per|pursuant to|in compliance with|under)\b", r"\bprocess"]],
+        "requires": [r"data protection act", r"\bDPDPA?\b"],
+        "topic": "the Digital Personal Data Protection Act, 2023"
+    },
+    "4.2": {
+        "present": [[r"\blawful purposes?\b", r"\bprocess", r"\b(?:only|solely|exclusively)\b"]],
+        "requires": [r"\blawful"],
+        "topic": "lawful purposes of processing"
+    },
+    "4.3": {
+        "present": [[r"lawful purpose", r"not expressly (?:forbidden|prohibited) by (?:any )?law"]],
+        "negation_ok": True,
+        "requires": [r"forbidden", r"prohibited"],
+        "topic": "what makes a purpose lawful (not forbidden by law)"
+    },
+    "4.4": {
+        "requires": [r"\bconsent"],
+        "topic": "consent"
+    },
+    "4.5": {
+        "present": [[r"\blegitimate uses?\b", r"\bprocess"]],
+        "requires": [r"\blegitimate"],
+        "topic": "legitimate uses"
+    },
+    "5.1": {
+        "present": [[r"\b(?:request|seek)\w*\s+(?:for\s+)?(?:your\s+)?consent", r"\bnotice\b", r"\b(?:accompan|preced)"]],
+        "requires": [r"\bnotice\b"],
+        "topic": "a notice to the Data Principal"
+    },
+    "5.4": {
+        "requires": [WITHDRAWAL_PATTERN],
+        "topic": "withdrawing consent"
+    },
+    "5.5": {
+        "requires": [r"\bgrievance", r"\bcomplain", r"\bredress", r"\bdisputes?\b", r"\bconcerns?\b"],
+        "topic": "grievance redressal"
+    },
+    "5.6": {
+        "present": [[r"\bcomplain", r"data protection board"]],
+        "requires": [r"\bboard\b"],
+        "topic": "the Data Protection Board"
+    },
+    "5.7": {
+        "requires": [r"\bcommencement\b", r"(?:before|prior to) the (?:act|dpdpa)", r"consent (?:given|obtained|provided) (?:before|prior)"],
+        "topic": "consent obtained before the Act commenced"
+    },
+    "5.8": {
+        "requires": [r"\bcommencement\b", r"(?:before|prior to) the (?:act|dpdpa)", r"consent (?:given|obtained|provided) (?:before|prior)"],
+        "topic": "a notice for consent obtained before the Act commenced"
+    },
+    "5.9": {
+        "requires": [r"\bcommencement\b", r"(?:before|prior to) the (?:act|dpdpa)", r"consent (?:given|obtained|provided) (?:before|prior)"],
+        "topic": "a notice for consent obtained before the Act commenced"
+    },
+    "5.10": {
+        "requires": [r"\bcommencement\b", r"(?:before|prior to) the (?:act|dpdpa)", r"consent (?:given|obtained|provided) (?:before|prior)"],
+        "topic": "a notice for consent obtained before the Act commenced"
+    },
+    "5.11": {
+        "requires": [r"\bcommencement\b", r"(?:before|prior to) the (?:act|dpdpa)", r"consent (?:given|obtained|provided) (?:before|prior)"],
+        "topic": "a notice for consent obtained before the Act commenced"
+    },
+    "5.12": {
+        "requires": [r"\bcommencement\b", r"(?:before|prior to) the (?:act|dpdpa)", r"consent (?:given|obtained|provided) (?:before|prior)"],
+        "topic": "a notice for consent obtained before the Act commenced"
+    },
+    "5.14": {
+        "present": [[r"eighth schedule", r"\bnotice\b"]],
+        "requires": [r"eighth schedule", r"\blanguages?\b"],
+        "topic": "the languages the notice is available in"
+    },
+    "6.1": {
+        "present": [[r"\bfree\b", r"\bspecific\b", r"\binformed\b", r"\bunconditional\b", r"\bunambiguous\b", r"\baffirmative action\b"]],
+        "requires": [r"\bconsent"],
+        "topic": "consent"
+    },
+    "6.6": {
+        "present": [[r"eighth schedule", r"\bconsent"]],
+        "requires": [r"eighth schedule", r"\blanguages?\b"],
+        "topic": "the languages consent requests are available in"
+    },
+    "6.7": {
+        "present": [[r"data protection officer|\bDPO\b|grievance officer|privacy officer", CONTACT_PATTERN]],
+        "requires": [CONTACT_PATTERN, r"\bcontact\b"],
+        "topic": "contact details for privacy queries"
+    },
+    "6.8": {
+        "present": [[r"\b(?:withdr[ae]w|revok)\w*\s+(?:your\s+|her\s+|their\s+)?consent", r"\b(?:at )?any ?time\b"]],
+        "requires": [WITHDRAWAL_PATTERN],
+        "topic": "withdrawing consent"
+    },
+    "6.9": {
+        "present": [[WITHDRAWAL_PATTERN, r"\bas eas(?:y|ily) as\b|\bsame ease\b"]],
+        "requires": [WITHDRAWAL_PATTERN],
+        "topic": "withdrawing consent"
+    },
+    "6.10": {
+        "present": [[r"\bconsequences?\b", WITHDRAWAL_PATTERN, r"\bborne\b"]],
+        "requires": [WITHDRAWAL_PATTERN],
+        "topic": "withdrawing consent"
+    },
+    "6.11": {
+        "present": [[WITHDRAWAL_PATTERN, r"\b(?:does|do|shall|will) not affect\b", r"\b(?:lawful|legal)"]],
+        "negation_ok": True,
+        "requires": [WITHDRAWAL_PATTERN],
+        "topic": "withdrawing consent"
+    },
+    "6.12": {
+        "requires": [WITHDRAWAL_PATTERN],
+        "topic": "withdrawing consent"
+    },
+    "6.13": {
+        "present": [[r"consent managers?\b", r"\b(?:manage[ds]?|managing|review\w*|withdr[ae]w\w*|revok\w*)\b"]],
+        "requires": [r"consent managers?\b"],
+        "topic": "Consent Managers"
+    },
+    "6.14": {
+        "present": [[r"consent managers?\b", r"\baccountable\b", r"\bbehalf\b"]],
+        "requires": [r"consent managers?\b"],
+        "topic": "Consent Managers"
+    },
+    "6.15": {
+        "present": [[r"consent managers?\b", r"\bregist", r"\bboard\b"]],
+        "requires": [r"consent managers?\b"],
+        "topic": "Consent Managers"
+    },
+    "6.16": {
+        "requires": [r"\bprove\b", r"\bproof\b", r"\bdemonstrat", r"\bburden\b"],
+        "topic": "proving that notice was given and consent obtained"
+    },
+    "7.2": {
+        "requires": [r"\bsubsid", r"\bbenefits?\b", r"\bcertificate", r"\blicen[cs]e", r"\bpermit\b"],
+        "topic": "subsidies, benefits, certificates, licences or permits"
+    },
+    "7.3": {
+        "requires": [r"\bdatabases?\b", r"\bdigiti[sz]ed\b", r"\bregister\b"],
+        "topic": "government databases"
+    },
+    "7.4": {
+        "requires": [r"\bsovereignty\b", r"\bsecurity of the state\b", r"\bstate security\b", r"\blegal function", r"\bstate\b.*\binstrumentalit"],
+        "topic": "processing by the State for legal functions or security"
+    },
+    "7.6": {
+        "requires": [r"\bjudge?ments?\b", r"\bdecree", r"\bcourt\b", r"\border\b"],
+        "topic": "judgments, decrees or orders"
+    },
+    "7.7": {
+        "requires": [r"\bmedical\b", r"\bemergenc", r"\bthreat to (?:the )?life\b"],
+        "topic": "medical emergencies"
+    },
+    "7.8": {
+        "requires": [r"\bepidemic", r"\boutbreak", r"\bpandemic", r"\bpublic health\b"],
+        "topic": "epidemics or threats to public health"
+    },
+    "7.9": {
+        "requires": [r"\bdisasters?\b", r"\bpublic order\b"],
+        "topic": "disasters or breakdown of public order"
+    },
+    "7.10": {
+        "present": [[r"disaster management act,?\s*(?:of\s*)?2005", r"\b(?:defin|meaning|section 2\s*\(d\)|2\s*\(d\))"]],
+        "requires": [r"disaster management act"],
+        "topic": "the Disaster Management Act, 2005"
+    },
+    "7.11": {
+        "requires": [r"\bemploy"],
+        "topic": "employment purposes"
+    },
+    "8.2": {
+        "present": [[r"\bdata processors?\b", r"\b(?:only|valid)\b", r"\bcontract"]],
+        "requires": [r"\bprocessors?\b", r"\bthird[- ]part", r"\bvendors?\b", r"\bservice providers?\b"],
+        "topic": "Data Processors or other third parties"
+    },
+    "8.6": {
+        "present": [[r"\b(?:reasonable|appropriate) security safeguards?\b", r"\bbreach", r"\bprocessors?\b"]],
+        "requires": [r"\bsecur", r"\bsafeguard", r"\bencrypt"],
+        "topic": "security safeguards"
+    },
+    "8.7": {
+        "present": [[r"\bbreach", r"\b(?:data protection )?board\b", r"\b(?:inform|notif|intimat)", r"\b(?:data principals?|affected|users?|you)\b"]],
+        "requires": [r"\bbreach"],
+        "topic": "personal data breaches"
+    },
+    "8.8": {
+        "requires": [r"\beras", r"\bdelet", r"\bretain", r"\bretention\b", r"\bdestr[ou]", r"\bremov", r"\banonymi[sz]"],
+        "topic": "erasure or retention of personal data"
+    },
+    "8.9": {
+        "requires": [r"\bprocessors?\b", r"\bthird[- ]part", r"\bvendors?\b", r"\bservice providers?\b"],
+        "topic": "Data Processors or other third parties"
+    },
+    "8.11": {
+        "present": [[r"data protection officer|\bDPO\b|grievance officer|privacy officer|authori[sz]ed (?:person|representative)", CONTACT_PATTERN]],
+        "requires": [CONTACT_PATTERN, r"\bcontact\b"],
+        "topic": "business contact details"
+    },
+    "8.12": {
+        "present": [[r"\bgrievance", r"\b(?:officer|redress|mechanism|raise|lodge|file)"]],
+        "requires": [r"\bgrievance", r"\bcomplain", r"\bredress", r"\bdisputes?\b", r"\bconcerns?\b"],
+        "topic": "grievance redressal"
+    },
+    "9.1": {
+        "present": [[r"\bverifiable\b", r"\bconsent", r"\bparent", r"\bchild|\bminors?\b|\bunder (?:the age of )?(?:18|eighteen)\b"]],
+        "requires": [r"\bparent", r"\bguardian"],
+        "topic": "parental consent for children's data"
+    },
+    "9.2": {
+        "requires": [r"\bguardian", r"\bdisabilit"],
+        "topic": "consent of lawful guardians of persons with disability"
+    },
+    "9.3": {
+        "requires": [r"\bverif", r"\bconfirm", r"\bauthenticat", r"\bvalidat"],
+        "topic": "verifying parental consent"
+    },
+    "9.4": {
+        "requires": [r"\bchild", r"\bminors?\b", r"\bkids?\b", r"\bunder (?:the age of )?(?:13|16|18|eighteen)\b", r"\bunder ?age\b"],
+        "topic": "children's data"
+    },
+    "9.5": {
+        "present": [[r"\b(?:track|behaviou?ral monitoring)", r"\bchild", r"\b(?:not|never|no)\b"]],
+        "negation_ok": True,
+        "requires": [r"\bchild", r"\bminors?\b", r"\bkids?\b", r"\bunder (?:the age of )?(?:13|16|18|eighteen)\b", r"\bunder ?age\b"],
+        "topic": "children's data"
+    },
+    "9.6": {
+        "present": [[r"\btargeted advertis", r"\bchild", r"\b(?:not|never|no)\b"]],
+        "negation_ok": True,
+        "requires": [r"\bchild", r"\bminors?\b", r"\bkids?\b", r"\bunder (?:the age of )?(?:13|16|18|eighteen)\b", r"\bunder ?age\b"],
+        "topic": "children's data"
+    },
+    "10.1": {
+        "requires": [r"significant data fiduciar"],
+        "topic": "Significant Data Fiduciary status"
+    },
+    "10.2": {
+        "requires": [r"data protection officer|\bDPO\b|privacy officer|grievance officer"],
+        "topic": "a Data Protection Officer"
+    },
+    "10.3": {
+        "requires": [r"data protection officer|\bDPO\b|privacy officer|grievance officer"],
+        "topic": "a Data Protection Officer"
+    },
+    "10.4": {
+        "requires": [r"data protection officer|\bDPO\b|privacy officer|grievance officer"],
+        "topic": "a Data Protection Officer"
+    },
+    "10.5": {
+        "present": [[r"\bindependent data auditor", r"\b(?:appoint|engag)"]],
+        "requires": [r"\baudit"],
+        "topic": "data audits"
+    },
+    "10.6": {
+        "present": [[r"data protection impact assessments?|\bDPIA\b", r"\bperiodic"]],
+        "requires": [r"impact assessment", r"\bDPIA\b"],
+        "topic": "Data Protection Impact Assessments"
+    },
+    "10.7": {
+        "requires": [r"\baudit"],
+        "topic": "data audits"
+    }
+}
+
+# --- Prompt Generator ---
+# Bump whenever the prompt wording changes so cached results are not reused.
+PROMPT_VERSION = "1"
+
+def create_full_policy_prompt(section_id, full_policy_text, checklist, excerpt_mode=False, confidence=False, part=None):
+    # ``part`` is (number, count, start, end) when only one window of a long policy is sent
+    checklist_text = checklist_registry.render(section_id, checklist)
+    if excerpt_mode:
+        policy_heading = "**Relevant Policy Excerpts** (each prefixed with its character offsets in the full policy):"
+        search_scope = "search all of the excerpts above"
+        citation = "Cite the supporting excerpt offsets (e.g. [chars 120-480]) in each Justification."
+    elif part:
+        number, count, start, end = part
+        policy_heading = f"**Policy Text, part {number} of {count} (chars {start}-{end}):**"
+        search_scope = (
+            "search this part of the policy only (the other parts are evaluated separately, "
+            "so mark an item Missing if this part does not address it)"
+        )
+        citation = "Quote or paraphrase the supporting text in each Justification."
+    else:
+        policy_heading = "**Full Policy Text:**"
+        search_scope = "search anywhere in the policy"
+        citation = ""
+    if confidence:
+        confidence_instruction = (
+            "Also rate your Confidence in each classification from 0.0 (guess) to 1.0 (certain); "
+            "use a low value whenever the wording is ambiguous or only indirectly related."
+        )
+        confidence_field = '\n          "Confidence": 0.9,'
+    else:
+        confidence_instruction = confidence_field = ""
+
+    return f"""
+    You are a compliance analyst evaluating whether the following full privacy policy meets DPDPA Section {section_id}: {dpdpa_checklists[section_id]['title']}.
+    
+    **Checklist:** Use the item numbers (e.g., 4.1, 4.2...) from the checklist below in your response. Do not rephrase or modify the checklist items. Evaluate strictly based on the original items.
+    
+    {checklist_text}
+    
+    {policy_heading}
+    {full_policy_text}
+    
+    Instructions:
+    For each checklist item, {search_scope} and classify it as:
+    - Explicitly Mentioned
+    - Partially Mentioned
+    - Missing
+    {citation}
+    {confidence_instruction}
+    Return output in this JSON format only:
+    {{
+      "Checklist Evaluation": [
+        {{
+          "Checklist Item ID": "4.1",
+          "Status": "Explicitly Mentioned",{confidence_field}
+          "Justification": "..."
+        }},
+        ...
+      ],
+      "Match Level": "Fully Compliant / Partially Compliant / Non-Compliant",
+      "Compliance Score": 0.0,
+      "Suggested Rewrite": "...",
+      "Simplified Legal Meaning": "..."
+    }}
+    
+    Only return the JSON object. Do not include any commentary or explanation.
+    """
+def create_multi_section_prompt(section_ids, full_policy_text, checklists=None):
+    # ``checklists`` narrows a section to the items still to evaluate (default: all of them)
+    checklists = checklists or {}
+    section_items = {sid: checklists.get(sid) or dpdpa_checklists[sid]["items"] for sid in section_ids}
+    checklists_text = "\n\n".join(
+        f"Section {sid}: {dpdpa_checklists[sid]['title']}\n" + checklist_registry.render(sid, section_items[sid])
+        for sid in section_ids
+    )
+    section_list = ", ".join(section_ids)
+
+    return f"""
+    You are a compliance analyst evaluating whether the following full privacy policy meets DPDPA Sections {section_list}.
+    
+    **Checklists:** Use the item numbers (e.g., 4.1, 4.2...) from the checklists below in your response. Do not rephrase or modify the checklist items. Evaluate strictly based on the original items.
+    
+    {checklists_text}
+    
+    **Full Policy Text:**
+    {full_policy_text}
+    
+    Instructions:
+    For each checklist item in every section, search anywhere in the policy and classify it as:
+    - Explicitly Mentioned
+    - Partially Mentioned
+    - Missing
+    
+    Return output in this JSON format only, with one entry per section number ({section_list}):
+    {{
+      "Sections": {{
+        "{section_ids[0]}": {{
+          "Checklist Evaluation": [
+            {{
+              "Checklist Item ID": "{section_items[section_ids[0]][0]['id']}",
+              "Status": "Explicitly Mentioned",
+              "Justification": "..."
+            }},
+            ...
+          ],
+          "Match Level": "Fully Compliant / Partially Compliant / Non-Compliant",
+          "Compliance Score": 0.0,
+          "Suggested Rewrite": "...",
+          "Simplified Legal Meaning": "..."
+        }},
+        ...
+      }}
+    }}
+    
+    Only return the JSON object. Do not include any commentary or explanation.
+    """
+
+# --- Token Budgeting ---
+# Context window sizes used to decide when a batched prompt must be split.
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+def estimate_reply_tokens(item_count):
+    # Allow ~80 reply tokens per checklist item plus rewrite/meaning text per section
+    return 80 * item_count + 400
+
+def estimate_batch_tokens(section_ids, policy_text):
+    prompt_tokens = estimate_tokens(create_multi_section_prompt(section_ids, policy_text))
+    return prompt_tokens + sum(estimate_reply_tokens(len(dpdpa_checklists[sid]["items"])) for sid in section_ids)
+
+def section_policy_token_budget(section_id, items, model):
+    """Policy tokens that fit in one section prompt next to its instructions and reply."""
+    overhead = estimate_tokens(create_full_policy_prompt(section_id, "", items, part=(1, 1, 0, 0)))
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS) - overhead - estimate_reply_tokens(len(items))
+
+def exceeds_context(section_id, items, policy_text, model):
+    return estimate_tokens(policy_text) > section_policy_token_budget(section_id, items, model)
+
+# --- GPT Call ---
+# Completion tokens reserved from the tokens/min budget until the real usage is known
+COMPLETION_TOKEN_ALLOWANCE = 1000
+
+JSON_REPAIR_PROMPT = (
+    "Your previous reply was not valid JSON in the requested format. Return the same answer as one valid "
+    "JSON object only, in exactly the requested format, with no code fences, commentary or explanation."
+)
+
+# Models that rejected a response_format, so later calls skip it straight away
+_models_without_response_format = set()
+
+def chat_completion(messages, model=None, temperature=0, response_format=None, stream=False):
+    """Send one chat completion through the rate-limiting, retrying request scheduler.
+
+    With ``stream=True`` the SDK stream is returned; only opening it is retried.
+    """
+    model = model_for("evaluation", model)
+    estimated_tokens = sum(estimate_tokens(m["content"]) for m in messages) + COMPLETION_TOKEN_ALLOWANCE
+    # The scheduler owns retries, so the SDK's built-in ones are switched off
+    api = get_client().with_options(max_retries=0)
+    options = {"response_format": response_format} if response_format else {}
+    if stream:
+        # Ask for a final usage chunk so streamed drafts are metered too
+        options.update(stream=True, stream_options={"include_usage": True})
+
+    report = {}
+    started = time.perf_counter()
+    try:
+        response = scheduler.run(
+            lambda timeout: api.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                timeout=timeout,
+                **options
+            ),
+            estimated_tokens,
+            report
+        )
+    except Exception as e:
+        telemetry.record_call(model, latency_seconds=time.perf_counter() - started, retries=report.get("retries", 0), error=e)
+        raise
+    if stream:
+        return _metered_stream(response, model, started, report.get("retries", 0), scheduler, estimated_tokens)
+    telemetry.record_call(model, response.usage, time.perf_counter() - started, report.get("retries", 0))
+    return response
+
+def _metered_stream(stream, model, started, retries, request_scheduler, estimated_tokens):
+    usage, error = None, None
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            yield chunk
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        request_scheduler.settle(estimated_tokens, usage)
+        telemetry.record_call(model, usage, time.perf_counter() - started, retries, error=error)
+
+def call_gpt(prompt, model=None, schema=None, schema_name="evaluation", validator=None, task="evaluation"):
+    """Return the model's JSON reply as a dict.
+
+    Uses structured outputs / JSON mode when the model supports them and falls
+    back to tolerant extraction from free text. A reply that cannot be parsed or
+    fails ``validator`` gets one repair re-prompt naming the problem. ``task``
+    picks the default model and the sampling temperature.
+    """
+    model = model_for(task, model)
+    temperature = TASK_TEMPERATURES[task]
+    messages = [{"role": "user", "content": prompt}]
+    response_format = None
+    if schema is not None and model not in _models_without_response_format:
+        response_format = response_format_for(model, schema_name, schema)
+
+    try:
+        response = chat_completion(messages, model=model, temperature=temperature, response_format=response_format)
+    except openai.BadRequestError as e:
+        if response_format is None or "response_format" not in str(e):
+            raise
+        _models_without_response_format.add(model)
+        response_format = None
+        response = chat_completion(messages, model=model, temperature=temperature)
+
+    content = response.choices[0].message.content or ""
+    try:
+        data = extract_json(content)
+        return validator(data) if validator else data
+    except ValueError as e:
+        # One repair round trip is far cheaper than re-running the whole section
+        messages = messages + [
+            {"role": "assistant", "content": content},
+            {"role": "user", "content": f"{JSON_REPAIR_PROMPT} Problem: {e}"}
+        ]
+        response = chat_completion(messages, model=model, temperature=temperature, response_format=response_format)
+        data = extract_json(response.choices[0].message.content)
+        return validator(data) if validator else data
+    
+def call_gpt_text(prompt, model=None, task="drafting"):
+    response = chat_completion(
+        [{"role": "user", "content": prompt}], model=model_for(task, model), temperature=TASK_TEMPERATURES[task]
+    )
+    return response.choices[0].message.content.strip()
+
+def stream_gpt_text(prompt, model=None, task="drafting"):
+    """Yield the drafted text piece by piece as the model generates it."""
+    stream = chat_completion(
+        [{"role": "user", "content": prompt}], model=model_for(task, model), temperature=TASK_TEMPERATURES[task], stream=True
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def error_section_result(section_id, error):
+    return {
+        "Section": section_id,
+        "Title": dpdpa_checklists[section_id]['title'],
+        "Error": str(error),
+        "Match Level": "Error",
+        "Compliance Score": 0.0,
+        "Matched Details": [],
+        "Checklist Items Matched": [],
+        "Suggested Rewrite": "",
+        "Simplified Legal Meaning": ""
+    }
+
+def build_section_result(section_id, checklist, result):
+    checklist_dict = checklist_registry.texts(section_id, checklist)
+    evaluations = []
+
+    matched_count = 0
+    partial_count = 0
+
+    for item in result.get("Checklist Evaluation", []):
+        item_id = item.get("Checklist Item ID", "").strip()
+        status = item.get("Status", "Missing").strip()
+        justification = item.get("Justification", "").strip()
+        text = checklist_dict.get(item_id, "❓")
+
+        if status == "Explicitly Mentioned":
+            matched_count += 1
+        elif status == "Partially Mentioned":
+            partial_count += 1
+
+        evaluations.append({
+            "Checklist Item ID": item_id,
+            "Checklist Text": text,
+            "Status": status,
+            "Justification": justification
+        })
+
+    score = (matched_count + 0.5 * partial_count) / len(checklist) if checklist else 0
+    level = (
+        "Fully Compliant" if score == 1 else
+        "Non-Compliant" if score == 0 else
+        "Partially Compliant"
+    )
+
+    return {
+        "Section": section_id,
+        "Title": dpdpa_checklists[section_id]['title'],
+        "Match Level": result.get("Match Level", level),
+        "Compliance Score": round(score, 2),
+        "Matched Details": evaluations,
+        "Checklist Items Matched": [f"{e['Checklist Item ID']} — {e['Checklist Text']}" for e in evaluations if e["Status"] in ["Explicitly Mentioned", "Partially Mentioned"]],
+        "Suggested Rewrite": result.get("Suggested Rewrite", ""),
+        "Simplified Legal Meaning": result.get("Simplified Legal Meaning", "")
+    }
+
+def uses_cascade(section_id, cascade=None):
+    """Whether a section is evaluated through the triage cascade; ``None`` defers to CASCADE_SECTIONS."""
+    return str(section_id) in CASCADE_SECTIONS if cascade is None else bool(cascade)
+
+def section_prompt_version(checklist, retrieval_top_k=None, prescreen=False, cascade=False):
+    """Cache key version for a section result, distinguishing retrieval, pre-screen and cascade runs.
+
+    Only the pre-screen rules of ``checklist``'s own items are fingerprinted, so
+    editing one section's rules leaves the other sections' cached results valid.
+    """
+    version = PROMPT_VERSION
+    if retrieval_top_k:
+        version += f"-retrieval-t{TOKENIZER_VERSION}-k{retrieval_top_k}"
+    if prescreen:
+        rules = {item["id"]: prescreen_rules[item["id"]] for item in checklist if item["id"] in prescreen_rules}
+        version += f"-prescreen-{rules_fingerprint(rules)}"
+    if cascade:
+        version += f"-cascade-{model_for('triage')}-{CASCADE_CONFIDENCE_THRESHOLD}"
+    return version
+
+def build_screened_result(section_id, checklist, resolved, reply):
+    """Merge pre-screened verdicts with a GPT reply covering the remaining items."""
+    if not resolved:
+        return build_section_result(section_id, checklist, reply)
+
+    answered = {e.get("Checklist Item ID", "").strip(): e for e in reply.get("Checklist Evaluation", [])}
+    # The reply's Match Level only covered the GPT items, so let the merged score decide it
+    merged = {key: value for key, value in reply.items() if key != "Match Level"}
+    merged["Checklist Evaluation"] = [
+        resolved.get(item["id"]) or answered[item["id"]]
+        for item in checklist if item["id"] in resolved or item["id"] in answered
+    ]
+    section_result = build_section_result(section_id, checklist, merged)
+    section_result["Pre-screened Items"] = [item["id"] for item in checklist if item["id"] in resolved]
+    return section_result
+
+def request_section_reply(section_id, items, policy_text, model, retrieval_top_k=None, confidence=False, task="evaluation"):
+    """Ask ``model`` to classify ``items``; with ``confidence`` each verdict also carries a Confidence."""
+    if retrieval_top_k:
+        excerpts = format_passages(select_passages(policy_text, items, top_k=retrieval_top_k))
+        prompt = create_full_policy_prompt(section_id, excerpts, items, excerpt_mode=True, confidence=confidence)
+    else:
+        prompt = create_full_policy_prompt(section_id, policy_text, items, confidence=confidence)
+
+    with llm_feature(f"compliance:section-{section_id}"):
+        return call_gpt(
+            prompt,
+            model=model,
+            schema=CONFIDENCE_SECTION_REPLY_SCHEMA if confidence else SECTION_REPLY_SCHEMA,
+            schema_name="checklist_evaluation",
+            validator=validate_section_reply,
+            task=task
+        )
+
+# --- Long-Policy Map-Reduce ---
+# Overlap between consecutive windows so a clause cut at a boundary is seen whole
+CHUNK_OVERLAP_TOKENS = 200
+STATUS_RANK = {"Explicitly Mentioned": 2, "Partially Mentioned": 1, "Missing": 0}
+
+def reduce_chunk_replies(items, chunk_replies):
+    """Merge per-window replies into one section reply: the best evidence wins.
+
+    For each item the strongest status across windows is kept (earliest window
+    on ties) and its justification is prefixed with that window's character
+    range. The rewrite and summary come from the window that supplied the most
+    winning verdicts.
+    """
+    best = {}
+    for window, reply in chunk_replies:
+        for entry in reply["Checklist Evaluation"]:
+            item_id = entry["Checklist Item ID"].strip()
+            if item_id not in best or STATUS_RANK[entry["Status"]] > STATUS_RANK[best[item_id][1]["Status"]]:
+                best[item_id] = (window, entry)
+
+    evaluations, contributions = [], {}
+    for item in items:
+        if item["id"] not in best:
+            continue
+        window, entry = best[item["id"]]
+        if entry["Status"] == "Missing":
+            justification = f"Not addressed in any of the {len(chunk_replies)} parts of the policy."
+        else:
+            justification = f"[chars {window['start']}-{window['end']}] {entry.get('Justification', '')}"
+            contributions[window["start"]] = contributions.get(window["start"], 0) + 1
+        evaluations.append(dict(entry, Justification=justification))
+
+    lead = max(chunk_replies, key=lambda pair: contributions.get(pair[0]["start"], 0))[1]
+    return {
+        "Checklist Evaluation": evaluations,
+        "Suggested Rewrite": lead.get("Suggested Rewrite", ""),
+        "Simplified Legal Meaning": lead.get("Simplified Legal Meaning", "")
+    }
+
+def map_reduce_section_reply(section_id, items, policy_text, model, chunk_tokens=None):
+    """Evaluate ``items`` over overlapping, token-bounded windows of the policy and reduce per item.
+
+    Windows are evaluated one after another: this runs inside a section worker,
+    so the caller's pool already bounds how many requests are in flight.
+    Returns the reduced reply and the number of windows. Any failed window
+    fails the whole section, since a missing window could hide evidence.
+    """
+    chunk_tokens = chunk_tokens or section_policy_token_budget(section_id, items, model)
+    if chunk_tokens <= 2 * CHUNK_OVERLAP_TOKENS:
+        raise ValueError(f"The {model} context window is too small to evaluate Section {section_id} in parts.")
+    windows = chunk_policy_windows(policy_text, max_chars=4 * chunk_tokens, overlap_chars=4 * CHUNK_OVERLAP_TOKENS)
+
+    def evaluate_window(number, window):
+        prompt = create_full_policy_prompt(
+            section_id, window["text"], items, part=(number, len(windows), window["start"], window["end"])
+        )
+        with llm_feature(f"compliance:section-{section_id}:chunk"):
+            return call_gpt(
+                prompt,
+                model=model,
+                schema=SECTION_REPLY_SCHEMA,
+                schema_name="checklist_evaluation",
+                validator=validate_section_reply
+            )
+
+    replies = [evaluate_window(number, window) for number, window in enumerate(windows, start=1)]
+    return reduce_chunk_replies(items, list(zip(windows, replies))), len(windows)
+
+def needs_escalation(entry, threshold=None):
+    threshold = CASCADE_CONFIDENCE_THRESHOLD if threshold is None else threshold
+    return entry is None or entry["Status"] == "Partially Mentioned" or entry.get("Confidence", 0.0) < threshold
+
+def cascade_section_reply(section_id, items, policy_text, model, retrieval_top_k=None):
+    """Evaluate ``items`` with the triage model and re-ask only the uncertain ones to ``model``.
+
+    Returns the merged reply and the ids of the escalated items. If the triage
+    call fails, every item is escalated.
+    """
+    try:
+        triage = request_section_reply(
+            section_id, items, policy_text, model_for("triage"), retrieval_top_k, confidence=True, task="triage"
+        )
+    except Exception:
+        triage = {"Checklist Evaluation": []}
+    answered = {e["Checklist Item ID"].strip(): e for e in triage["Checklist Evaluation"]}
+    escalated = [item for item in items if needs_escalation(answered.get(item["id"]))]
+    telemetry.record_escalation(section_id, len(items), len(escalated))
+    if not escalated:
+        return triage, []
+
+    reply = request_section_reply(section_id, escalated, policy_text, model, retrieval_top_k)
+    escalated_ids = [item["id"] for item in escalated]
+    answered.update({e["Checklist Item ID"].strip(): e for e in reply["Checklist Evaluation"]})
+    # The stronger model saw the hard items, so its rewrite and summary are kept; its
+    # Match Level only covered the escalated items, so the merged score decides that
+    reply.pop("Match Level", None)
+    reply["Checklist Evaluation"] = [answered[item["id"]] for item in items if item["id"] in answered]
+    return reply, escalated_ids
+
+def analyze_policy_section(section_id, checklist, policy_text, model=None, use_cache=True, retrieval_top_k=None, prescreen=True,
+                           cascade=None, policy_digest=None):
+    model = model_for("evaluation", model)
+    cascade = uses_cascade(section_id, cascade)
+    cache_key = make_cache_key(policy_text, section_id, checklist_registry.fingerprint_for(section_id, checklist), section_prompt_version(checklist, retrieval_top_k, prescreen, cascade), model, policy_digest)
+    if use_cache and result_cache is not None:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            telemetry.record_cache_hit(model, feature=f"compliance:section-{section_id}")
+            return cached
+
+    resolved, remaining = {}, checklist
+    if prescreen:
+        resolved, remaining = prescreen_checklist(policy_text, checklist, prescreen_rules)
+
+    escalated = chunks = None
+    try:
+        if not remaining:
+            result = {"Suggested Rewrite": "", "Simplified Legal Meaning": ""}
+        elif not retrieval_top_k and exceeds_context(section_id, remaining, policy_text, model):
+            # Too long for one prompt: map-reduce over windows of the policy instead
+            result, chunks = map_reduce_section_reply(section_id, remaining, policy_text, model)
+        elif cascade:
+            result, escalated = cascade_section_reply(section_id, remaining, policy_text, model, retrieval_top_k)
+        else:
+            result = request_section_reply(section_id, remaining, policy_text, model, retrieval_top_k)
+    except Exception as e:
+        return error_section_result(section_id, e)
+
+    section_result = build_screened_result(section_id, checklist, resolved, result)
+    if escalated is not None:
+        section_result["Escalated Items"] = escalated
+    if chunks is not None:
+        section_result["Policy Parts"] = chunks
+    if result_cache is not None:
+        result_cache.set(cache_key, section_result)
+    return section_result
+
+def analyze_policy_section_incremental(section_id, checklist, policy_text, previous_text, previous_result,
+                                       model=None, use_cache=True, retrieval_top_k=None, evidence_top_k=3,
+                                       prescreen=True, policy_digest=None):
+    """Re-evaluate only the checklist items an edit could have affected.
+
+    Paragraphs of ``policy_text`` are diffed against ``previous_text``. Items
+    whose evidence passages changed, and items missing from ``previous_result``,
+    are sent to GPT; the previous verdicts are reused for everything else and
+    the section score is recomputed from the merged verdicts.
+    """
+    model = model_for("evaluation", model)
+    if not previous_result or previous_result.get("Match Level") == "Error":
+        return analyze_policy_section(section_id, checklist, policy_text, model, use_cache, retrieval_top_k, prescreen,
+                                      policy_digest=policy_digest)
+
+    previous = {e["Checklist Item ID"]: e for e in previous_result["Matched Details"]}
+    touched = set(items_touched_by_edit(previous_text, policy_text, checklist, top_k=evidence_top_k))
+    touched.update(item["id"] for item in checklist if item["id"] not in previous)
+    if len(touched) == len(checklist):
+        return analyze_policy_section(section_id, checklist, policy_text, model, use_cache, retrieval_top_k, prescreen,
+                                      policy_digest=policy_digest)
+
+    reply = {
+        "Suggested Rewrite": previous_result.get("Suggested Rewrite", ""),
+        "Simplified Legal Meaning": previous_result.get("Simplified Legal Meaning", "")
+    }
+    fresh, screened = {}, []
+    if touched:
+        subset = [item for item in checklist if item["id"] in touched]
+        partial = analyze_policy_section(section_id, subset, policy_text, model, use_cache, retrieval_top_k, prescreen,
+                                         policy_digest=policy_digest)
+        if partial.get("Match Level") == "Error":
+            return partial
+        fresh = {e["Checklist Item ID"]: e for e in partial["Matched Details"]}
+        screened = partial.get("Pre-screened Items", [])
+        reply["Suggested Rewrite"] = partial.get("Suggested Rewrite") or reply["Suggested Rewrite"]
+
+    reply["Checklist Evaluation"] = [
+        fresh.get(item["id"]) or previous[item["id"]]
+        for item in checklist if item["id"] in fresh or item["id"] in previous
+    ]
+    section_result = build_section_result(section_id, checklist, reply)
+    section_result["Re-evaluated Items"] = [item["id"] for item in checklist if item["id"] in fresh]
+    if screened:
+        section_result["Pre-screened Items"] = screened
+    # The merged result is not cached: reused verdicts were judged against the
+    # previous text, so it must not stand in for a full check of this one.
+    return section_result
+
+def reanalyze_sections_incrementally(section_ids, policy_text, baselines, model=None,
+                                     max_workers=None, use_cache=True, retrieval_top_k=None, prescreen=True):
+    """Incremental counterpart of analyze_sections_concurrently, yielding results as they complete.
+
+    ``baselines`` maps section ids to {"policy_text", "result"} from the last
+    evaluation; sections without a baseline are evaluated in full.
+    """
+    max_workers = max(1, min(max_workers or MAX_CONCURRENT_SECTIONS, len(section_ids)))
+    digest = policy_hash(policy_text)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        for sid in section_ids:
+            baseline = baselines.get(sid) or {}
+            futures.append(executor.submit(
+                analyze_policy_section_incremental, sid, dpdpa_checklists[sid]["items"], policy_text,
+                baseline.get("policy_text", ""), baseline.get("result"), model, use_cache, retrieval_top_k,
+                prescreen=prescreen, policy_digest=digest
+            ))
+        for future in as_completed(futures):
+            yield future.result()
+
+def analyze_section_batch(section_ids, policy_text, model=None, prescreen=True, policy_digest=None):
+    """Evaluate several sections with one GPT call and split the reply per section.
+
+    Sections whose items are all resolved by the pre-screen are left out of the
+    combined prompt; when none remain, no GPT call is made.
+    """
+    model = model_for("evaluation", model)
+    policy_digest = policy_digest or policy_hash(policy_text)
+    screened = {}
+    for sid in section_ids:
+        checklist = dpdpa_checklists[sid]["items"]
+        screened[sid] = prescreen_checklist(policy_text, checklist, prescreen_rules) if prescreen else ({}, checklist)
+    asked = [sid for sid in section_ids if screened[sid][1]]
+
+    section_replies, failure = {}, None
+    if asked:
+        prompt = create_multi_section_prompt(asked, policy_text, {sid: screened[sid][1] for sid in asked})
+        try:
+            with llm_feature("compliance:batch"):
+                combined = call_gpt(
+                    prompt,
+                    model=model,
+                    schema=multi_section_schema(asked),
+                    schema_name="multi_section_evaluation",
+                    validator=multi_section_validator(asked)
+                )
+            section_replies = combined.get("Sections", {})
+        except Exception as e:
+            failure = e
+
+    results = []
+    for sid in section_ids:
+        checklist = dpdpa_checklists[sid]["items"]
+        resolved, remaining = screened[sid]
+        if not remaining:
+            reply = {"Suggested Rewrite": "", "Simplified Legal Meaning": ""}
+        elif failure is not None:
+            results.append(error_section_result(sid, failure))
+            continue
+        else:
+            reply = section_replies.get(sid)
+            if not isinstance(reply, dict):
+                results.append(error_section_result(sid, f"Section {sid} missing from batched response"))
+                continue
+        section_result = build_screened_result(sid, checklist, resolved, reply)
+        if result_cache is not None:
+            cache_key = make_cache_key(policy_text, sid, checklist_registry.fingerprint_for(sid, checklist), section_prompt_version(checklist, prescreen=prescreen, cascade=False), model, policy_digest)
+            result_cache.set(cache_key, section_result)
+        results.append(section_result)
+    return results
+
+def plan_section_batches(section_ids, policy_text, model=None):
+    """Greedily group sections so each combined prompt plus its reply fits the context window."""
+    model = model_for("evaluation", model)
+    budget = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+    batches, current = [], []
+    for sid in section_ids:
+        candidate = current + [sid]
+        if current and estimate_batch_tokens(candidate, policy_text) > budget:
+            batches.append(current)
+            candidate = [sid]
+        current = candidate
+    if current:
+        batches.append(current)
+    return batches
+
+def analyze_sections_batched(section_ids, policy_text, model=None, max_workers=None, use_cache=True, prescreen=True):
+    """Evaluate sections by sending the policy once per batch, yielding results as they complete.
+
+    Cascade sections are evaluated on their own, since the combined prompt has
+    no triage step.
+    """
+    model = model_for("evaluation", model)
+    digest = policy_hash(policy_text)
+    pending, single = [], []
+    for sid in section_ids:
+        if uses_cascade(sid):
+            single.append(sid)
+            continue
+        checklist = dpdpa_checklists[sid]["items"]
+        cached = None
+        if use_cache and result_cache is not None:
+            cached = result_cache.get(make_cache_key(policy_text, sid, checklist_registry.fingerprint_for(sid, checklist), section_prompt_version(checklist, prescreen=prescreen, cascade=False), model, digest))
+        if cached is not None:
+            telemetry.record_cache_hit(model, feature=f"compliance:section-{sid}")
+            yield cached
+        else:
+            pending.append(sid)
+    if not pending and not single:
+        return
+
+    batches = plan_section_batches(pending, policy_text, model) if pending else []
+    # A batch of one gains nothing from the combined prompt
+    single += [batch[0] for batch in batches if len(batch) == 1]
+    batches = [batch for batch in batches if len(batch) > 1]
+    max_workers = max(1, min(max_workers or MAX_CONCURRENT_SECTIONS, len(batches) + len(single)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(analyze_section_batch, batch, policy_text, model, prescreen, digest) for batch in batches]
+        for sid in single:
+            futures.append(executor.submit(
+                lambda sid=sid: [analyze_policy_section(sid, dpdpa_checklists[sid]["items"], policy_text, model, use_cache,
+                                                        prescreen=prescreen, policy_digest=digest)]
+            ))
+        for future in as_completed(futures):
+            yield from future.result()
+
+def analyze_sections_concurrently(section_ids, policy_text, model=None, max_workers=None, use_cache=True, retrieval_top_k=None, prescreen=True):
+    """Evaluate several sections in parallel, yielding each result as soon as it completes."""
+    max_workers = max(1, min(max_workers or MAX_CONCURRENT_SECTIONS, len(section_ids)))
+    digest = policy_hash(policy_text)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(analyze_policy_section, sid, dpdpa_checklists[sid]["items"], policy_text, model, use_cache, retrieval_top_k, prescreen,
+                            policy_digest=digest)
+            for sid in section_ids
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+def evaluate_policy(policy_text, section_ids=None, model=None, batched=False, use_cache=True, retrieval_top_k=None, max_workers=None,
+                    prescreen=True):
+    """Run every requested section (default: all) and return the results in section order."""
+    section_ids = list(section_ids or dpdpa_checklists)
+    if batched:
+        results = list(analyze_sections_batched(section_ids, policy_text, model, max_workers, use_cache, prescreen))
+    else:
+        results = list(analyze_sections_concurrently(section_ids, policy_text, model, max_workers, use_cache, retrieval_top_k, prescreen))
+    return sorted(results, key=lambda r: section_ids.index(r["Section"]))
+
+# --- Policy Generation ---
+lifecycle_options = {
+    "Data Collection": "Describe what data is collected, from whom, how, and with what consent.",
+    "Data Processing": "Explain the purpose and method of processing the data, along with any automation or profiling.",
+    "Data Storage": "Detail where data is stored, for how long, and the technical and organizational safeguards.",
+    "Data Sharing": "Outline what data is shared, with whom (internal or third party), and under what agreements."
+}
+
+def organization_details_block(details):
+    return f"""
+    **Organization Details**:
+    - Name: {details["org_name"]}
+    - Sector: {details["sector"]}
+    
+    **Data Handling**:
+    - Data Types Collected: {", ".join(details["data_types"])}
+    - Applicable to Children (<18): {details["children_data"]}
+    - Shared Internationally: {details["cross_border"]}
+    
+    **Legal Basis**:
+    - Lawful Purpose: {details["lawful_purpose"]}
+    - Consent Type: {details["consent_type"]}
+    - Special Use Cases (Sec 7): {details["special_uses"]}
+    
+    **Retention & Redressal**:
+    - Retention Period: {details["retention_period"]}
+    - Grievance Contact: {details["grievance_email"]}
+    """
+
+def create_policy_generation_prompt(details):
+    return f"""
+    You are a legal policy assistant. Draft a comprehensive, DPDPA-compliant {details["policy_type"].lower()} for the following organization.
+    {organization_details_block(details)}
+    **Compliance Requirements**:
+    Ensure the policy covers all obligations under the Digital Personal Data Protection Act, 2023 (India), including:
+    - Lawful purpose (Sec 4)
+    - Informed consent (Sec 6)
+    - Notice obligations (Sec 5)
+    - Grievance handling (Sec 10)
+    - Data accuracy (Sec 8.3)
+    - Security safeguards (Sec 8.5)
+    - Erasure after purpose is fulfilled or consent withdrawn (Sec 8.7)
+    - Special clauses for children (Sec 9) if applicable
+    - International transfer declaration (Sec 16)
+    
+    Write the policy in clear, professional English with practical sections like: Purpose, Scope, Data Types, Lawful Use, Consent, Security, Retention, Rights, Grievance Redressal, Contact.
+    
+    Return only the policy draft (no disclaimers or titles).
+    """
+
+def create_section_draft_prompt(section_id, section_title, instruction, context=""):
+    return f"""
+    You are a legal assistant drafting a policy section aligned with India's Digital Personal Data Protection Act (DPDPA), 2023.
+    
+    Draft a clear, compliant, and standalone section for:
+    
+    **DPDPA Section {section_id} – {section_title}**
+    
+    Instruction from user: "{instruction.strip()}"
+    
+    {f'Context: {context.strip()}' if context.strip() else ''}
+    
+    Write in plain legal English. Make it usable as-is inside a larger privacy policy.
+    Return only the section text. Do not include headings or disclaimers.
+    """
+
+def create_lifecycle_prompt(stage, instruction, context=""):
+    return f"""
+    You are a policy assistant generating a data privacy policy section for a specific lifecycle stage.
+    
+    **Lifecycle Stage**: {stage}
+    **Instruction**: {instruction.strip()}
+    {f"Context: {context.strip()}" if context.strip() else ''}
+    
+    The section should be written in professional, legally sound English and suitable for direct inclusion in a privacy or retention policy. Keep it DPDPA-aligned where applicable.
+    Only output the draft content, no explanations or headings.
+    """
+
+def create_custom_draft_prompt(instruction, sector="", scope="", category=""):
+    return f"""
+    You are a policy assistant helping a user draft a professional snippet of policy language.
+    
+    Instruction: {instruction.strip()}
+    
+    {f"Sector: {sector}" if sector else ''}
+    {f"Scope: {scope}" if scope else ''}
+    {f"Data Category: {category}" if category else ''}
+    
+    Write in clear, professional policy language. Avoid filler text, disclaimers, or general advice. Return only the content of the policy.
+    """
+
+def policy_generation_parts(include_children=False):
+    """Ordered parts of a section-by-section policy: DPDPA Sections 4-10, then lifecycle stages."""
+    parts = []
+    for sid, section in dpdpa_checklists.items():
+        if sid == "9" and not include_children:
+            continue
+        title = section["title"]
+        parts.append({
+            "key": f"section-{sid}",
+            "heading": f"{title} (DPDPA Section {sid})",
+            "instruction": f"Set out how the organization meets DPDPA Section {sid} – {title}."
+        })
+    for stage, instruction in lifecycle_options.items():
+        parts.append({
+            "key": f"lifecycle-{stage.lower().replace(' ', '-')}",
+            "heading": stage,
+            "instruction": instruction
+        })
+    return parts
+
+def create_policy_part_prompt(details, part, all_parts):
+    other_headings = ", ".join(p["heading"] for p in all_parts if p["key"] != part["key"])
+    return f"""
+    You are a legal policy assistant drafting one section of a DPDPA-compliant {details["policy_type"].lower()} for the following organization.
+    {organization_details_block(details)}
+    **Section to draft**: {part["heading"]}
+    **Instruction**: {part["instruction"]}
+    
+    Other sections of the policy are drafted separately ({other_headings}); do not repeat their content.
+    Write in clear, professional English aligned with the Digital Personal Data Protection Act, 2023 (India).
+    Return only the section body (no heading, disclaimers or titles).
+    """
+
+def draft_policy_part(details, part, all_parts, model=None):
+    with llm_feature("generator:full-policy-part"):
+        return call_gpt_text(create_policy_part_prompt(details, part, all_parts), model=model)
+
+def generate_policy_parts(details, parts, all_parts=None, model=None, max_workers=None):
+    """Draft policy parts concurrently, yielding (part, text, error) as each one finishes."""
+    all_parts = all_parts or parts
+    max_workers = max(1, min(max_workers or MAX_CONCURRENT_SECTIONS, len(parts)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(draft_policy_part, details, part, all_parts, model): part for part in parts}
+        for future in as_completed(futures):
+            part = futures[future]
+            try:
+                yield part, future.result(), None
+            except Exception as e:
+                yield part, None, e
+
+def assemble_policy(parts, texts):
+    """Join the drafted parts in plan order; parts without text are left out."""
+    return "\n\n".join(
+        f"## {part['heading']}\n\n{texts[part['key']]}"
+        for part in parts if texts.get(part["key"])
+    )
+
+# --- Knowledge Assistant ---
+KNOWLEDGE_PROMPT_VERSION = "1"
+
+def create_knowledge_prompt(question, passages):
+    context = "\n\n".join(
+        f"[{i}] ({p['source']} — {p['ref']})\n{p['text']}" for i, p in enumerate(passages, start=1)
+    )
+    return f"""
+    You are a DPDPA (Digital Personal Data Protection Act, 2023) knowledge assistant for privacy and compliance teams.
+
+    Answer the question using only the numbered reference passages below. Cite the passages you rely on as [1], [2], ...
+    If the passages do not answer the question, say so plainly instead of guessing.
+
+    **Reference Passages:**
+    {context}
+
+    **Question:** {question}
+
+    Keep the answer concise and practical.
+    """
+
+def extractive_answer(passages):
+    """Answer straight from the retrieved text when no model call is made."""
+    if not passages:
+        return "No relevant passages were found in the knowledge index."
+    return "\n\n".join(f"**[{i}] {p['source']} — {p['ref']}**\n\n{p['text']}" for i, p in enumerate(passages, start=1))
+
+def answer_knowledge_question(question, index, model=None, top_k=5, sources=None, use_llm=True, use_cache=True):
+    """Retrieve passages from a KnowledgeIndex and answer with one focused GPT call.
+
+    Falls back to the retrieved text itself when ``use_llm`` is off or the call
+    fails. GPT answers are cached per question, index build and retrieval
+    settings, so repeat questions cost nothing.
+    """
+    model = model_for("knowledge", model)
+    passages = index.search(question, k=top_k, sources=sources)
+    answer = {"Question": question, "Sources": passages, "Mode": "Retrieved text", "Cached": False}
+    if not use_llm or not passages:
+        return dict(answer, Answer=extractive_answer(passages))
+
+    normalized = " ".join(question.lower().split())
+    version = f"knowledge-{KNOWLEDGE_PROMPT_VERSION}-{index.fingerprint}-k{top_k}-{','.join(sorted(sources or []))}"
+    cache_key = make_cache_key(normalized, "knowledge", [], version, model)
+    if use_cache and result_cache is not None:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            telemetry.record_cache_hit(model, feature="knowledge")
+            return dict(cached, Cached=True)
+
+    try:
+        with llm_feature("knowledge"):
+            text = call_gpt_text(create_knowledge_prompt(question, passages), model=model, task="knowledge")
+    except Exception as e:
+        return dict(answer, Answer=extractive_answer(passages), Error=str(e))
+
+    answer = dict(answer, Answer=text, Mode="GPT")
+    if result_cache is not None:
+        result_cache.set(cache_key, answer)
+    return answer
+
+# --- Export Rows ---
+COMBINED_COLUMNS = ["Section", "Checklist Item ID", "Checklist Text", "Status", "Justification", "Match Level", "Score"]
+
+def combined_rows(all_results):
+    """Flatten section results into the rows of the "Export Combined Results" CSV."""
+    rows = []
+    for result in all_results:
+        for item in result["Matched Details"]:
+            rows.append({
+                "Section": result["Section"],
+                "Checklist Item ID": item["Checklist Item ID"],
+                "Checklist Text": item["Checklist Text"],
+                "Status": item["Status"],
+                "Justification": item["Justification"],
+                "Match Level": result["Match Level"],
+                "Score": result["Compliance Score"]
+            })
+    return rows
+
+# --- Policy Comparison ---
+def unique_document_names(names):
+    """Suffix repeated names with (2), (3)... so every document gets its own matrix column."""
+    seen, unique = {}, []
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        unique.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return unique
+
+def compare_policies(documents, section_ids=None, model=None, max_workers=None, use_cache=True, retrieval_top_k=None,
+                     prescreen=True):
+    """Evaluate several (name, text) documents side by side, yielding (names, results) as each finishes.
+
+    Documents whose text is identical after whitespace normalisation are
+    evaluated once and reported together. Every (document, section) pair runs
+    on one pool of ``max_workers`` threads, so the concurrency limit holds
+    across the whole comparison.
+    """
+    section_ids = list(section_ids or dpdpa_checklists)
+    groups = {}
+    for name, text in documents:
+        groups.setdefault(policy_hash(text), {"names": [], "text": text, "results": []})["names"].append(name)
+
+    max_workers = max(1, min(max_workers or MAX_CONCURRENT_SECTIONS, len(groups) * len(section_ids)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                analyze_policy_section, sid, dpdpa_checklists[sid]["items"], group["text"], model, use_cache,
+                retrieval_top_k, prescreen, policy_digest=digest
+            ): group
+            for digest, group in groups.items()
+            for sid in section_ids
+        }
+        for future in as_completed(futures):
+            group = futures[future]
+            group["results"].append(future.result())
+            if len(group["results"]) == len(section_ids):
+                yield group["names"], sorted(group["results"], key=lambda r: section_ids.index(r["Section"]))
+
+def comparison_rows(named_results):
+    """Item-by-item matrix of several documents' results.
+
+    ``named_results`` maps document names to their section results; the first
+    document is the baseline. Each row is one checklist item with a status
+    column per document, a "Δ <name>" column per later document (+1 per
+    status step better than the baseline, -1 per step worse) and "Differs".
+    """
+    names = list(named_results)
+    statuses = {
+        name: {(r["Section"], d["Checklist Item ID"]): d["Status"] for r in results for d in r["Matched Details"]}
+        for name, results in named_results.items()
+    }
+    errored = {name: {r["Section"] for r in results if r["Match Level"] == "Error"} for name, results in named_results.items()}
+    rows = []
+    for sid, section in dpdpa_checklists.items():
+        if not any(r["Section"] == sid for results in named_results.values() for r in results):
+            continue
+        for item in section["items"]:
+            key = (sid, item["id"])
+            row = {"Section": sid, "Checklist Item ID": item["id"], "Checklist Text": item["text"]}
+            for name in names:
+                row[name] = statuses[name].get(key) or ("Error" if sid in errored[name] else "")
+            baseline = statuses[names[0]].get(key)
+            for name in names[1:]:
+                status = statuses[name].get(key)
+                row[f"Δ {name}"] = STATUS_RANK[status] - STATUS_RANK[baseline] if status and baseline else None
+            row["Differs"] = len({row[name] for name in names}) > 1
+            rows.append(row)
+    return rows
+
+def comparison_score_rows(named_results):
+    """Compliance score per section (rows) and document (columns)."""
+    scores = {
+        name: {r["Section"]: (None if r["Match Level"] == "Error" else r["Compliance Score"]) for r in results}
+        for name, results in named_results.items()
+    }
+    sections = [sid for sid in dpdpa_checklists if any(sid in s for s in scores.values())]
+    return [
+        dict({"Section": sid, "Title": dpdpa_checklists[sid]["title"]}, **{name: scores[name].get(sid) for name in named_results})
+        for sid in sections
+    ]
+
+# --- Document Loading ---
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".docx")
+
+def extract_text_from_file(path, max_pages=None, max_bytes=None):
+    """Read a policy from a PDF, TXT or DOCX file on disk."""
+    with open(path, "rb") as f:
+        return extract_text_from_bytes(path, f.read(), max_pages=max_pages, max_bytes=max_bytes)
+
+def extract_text_from_bytes(name, data, max_pages=None, max_bytes=None):
+    """Read a policy from the contents of a PDF, TXT or DOCX file; ``name`` supplies the extension."""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".pdf":
+        return extract_pdf_text(data, max_pages=max_pages, max_bytes=max_bytes)
+    if extension == ".txt":
+        return data.decode("utf-8", errors="replace")
+    if extension == ".docx":
+        from docx import Document
+        return "\n".join(para.text for para in Document(io.BytesIO(data)).paragraphs)
+    raise ValueError(f"Unsupported policy file type: {extension}")
@@ -0,0 +1,109 @@
+import hashlib
+import io
+import json
+import re
+import threading
+from collections import OrderedDict
+
+from docx import Document
+
+
+# --- Markdown → Word ---
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+BULLET = re.compile(r"^(\s*)[-*+•]\s+(.*)$")
+NUMBERED = re.compile(r"^(\s*)\d+[.)]\s+(.*)$")
+RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+INLINE = re.compile(r"(\*\*.+?\*\*|__.+?__|\*[^*\s][^*]*?\*|`[^`]+`)")
+
+def add_markdown_runs(paragraph, text):
+    """Append ``text`` to ``paragraph``, turning **bold**, *italic* and `code` spans into formatted runs."""
+    for piece in INLINE.split(text):
+        if not piece:
+            continue
+        if piece.startswith(("**", "__")) and len(piece) > 4:
+            paragraph.add_run(piece[2:-2]).bold = True
+        elif piece.startswith("*") and len(piece) > 2:
+            paragraph.add_run(piece[1:-1]).italic = True
+        elif piece.startswith("`") and len(piece) > 2:
+            paragraph.add_run(piece[1:-1]).font.name = "Courier New"
+        else:
+            paragraph.add_run(piece)
+
+def markdown_to_docx(title, text):
+    """A Word document of a GPT draft: ``title`` as the top heading, Markdown headings and lists as Word styles."""
+    doc = Document()
+    doc.add_heading(title, level=1)
+    # Assigning styles by name makes python-docx rescan the styles part for every
+    # paragraph; resolve the ids once and set them on the paragraph XML directly
+    style_ids = {}
+
+    def add_paragraph(style):
+        if style not in style_ids:
+            style_ids[style] = doc.styles[style].style_id
+        paragraph = doc.add_paragraph()
+        paragraph._p.style = style_ids[style]
+        return paragraph
+
+    for line in text.splitlines():
+        if not line.strip() or RULE.match(line):
+            continue
+        heading = HEADING.match(line)
+        bullet = BULLET.match(line)
+        numbered = NUMBERED.match(line)
+        if heading:
+            # The draft title is the only level-1 heading, so "#" becomes level 2
+            add_markdown_runs(add_paragraph(f"Heading {min(len(heading.group(1)) + 1, 9)}"), heading.group(2))
+        elif bullet or numbered:
+            indent, content = (bullet or numbered).groups()
+            style = "List Bullet" if bullet else "List Number"
+            if len(indent.expandtabs(4)) >= 2:
+                style += " 2"
+            add_markdown_runs(add_paragraph(style), content)
+        else:
+            add_markdown_runs(doc.add_paragraph(), line.strip())
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+# --- Exporter ---
+class DraftExporter:
+    """Word, TXT and JSON downloads of policy drafts, built once per distinct content.
+
+    Files are keyed by a SHA-256 of the format and everything that goes into
+    them, so an unchanged draft is never rebuilt across reruns or sessions.
+    The most recently used files are kept up to ``max_bytes`` in total.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _memoized(self, parts, build):
+        key = hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+        # Built outside the lock; two sessions racing on the same draft both get identical bytes
+        data = build()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._size += len(data)
+                while self._size > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted)
+        return data
+
+    def docx(self, title, text):
+        return self._memoized(["docx", title, text], lambda: markdown_to_docx(title, text))
+
+    def txt(self, text):
+        return self._memoized(["txt", text], lambda: text.encode("utf-8"))
+
+    def json(self, data):
+        payload = json.dumps(data, indent=2)
+        return self._memoized(["json", payload], lambda: payload.encode("utf-8"))
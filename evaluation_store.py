@@ -0,0 +1,214 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from result_cache import policy_hash as hash_policy_text
+
+
+# --- SQLite Store ---
+class EvaluationStore:
+    """Persistent history of section evaluations behind the Dashboard & Reports page.
+
+    Every section result is one row in ``evaluations``; its checklist verdicts
+    are copied into ``evaluation_items`` together with the organization,
+    section and date so per-item aggregates never need a join. Results from
+    the same compliance check share a ``run_id``. Error results are kept for
+    the history but left out of every aggregate.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS evaluations (
+                id INTEGER PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                organization TEXT NOT NULL DEFAULT '',
+                industry TEXT NOT NULL DEFAULT '',
+                document TEXT NOT NULL DEFAULT '',
+                policy_hash TEXT NOT NULL,
+                section TEXT NOT NULL,
+                match_level TEXT NOT NULL,
+                score REAL NOT NULL,
+                model TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
+                created_at REAL NOT NULL,
+                created_date TEXT NOT NULL,
+                result TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_evaluations_org_date ON evaluations (organization, created_date);
+            CREATE INDEX IF NOT EXISTS idx_evaluations_policy ON evaluations (policy_hash);
+            CREATE INDEX IF NOT EXISTS idx_evaluations_section_date ON evaluations (section, created_date);
+            CREATE INDEX IF NOT EXISTS idx_evaluations_date ON evaluations (created_date);
+            CREATE INDEX IF NOT EXISTS idx_evaluations_level ON evaluations (match_level);
+            CREATE INDEX IF NOT EXISTS idx_evaluations_run ON evaluations (run_id);
+
+            CREATE TABLE IF NOT EXISTS evaluation_items (
+                evaluation_id INTEGER NOT NULL REFERENCES evaluations (id) ON DELETE CASCADE,
+                organization TEXT NOT NULL,
+                section TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_date TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_items_section_item ON evaluation_items (section, item_id, status);
+            CREATE INDEX IF NOT EXISTS idx_items_org_date ON evaluation_items (organization, created_date);
+            CREATE INDEX IF NOT EXISTS idx_items_evaluation ON evaluation_items (evaluation_id);
+        """)
+        self._conn.commit()
+
+    # --- Writes ---
+    def record_run(self, results, policy_text=None, policy_hash=None, organization="", industry="",
+                   document="", model="", source="app"):
+        """Store the section results of one compliance check in a single transaction; returns the run id."""
+        run_id = uuid.uuid4().hex
+        digest = policy_hash or hash_policy_text(policy_text or "")
+        now = time.time()
+        day = datetime.datetime.fromtimestamp(now, datetime.timezone.utc).strftime("%Y-%m-%d")
+        organization = (organization or "").strip()
+
+        with self._lock, self._conn:
+            for result in results:
+                cursor = self._conn.execute(
+                    """INSERT INTO evaluations (run_id, organization, industry, document, policy_hash, section,
+                                                match_level, score, model, source, created_at, created_date, result)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (run_id, organization, industry or "", document or "", digest, str(result["Section"]),
+                     result["Match Level"], float(result["Compliance Score"]), model or "", source,
+                     now, day, json.dumps(result, ensure_ascii=False))
+                )
+                self._conn.executemany(
+                    "INSERT INTO evaluation_items (evaluation_id, organization, section, item_id, status, created_date) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (cursor.lastrowid, organization, str(result["Section"]), item["Checklist Item ID"], item["Status"], day)
+                        for item in result.get("Matched Details", [])
+                    ]
+                )
+        return run_id
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM evaluation_items")
+            self._conn.execute("DELETE FROM evaluations")
+
+    # --- Queries ---
+    def _where(self, organization=None, since=None, sections=None, include_errors=False):
+        clauses, params = [], []
+        if organization:
+            clauses.append("organization = ?")
+            params.append(organization)
+        if since:
+            clauses.append("created_date >= ?")
+            params.append(str(since))
+        if sections:
+            clauses.append(f"section IN ({', '.join('?' for _ in sections)})")
+            params.extend(str(s) for s in sections)
+        if not include_errors:
+            clauses.append("match_level != 'Error'")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=list(params))
+
+    def organizations(self):
+        return self._query("SELECT DISTINCT organization FROM evaluations WHERE organization != '' ORDER BY organization")["organization"].tolist()
+
+    def summary(self, **filters):
+        where, params = self._where(**filters)
+        row = self._query(f"""
+            SELECT COUNT(*) AS evaluations,
+                   COUNT(DISTINCT run_id) AS runs,
+                   COUNT(DISTINCT policy_hash) AS policies,
+                   COALESCE(AVG(score), 0) AS average_score,
+                   COALESCE(AVG(match_level = 'Fully Compliant'), 0) AS fully_compliant_ratio
+            FROM evaluations{where}
+        """, params).iloc[0]
+        return {
+            "evaluations": int(row["evaluations"]),
+            "runs": int(row["runs"]),
+            "policies": int(row["policies"]),
+            "average_score": round(float(row["average_score"]), 3),
+            "fully_compliant_ratio": round(float(row["fully_compliant_ratio"]), 3)
+        }
+
+    def score_trend(self, **filters):
+        """Average compliance score per day and section."""
+        where, params = self._where(**filters)
+        return self._query(f"""
+            SELECT created_date, section, AVG(score) AS average_score, COUNT(*) AS evaluations
+            FROM evaluations{where}
+            GROUP BY created_date, section
+            ORDER BY created_date, section
+        """, params)
+
+    def match_level_counts(self, **filters):
+        where, params = self._where(**filters)
+        return self._query(f"""
+            SELECT section, match_level, COUNT(*) AS evaluations
+            FROM evaluations{where}
+            GROUP BY section, match_level
+        """, params)
+
+    def item_failure_rates(self, **filters):
+        """Share of evaluations in which each checklist item was missing or only partially covered."""
+        # Item rows never hold Error results, so the error filter does not apply here
+        where, params = self._where(**filters, include_errors=True)
+        return self._query(f"""
+            SELECT section, item_id,
+                   COUNT(*) AS evaluations,
+                   SUM(status = 'Missing') AS missing,
+                   SUM(status = 'Partially Mentioned') AS partial,
+                   AVG(status = 'Missing') AS missing_rate,
+                   AVG(status != 'Explicitly Mentioned') AS failure_rate
+            FROM evaluation_items{where}
+            GROUP BY section, item_id
+            ORDER BY failure_rate DESC, evaluations DESC
+        """, params)
+
+    def run_history(self, limit=200, **filters):
+        """Most recent compliance checks, one row per run."""
+        where, params = self._where(**filters, include_errors=True)
+        return self._query(f"""
+            SELECT run_id, MIN(created_at) AS created_at, organization, industry, document, source,
+                   GROUP_CONCAT(section, ', ') AS sections,
+                   AVG(CASE WHEN match_level != 'Error' THEN score END) AS average_score,
+                   SUM(match_level = 'Error') AS errors
+            FROM evaluations{where}
+            GROUP BY run_id
+            ORDER BY created_at DESC
+            LIMIT ?
+        """, params + [int(limit)])
+
+    def justifications(self, limit=20000):
+        """Distinct checklist verdicts with their justifications, newest first (for the knowledge index)."""
+        frame = self._query("""
+            SELECT e.organization, e.document, e.created_date, e.section,
+                   json_extract(d.value, '$."Checklist Item ID"') AS item_id,
+                   json_extract(d.value, '$.Status') AS status,
+                   json_extract(d.value, '$.Justification') AS justification
+            FROM evaluations e, json_each(e.result, '$."Matched Details"') d
+            WHERE e.match_level != 'Error'
+            GROUP BY item_id, status, justification
+            ORDER BY MAX(e.created_at) DESC
+            LIMIT ?
+        """, (int(limit),))
+        return frame.to_dict("records")
+
+    def run_results(self, run_id):
+        """The stored section results of one run, in section order."""
+        frame = self._query("SELECT section, result FROM evaluations WHERE run_id = ? ORDER BY CAST(section AS INTEGER)", (run_id,))
+        return [json.loads(value) for value in frame["result"]]
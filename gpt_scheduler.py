@@ -0,0 +1,216 @@
+import datetime
+import random
+import threading
+import time
+
+import openai
+
+
+# --- Token Bucket ---
+class TokenBucket:
+    """Thread-safe bucket refilled continuously at ``rate_per_minute`` up to ``capacity``."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._level = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Block until ``amount`` units are available, then take them."""
+        # Requests bigger than the whole bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._level >= amount:
+                    self._level -= amount
+                    return
+                wait = (amount - self._level) / self.rate
+            time.sleep(min(wait, 5.0))
+
+    def adjust(self, amount):
+        """Give back (positive) or take extra (negative) units once the real cost is known."""
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level + amount)
+
+    def set_rate(self, rate_per_minute, capacity=None):
+        """Change the refill rate in place, keeping what is already in the bucket."""
+        with self._lock:
+            self._refill()
+            self.rate = rate_per_minute / 60.0
+            self.capacity = capacity or rate_per_minute
+            self._level = min(self._level, self.capacity)
+
+# --- Daily Token Budget ---
+class BudgetExceededError(RuntimeError):
+    pass
+
+class DailyTokenBudget:
+    """Tokens spent per UTC day, checked against ``limit`` (0 means unlimited).
+
+    With a ``store`` (a ResultCache) the daily totals are kept in its SQLite
+    file and shared by every process using it; without one they are counted in
+    memory and reset when the process restarts.
+    """
+
+    def __init__(self, limit=0, store=None):
+        self.limit = limit
+        self.store = store
+        self._day = None
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _today():
+        return datetime.datetime.now(datetime.timezone.utc).date()
+
+    def _roll_over(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+
+    def reserve(self, amount):
+        """Take ``amount`` tokens from today's budget or raise BudgetExceededError."""
+        if self.store is not None:
+            reserved, used = self.store.reserve_tokens(self._today().isoformat(), amount, self.limit)
+        else:
+            with self._lock:
+                self._roll_over()
+                used = self._used
+                reserved = not self.limit or used + amount <= self.limit
+                if reserved:
+                    self._used += amount
+        if not reserved:
+            raise BudgetExceededError(
+                f"The daily token budget of {self.limit:,} tokens is used up ({used:,} spent today)."
+            )
+
+    def adjust(self, amount):
+        if self.store is not None:
+            self.store.adjust_tokens(self._today().isoformat(), amount)
+            return
+        with self._lock:
+            self._roll_over()
+            self._used = max(0, self._used + amount)
+
+    def used_today(self):
+        if self.store is not None:
+            return self.store.tokens_spent(self._today().isoformat())
+        with self._lock:
+            self._roll_over()
+            return self._used
+
+# --- Retry Policy ---
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError
+)
+
+def is_retryable(error):
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+def retry_after_seconds(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+# --- Scheduler ---
+class RequestScheduler:
+    """Rate limits, times out and retries chat completion calls.
+
+    Every call first reserves its estimated token cost from the daily budget,
+    then takes one unit from the requests/min bucket and the estimate from the
+    tokens/min bucket. Retryable failures (429, timeouts, connection errors,
+    5xx) are retried with exponential backoff and full jitter, honouring any
+    Retry-After header from the API. Pass a ResultCache as ``budget_store`` to
+    share the daily budget with other processes using the same cache file.
+    """
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=80_000, max_retries=5,
+                 base_delay=1.0, max_delay=60.0, timeout=120.0, daily_token_budget=0, budget_store=None):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.budget = DailyTokenBudget(daily_token_budget, budget_store)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    def update(self, requests_per_minute=None, tokens_per_minute=None, max_retries=None, timeout=None,
+               daily_token_budget=None):
+        """Apply new limits to a running scheduler; calls already waiting pick them up."""
+        if requests_per_minute and requests_per_minute / 60.0 != self.request_bucket.rate:
+            self.request_bucket.set_rate(requests_per_minute)
+        if tokens_per_minute and tokens_per_minute / 60.0 != self.token_bucket.rate:
+            self.token_bucket.set_rate(tokens_per_minute)
+        if max_retries is not None:
+            self.max_retries = max_retries
+        if timeout is not None:
+            self.timeout = timeout
+        if daily_token_budget is not None:
+            self.budget.limit = daily_token_budget
+
+    def backoff(self, attempt, error=None):
+        hinted = retry_after_seconds(error) if error is not None else None
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def run(self, call, estimated_tokens, report=None):
+        """Invoke ``call(timeout)`` under the rate limits; returns its response.
+
+        ``call`` should return an OpenAI response; its ``usage`` (when present)
+        corrects the token bucket for the real cost of the request. When a
+        ``report`` dict is given, its "retries" entry tracks the attempts made.
+        """
+        attempt = 0
+        while True:
+            if report is not None:
+                report["retries"] = attempt
+            self.budget.reserve(estimated_tokens)
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(estimated_tokens)
+            try:
+                response = call(self.timeout)
+            except Exception as e:
+                # A failed attempt consumed no tokens: give back both the budget and the tokens/min reservation
+                self.budget.adjust(-estimated_tokens)
+                self.token_bucket.adjust(estimated_tokens)
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                time.sleep(self.backoff(attempt, e))
+                attempt += 1
+                continue
+
+            self.settle(estimated_tokens, getattr(response, "usage", None))
+            return response
+
+    def settle(self, estimated_tokens, usage):
+        """Correct the tokens/min bucket and daily budget from an estimate to the reported ``usage``.
+
+        ``run`` does this itself; streamed calls report usage only in their last
+        chunk, so whoever consumes the stream settles it then.
+        """
+        if usage is not None and getattr(usage, "total_tokens", None):
+            self.token_bucket.adjust(estimated_tokens - usage.total_tokens)
+            self.budget.adjust(usage.total_tokens - estimated_tokens)
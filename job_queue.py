@@ -0,0 +1,118 @@
+import datetime
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+
+# --- Job Queue ---
+class JobQueue:
+    """Long-running evaluations on a fixed pool of worker threads, with their state kept for polling.
+
+    ``submit`` takes a function called as ``run(report)`` on a worker thread:
+    it passes each section result to ``report`` as soon as it has one, so
+    pollers can read partial results, and returns the final result list. At
+    most ``max_pending`` jobs may wait for a worker; finished jobs beyond
+    ``keep_finished`` are forgotten oldest first.
+    """
+
+    def __init__(self, workers=2, max_pending=100, keep_finished=500):
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, run, **info):
+        """Queue ``run`` and return the new job's status; ``info`` is reported back with it."""
+        with self._lock:
+            pending = sum(job["status"] == "queued" for job in self._jobs.values())
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} jobs are already waiting; try again later.")
+            job = {
+                "id": uuid.uuid4().hex,
+                "status": "queued",
+                **info,
+                "completed": 0,
+                "error": None,
+                "created_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "results": []
+            }
+            self._jobs[job["id"]] = job
+            self._futures[job["id"]] = self._executor.submit(self._run, job, run)
+            return self._status(job)
+
+    def _run(self, job, run):
+        with self._lock:
+            if job["status"] != "queued":
+                return
+            job["status"], job["started_at"] = "running", _now()
+
+        def report(result):
+            with self._lock:
+                job["results"].append(result)
+                job["completed"] = len(job["results"])
+
+        try:
+            results = run(report)
+        except Exception as e:
+            with self._lock:
+                job.update(status="failed", error=f"{type(e).__name__}: {e}", finished_at=_now())
+        else:
+            with self._lock:
+                job.update(status="succeeded", results=list(results), finished_at=_now())
+                job["completed"] = len(job["results"])
+        finally:
+            with self._lock:
+                self._futures.pop(job["id"], None)
+                self._forget_finished()
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished_at"]]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    # --- Polling ---
+    def _status(self, job):
+        status = {key: value for key, value in job.items() if key != "results"}
+        status["failed_sections"] = [r["Section"] for r in job["results"] if r.get("Match Level") == "Error"]
+        return status
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._status(job) if job else None
+
+    def results(self, job_id):
+        """The job's section results so far (all of them, in section order, once it has succeeded)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return list(job["results"]) if job else None
+
+    def recent(self, limit=50):
+        """Status of the most recently submitted jobs, newest first."""
+        with self._lock:
+            return [self._status(job) for job in list(self._jobs.values())[::-1][:limit]]
+
+    def cancel(self, job_id):
+        """Cancel a job that has not started yet; returns False once a worker has picked it up."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.get(job_id)
+            if job is None or job["status"] != "queued" or future is None or not future.cancel():
+                return False
+            job.update(status="cancelled", finished_at=_now())
+            self._futures.pop(job_id, None)
+            return True
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
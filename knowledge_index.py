@@ -0,0 +1,178 @@
+import collections
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+from retrieval import TOKENIZER_VERSION, chunk_policy, tokenize
+
+
+INDEX_FORMAT = 1
+SOURCES = ["DPDPA Act", "Checklist", "Past Evaluation"]
+
+# --- Corpus ---
+def _plain(text):
+    return re.sub(r"\*\*(.*?)\*\*", r"\1", text)
+
+def act_documents(act_text):
+    """Split the Act into paragraph passages, each labelled with its first line."""
+    documents = []
+    for passage in chunk_policy(act_text, max_chars=1200, min_chars=200):
+        first_line = passage["text"].split("\n", 1)[0].strip()
+        documents.append({
+            "source": "DPDPA Act",
+            "ref": first_line[:80] + ("…" if len(first_line) > 80 else ""),
+            "text": passage["text"]
+        })
+    return documents
+
+def checklist_documents(checklists):
+    return [
+        {
+            "source": "Checklist",
+            "ref": f"Item {item['id']} — Section {sid}: {section['title']}",
+            "text": _plain(item["text"])
+        }
+        for sid, section in checklists.items()
+        for item in section["items"]
+    ]
+
+def evaluation_documents(justifications):
+    """Turn stored checklist verdicts (see EvaluationStore.justifications) into passages."""
+    return [
+        {
+            "source": "Past Evaluation",
+            "ref": f"Item {row['item_id']} · {row['organization'] or row['document'] or 'Unnamed'} · {row['created_date']}",
+            "text": f"{row['status']}: {row['justification']}"
+        }
+        for row in justifications
+        if row["justification"]
+    ]
+
+# --- Offline Build ---
+def build_index(documents, path, k1=1.5, b=0.75):
+    """Write a BM25 inverted index for ``documents`` to the directory ``path``.
+
+    Postings are stored term-major as three flat arrays (``indptr``,
+    ``doc_ids`` and precomputed BM25 ``weights``) and the passages as one
+    UTF-8 blob with byte offsets, so a reader can memory-map everything and
+    only touch the pages a query needs. The directory is replaced atomically.
+    """
+    vocab = {}
+    term_ids, doc_ids, counts = [], [], []
+    doc_len = np.zeros(len(documents), dtype=np.float32)
+    for doc_id, document in enumerate(documents):
+        tokens = tokenize(document["text"] + " " + document.get("ref", ""))
+        doc_len[doc_id] = len(tokens)
+        for term, count in collections.Counter(tokens).items():
+            term_ids.append(vocab.setdefault(term, len(vocab)))
+            doc_ids.append(doc_id)
+            counts.append(count)
+
+    term_ids = np.asarray(term_ids, dtype=np.int32)
+    doc_ids = np.asarray(doc_ids, dtype=np.int32)
+    tf = np.asarray(counts, dtype=np.float32)
+
+    doc_freq = np.bincount(term_ids, minlength=len(vocab)).astype(np.float32)
+    idf = np.log(1 + (len(documents) - doc_freq + 0.5) / (doc_freq + 0.5))
+    avg_len = doc_len.mean() if len(documents) else 1.0
+    norm = k1 * (1 - b + b * doc_len[doc_ids] / (avg_len or 1.0))
+    weights = (idf[term_ids] * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    order = np.argsort(term_ids, kind="stable")
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=indptr[1:])
+
+    blobs = [json.dumps(document, ensure_ascii=False).encode("utf-8") for document in documents]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+    sources = np.asarray([SOURCES.index(document["source"]) for document in documents], dtype=np.int8)
+
+    fingerprint = hashlib.sha256(f"tokenizer-{TOKENIZER_VERSION}".encode("utf-8") + b"".join(blobs)).hexdigest()[:16]
+    staging = f"{path}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    np.save(os.path.join(staging, "indptr.npy"), indptr)
+    np.save(os.path.join(staging, "doc_ids.npy"), doc_ids[order])
+    np.save(os.path.join(staging, "weights.npy"), weights[order])
+    np.save(os.path.join(staging, "offsets.npy"), offsets)
+    np.save(os.path.join(staging, "sources.npy"), sources)
+    with open(os.path.join(staging, "passages.bin"), "wb") as f:
+        f.write(b"".join(blobs))
+    with open(os.path.join(staging, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False)
+    manifest = {
+        "format": INDEX_FORMAT,
+        "tokenizer": TOKENIZER_VERSION,
+        "fingerprint": fingerprint,
+        "built_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "passages": len(documents),
+        "terms": len(vocab),
+        "sources": {name: int((sources == i).sum()) for i, name in enumerate(SOURCES)}
+    }
+    with open(os.path.join(staging, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    previous = f"{path}.old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, previous)
+    os.replace(staging, path)
+    shutil.rmtree(previous, ignore_errors=True)
+    return manifest
+
+# --- Memory-Mapped Reader ---
+class KnowledgeIndex:
+    """Read-only view of an index written by build_index; every array is memory-mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != INDEX_FORMAT:
+            raise ValueError(f"Knowledge index at {path} has an unsupported format; rebuild it.")
+        if self.manifest.get("tokenizer", 1) != TOKENIZER_VERSION:
+            raise ValueError(f"Knowledge index at {path} was built with an older tokenizer; rebuild it.")
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = json.load(f)
+        self.indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        self.weights = np.load(os.path.join(path, "weights.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.sources = np.load(os.path.join(path, "sources.npy"), mmap_mode="r")
+        self.passages = np.memmap(os.path.join(path, "passages.bin"), dtype=np.uint8, mode="r") if self.offsets[-1] else None
+
+    @property
+    def fingerprint(self):
+        return self.manifest["fingerprint"]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def passage(self, doc_id):
+        start, end = int(self.offsets[doc_id]), int(self.offsets[doc_id + 1])
+        return json.loads(self.passages[start:end].tobytes().decode("utf-8"))
+
+    def search(self, query, k=5, sources=None):
+        """Return the top-k passages for ``query`` as dicts with a "score", best first."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(query)):
+            column = self.vocab.get(term)
+            if column is None:
+                continue
+            start, end = int(self.indptr[column]), int(self.indptr[column + 1])
+            # A term appears at most once per passage, so plain fancy-index addition is safe
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+        if sources:
+            allowed = np.isin(self.sources, [SOURCES.index(s) for s in sources])
+            scores[~allowed] = 0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [dict(self.passage(int(i)), score=round(float(scores[i]), 3)) for i in ranked]
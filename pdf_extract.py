@@ -0,0 +1,182 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+
+
+# Documents with at least this many pages are split across worker processes
+PARALLEL_PAGE_THRESHOLD = 40
+PAGES_PER_TASK = 16
+
+
+class PdfTooLargeError(ValueError):
+    pass
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+# --- Page Extraction ---
+def _extract_page_range(data, start, end):
+    # Runs in a worker process: each worker opens its own copy of the document
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, end)]
+
+def _open_pdf(data, max_pages=None):
+    doc = fitz.open(stream=data, filetype="pdf")
+    page_count = doc.page_count
+    if max_pages and page_count > max_pages:
+        doc.close()
+        raise PdfTooLargeError(f"PDF has {page_count} pages; the limit is {max_pages}.")
+    return doc
+
+def _iter_open_pdf_pages(doc, data, workers=None):
+    page_count = doc.page_count
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+    if page_count < PARALLEL_PAGE_THRESHOLD or workers <= 1:
+        for page in doc:
+            yield page.get_text()
+        return
+
+    # spawn avoids forking the threads of the host (Streamlit) process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_extract_page_range, data, start, end) for start, end in ranges]
+        for future in futures:
+            yield from future.result()
+
+def iter_pdf_pages(data, max_pages=None, workers=None):
+    """Yield the text of each page in order.
+
+    Small documents are read page by page in-process; large ones are split into
+    page ranges that are extracted by a process pool and yielded as each range
+    finishes, in page order.
+    """
+    with _open_pdf(data, max_pages) as doc:
+        yield from _iter_open_pdf_pages(doc, data, workers)
+
+def extract_pdf_text(data, max_pages=None, max_bytes=None, progress=None, workers=None):
+    """Extract the full text of a PDF given as bytes.
+
+    ``progress`` is called with (pages_done, page_count) after every page.
+    Raises PdfTooLargeError when the byte or page limit is exceeded.
+    """
+    if max_bytes and len(data) > max_bytes:
+        raise PdfTooLargeError(f"PDF is {len(data) / 1_048_576:.1f} MB; the limit is {max_bytes / 1_048_576:.1f} MB.")
+
+    pages = []
+    with _open_pdf(data, max_pages) as doc:
+        for page_text in _iter_open_pdf_pages(doc, data, workers):
+            pages.append(page_text)
+            if progress:
+                progress(len(pages), doc.page_count)
+    return "\n".join(pages)
+
+# --- Disk Cache ---
+class ExtractedTextCache:
+    """Stores extracted text on disk keyed by the SHA-256 of the uploaded file.
+
+    Each file's mtime doubles as its last access time: entries unused for
+    ``max_age_seconds`` are dropped, and once the files exceed ``max_bytes``
+    the least recently used ones go first.
+    """
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024, max_age_seconds=30 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._evict(time.time())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return text
+
+    def set(self, key, text):
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._evict(time.time())
+
+    # --- Eviction ---
+    def _entries(self):
+        entries = []
+        with os.scandir(self.directory) as files:
+            for entry in files:
+                if entry.name.endswith(".txt"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def _evict(self, now):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for accessed, size, path in entries:
+            if total <= self.max_bytes and accessed >= now - self.max_age_seconds:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def resize(self, max_bytes=None, max_age_seconds=None):
+        """Change the size and age limits of a live cache, evicting right away if they shrank."""
+        with self._lock:
+            limits = (self.max_bytes, self.max_age_seconds)
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_age_seconds is not None:
+                self.max_age_seconds = max_age_seconds
+            if (self.max_bytes, self.max_age_seconds) == limits:
+                return
+            self._evict(time.time())
+
+
+# --- In-Memory Memo ---
+class TextMemo:
+    """Thread-safe LRU of extracted texts, bounded by total characters held."""
+
+    def __init__(self, max_chars=50_000_000):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def set(self, key, text):
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = text
+            self._size += len(text)
+            while self._size > self.max_chars and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
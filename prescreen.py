@@ -0,0 +1,126 @@
+import functools
+import hashlib
+import json
+import re
+import threading
+
+
+# Shared building blocks for the per-item rules kept next to dpdpa_checklists
+EMAIL_PATTERN = r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"
+PHONE_PATTERN = r"\+?\d[\d\s()-]{7,}\d"
+CONTACT_PATTERN = rf"{EMAIL_PATTERN}|{PHONE_PATTERN}"
+# Policies often say "revoke" or "opt out" rather than "withdraw"
+WITHDRAWAL_PATTERN = r"\bwithdr[ae]w|\brevo(?:ke|king|cation)|\bopt(?:s|ed|ing)?[- ]?out\b|\bunsubscrib"
+
+NEGATION = re.compile(r"\b(?:not|never|no|without|cannot|neither|nor)\b", re.I)
+SENTENCE = re.compile(r"\S.*?(?:[.!?](?=\s|$)|(?=\n\s*\n)|$)", re.S)
+
+# --- Metrics ---
+class PrescreenStats:
+    """Thread-safe counters of how much work the local pre-screen took off GPT."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sections = 0
+            self.calls_saved = 0
+            self.items = 0
+            self.items_present = 0
+            self.items_absent = 0
+
+    def record(self, items, present, absent):
+        with self._lock:
+            self.sections += 1
+            self.items += items
+            self.items_present += present
+            self.items_absent += absent
+            if items and present + absent == items:
+                self.calls_saved += 1
+
+    def snapshot(self):
+        with self._lock:
+            resolved = self.items_present + self.items_absent
+            return {
+                "sections": self.sections,
+                "calls_saved": self.calls_saved,
+                "items": self.items,
+                "items_present": self.items_present,
+                "items_absent": self.items_absent,
+                "items_resolved": resolved,
+                "resolved_ratio": round(resolved / self.items, 3) if self.items else 0.0
+            }
+
+stats = PrescreenStats()
+
+# --- Rules ---
+def rules_fingerprint(rules):
+    """Short hash of the rule set, so cached results are dropped whenever a rule changes."""
+    payload = json.dumps(rules, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern):
+    return re.compile(pattern, re.I)
+
+def sentence_spans(text):
+    return [match.span() for match in SENTENCE.finditer(text)]
+
+def find_evidence(rule, policy_text, spans):
+    """Return the (start, end) of the first sentence satisfying one of the rule's "present" patterns."""
+    for start, end in spans:
+        sentence = policy_text[start:end]
+        if not rule.get("negation_ok") and NEGATION.search(sentence):
+            continue
+        for patterns in rule.get("present", []):
+            if all(_compile(p).search(sentence) for p in patterns):
+                return start, end
+    return None
+
+def screen_item(item_id, rule, policy_text, spans):
+    """Classify one item as present or absent from its rule, or return None when it is ambiguous.
+
+    An item is present when a sentence (that is not negated) matches every
+    regex of one of its "present" patterns, and absent when none of its
+    "requires" regexes occur anywhere in the policy.
+    """
+    evidence = find_evidence(rule, policy_text, spans)
+    if evidence is not None:
+        start, end = evidence
+        quote = " ".join(policy_text[start:end].split())
+        return {
+            "Checklist Item ID": item_id,
+            "Status": "Explicitly Mentioned",
+            "Justification": f'Pre-screen match at chars {start}-{end}: "{quote}"'
+        }
+
+    requires = rule.get("requires")
+    if requires and not any(_compile(p).search(policy_text) for p in requires):
+        return {
+            "Checklist Item ID": item_id,
+            "Status": "Missing",
+            "Justification": f"Pre-screen: the policy never mentions {rule['topic']}."
+        }
+    return None
+
+def prescreen_checklist(policy_text, checklist, rules):
+    """Split a checklist into items resolved locally and items that still need GPT.
+
+    Returns ``(resolved, ambiguous)``: a dict of item id to evaluation entry in
+    the "Checklist Evaluation" shape, and the list of unresolved checklist items.
+    """
+    spans = sentence_spans(policy_text)
+    resolved, ambiguous = {}, []
+    for item in checklist:
+        rule = rules.get(item["id"])
+        evaluation = screen_item(item["id"], rule, policy_text, spans) if rule else None
+        if evaluation is None:
+            ambiguous.append(item)
+        else:
+            resolved[item["id"]] = evaluation
+
+    present = sum(1 for e in resolved.values() if e["Status"] == "Explicitly Mentioned")
+    stats.record(len(checklist), present, len(resolved) - present)
+    return resolved, ambiguous
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+
+# --- Key Helpers ---
+def normalize_policy_text(text):
+    """Collapse whitespace so cosmetic re-extraction differences hit the same entry."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+def policy_hash(text):
+    return hashlib.sha256(normalize_policy_text(text).encode("utf-8")).hexdigest()
+
+def checklist_fingerprint(checklist):
+    payload = json.dumps([[item["id"], item["text"]] for item in checklist], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def make_cache_key(policy_text, section_id, checklist, prompt_version, model, policy_digest=None):
+    # ``checklist`` may also be its precomputed checklist_fingerprint. Callers keying every
+    # section of one policy hash it once and pass ``policy_digest`` (its policy_hash) instead.
+    parts = [
+        policy_digest or policy_hash(policy_text),
+        str(section_id),
+        checklist if isinstance(checklist, str) else checklist_fingerprint(checklist),
+        str(prompt_version),
+        model,
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+# --- SQLite Store ---
+class ResultCache:
+    """Persistent evaluation cache with LRU size and age based eviction.
+
+    Entries older than ``max_age_seconds`` are treated as misses and purged, and
+    once the stored payloads exceed ``max_bytes`` the least recently used entries
+    are dropped. Safe to share between the worker threads of a single process.
+
+    The same file also keeps the tokens spent per UTC day, so the app, the API
+    and batch audits pointed at one cache draw on one daily token budget.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, max_age_seconds=30 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS token_usage (
+                day TEXT PRIMARY KEY,
+                tokens INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload.encode("utf-8")), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.max_age_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM results ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+
+    def resize(self, max_bytes=None, max_age_seconds=None):
+        """Change the size and age limits of a live cache, evicting right away if they shrank."""
+        with self._lock:
+            limits = (self.max_bytes, self.max_age_seconds)
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_age_seconds is not None:
+                self.max_age_seconds = max_age_seconds
+            if (self.max_bytes, self.max_age_seconds) == limits:
+                return
+            self._evict(time.time())
+            self._conn.commit()
+
+    # --- Daily Token Usage ---
+    def reserve_tokens(self, day, amount, limit=0):
+        """Add ``amount`` to the tokens spent on ``day`` unless that would pass ``limit`` (0 means unlimited).
+
+        Returns ``(reserved, spent)``, where ``spent`` is the total before this
+        call. The check and the update share one write transaction, so two
+        processes cannot both take the last of the budget.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                spent = self._tokens_spent(day)
+                reserved = not limit or spent + amount <= limit
+                if reserved:
+                    self._add_tokens(day, amount)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return reserved, spent
+
+    def adjust_tokens(self, day, amount):
+        """Give back (negative) or add (positive) tokens once the real cost of a call is known."""
+        with self._lock:
+            self._add_tokens(day, amount)
+            self._conn.commit()
+
+    def tokens_spent(self, day):
+        with self._lock:
+            return self._tokens_spent(day)
+
+    def _tokens_spent(self, day):
+        row = self._conn.execute("SELECT tokens FROM token_usage WHERE day = ?", (day,)).fetchone()
+        return row[0] if row else 0
+
+    def _add_tokens(self, day, amount):
+        self._conn.execute(
+            "INSERT INTO token_usage (day, tokens) VALUES (?, MAX(0, ?)) "
+            "ON CONFLICT (day) DO UPDATE SET tokens = MAX(0, tokens + ?)",
+            (day, amount, amount)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
@@ -0,0 +1,210 @@
+import difflib
+import functools
+import re
+from collections import Counter
+
+import numpy as np
+
+
+STOPWORDS = {
+    "a", "an", "and", "any", "are", "as", "at", "be", "by", "can", "for", "from", "has", "her",
+    "if", "in", "is", "it", "its", "may", "must", "not", "of", "on", "or", "such", "that", "the",
+    "their", "this", "to", "under", "we", "which", "will", "with", "our", "your", "you", "policy"
+}
+# Bumped whenever tokenize() changes, so indexes and cached results built with other terms are dropped
+TOKENIZER_VERSION = 2
+
+# --- Chunking ---
+def stem(word):
+    """Light stemming so "process"/"processes"/"processing"/"processed" share a term."""
+    if len(word) <= 4 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ing") and len(word) > 6:
+        return word[:-3]
+    if word.endswith("ed") and len(word) > 5:
+        return word[:-2]
+    # "-es" is a suffix only after a sibilant ("processes", "boxes"); "purposes" just drops the "s"
+    if word.endswith("es") and word[:-2].endswith(("ss", "x", "z", "ch", "sh")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+def tokenize(text):
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        tokens.append(stem(word))
+    return tokens
+
+def chunk_policy(text, max_chars=1200, min_chars=200):
+    """Split policy text into paragraph passages, returning dicts with text and character offsets."""
+    pieces = []
+    for match in re.finditer(r"\S(?:.*?\S)?(?=\n\s*\n|\s*\Z)", text, flags=re.S):
+        start, end = match.span()
+        if end - start <= max_chars:
+            pieces.append((start, end))
+            continue
+        # Oversized paragraph (common in PDF extraction): break it at line boundaries
+        piece_start = start
+        for line in re.finditer(r"[^\n]*\n?", text[start:end]):
+            line_end = start + line.end()
+            if line_end - piece_start >= max_chars:
+                pieces.append((piece_start, line_end))
+                piece_start = line_end
+        if piece_start < end:
+            pieces.append((piece_start, end))
+
+    merged = []
+    for start, end in pieces:
+        if merged and (merged[-1][1] - merged[-1][0] < min_chars) and end - merged[-1][0] <= max_chars:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    return [
+        {"start": start, "end": end, "text": text[start:end].strip()}
+        for start, end in merged if text[start:end].strip()
+    ]
+
+def chunk_policy_windows(text, max_chars, overlap_chars=0):
+    """Split policy text into windows of at most ``max_chars`` for map-reduce evaluation.
+
+    Windows end at a paragraph break where possible, then a line break, then a
+    space, and each one repeats roughly the last ``overlap_chars`` of the
+    previous window, so a clause cut at a boundary is still seen whole. Returns
+    dicts with text and character offsets, in document order.
+    """
+    windows, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + max_chars)
+        if end < len(text):
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, start + max_chars // 2, end)
+                if cut != -1:
+                    end = cut
+                    break
+        if text[start:end].strip():
+            windows.append({"start": start, "end": end, "text": text[start:end].strip()})
+        if end >= len(text):
+            break
+        # Begin the next window at a word boundary inside the overlap
+        following = text.find(" ", end - overlap_chars, end) if overlap_chars else -1
+        start = max(following + 1 if following != -1 else end, start + 1)
+    return windows
+
+# --- BM25 Index ---
+class BM25Index:
+    """Okapi BM25 over a policy's passages.
+
+    Kept as postings (term -> passage rows and their precomputed idf-weighted
+    scores) rather than a dense passages x vocabulary matrix, so memory grows
+    with the words in the policy instead of passages times distinct terms.
+    """
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+
+        counts = [Counter(tokenize(p["text"])) for p in passages]
+        doc_len = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        avg_len = doc_len.mean() if len(counts) else 0.0
+        norm = self.k1 * (1 - self.b + self.b * doc_len / (avg_len or 1.0))
+
+        rows, frequencies = {}, {}
+        for row, doc_counts in enumerate(counts):
+            for term, count in doc_counts.items():
+                rows.setdefault(term, []).append(row)
+                frequencies.setdefault(term, []).append(count)
+
+        # Precompute idf * saturated term frequency so a query only sums postings
+        self.postings = {}
+        for term, term_rows in rows.items():
+            term_rows = np.array(term_rows, dtype=np.int32)
+            tf = np.array(frequencies[term], dtype=np.float32)
+            idf = np.log(1 + (len(counts) - len(term_rows) + 0.5) / (len(term_rows) + 0.5))
+            self.postings[term] = (term_rows, (idf * tf * (self.k1 + 1) / (tf + norm[term_rows])).astype(np.float32))
+
+    def scores(self, query):
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        for term in dict.fromkeys(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                term_rows, weights = posting
+                scores[term_rows] += weights
+        return scores
+
+    def top_k(self, query, k=3):
+        if not self.passages:
+            return []
+        scores = self.scores(query)
+        ranked = np.argsort(-scores)[:k]
+        return [int(i) for i in ranked if scores[i] > 0]
+
+@functools.lru_cache(maxsize=8)
+def get_policy_index(policy_text):
+    """Build (or reuse) the BM25 index for a policy; shared by concurrent section evaluations."""
+    return BM25Index(chunk_policy(policy_text))
+
+# --- Passage Selection ---
+def select_passages(policy_text, checklist, top_k=3):
+    """Return the union of the top-k passages for each checklist item, in document order.
+
+    Each passage records the checklist item ids it was retrieved for.
+    """
+    index = get_policy_index(policy_text)
+    selected = {}
+    for item in checklist:
+        for i in index.top_k(item["text"], k=top_k):
+            selected.setdefault(i, []).append(item["id"])
+
+    return [
+        dict(index.passages[i], items=selected[i])
+        for i in sorted(selected, key=lambda i: index.passages[i]["start"])
+    ]
+
+def format_passages(passages):
+    return "\n\n".join(
+        f"[chars {p['start']}-{p['end']}] (relevant to {', '.join(p['items'])})\n{p['text']}"
+        for p in passages
+    )
+
+# --- Change Detection ---
+def changed_passages(old_text, new_text):
+    """Diff two policy versions paragraph by paragraph.
+
+    Returns the indices of passages that were edited or removed in the old
+    version and edited or added in the new version.
+    """
+    old_passages = get_policy_index(old_text).passages
+    new_passages = get_policy_index(new_text).passages
+    matcher = difflib.SequenceMatcher(
+        a=[" ".join(p["text"].split()) for p in old_passages],
+        b=[" ".join(p["text"].split()) for p in new_passages],
+        autojunk=False
+    )
+    old_changed, new_changed = set(), set()
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            old_changed.update(range(i1, i2))
+            new_changed.update(range(j1, j2))
+    return old_changed, new_changed
+
+def items_touched_by_edit(old_text, new_text, checklist, top_k=3):
+    """Return ids of checklist items whose best evidence passages changed between versions.
+
+    An item is touched when a changed passage is among its top-k passages in
+    either version: its old evidence was edited away or new evidence appeared.
+    """
+    old_changed, new_changed = changed_passages(old_text, new_text)
+    if not old_changed and not new_changed:
+        return []
+    old_index, new_index = get_policy_index(old_text), get_policy_index(new_text)
+    touched = []
+    for item in checklist:
+        if (old_changed & set(old_index.top_k(item["text"], k=top_k))
+                or new_changed & set(new_index.top_k(item["text"], k=top_k))):
+            touched.append(item["id"])
+    return touched
@@ -0,0 +1,167 @@
+import copy
+import json
+import re
+
+
+STATUSES = ["Explicitly Mentioned", "Partially Mentioned", "Missing"]
+MATCH_LEVELS = ["Fully Compliant", "Partially Compliant", "Non-Compliant"]
+
+
+class ReplyValidationError(ValueError):
+    pass
+
+# --- Schemas ---
+# Mirrors the "Checklist Evaluation" reply shape requested by create_full_policy_prompt.
+SECTION_REPLY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Checklist Evaluation": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "Checklist Item ID": {"type": "string"},
+                    "Status": {"type": "string", "enum": STATUSES},
+                    "Justification": {"type": "string"}
+                },
+                "required": ["Checklist Item ID", "Status", "Justification"],
+                "additionalProperties": False
+            }
+        },
+        "Match Level": {"type": "string", "enum": MATCH_LEVELS},
+        "Compliance Score": {"type": "number"},
+        "Suggested Rewrite": {"type": "string"},
+        "Simplified Legal Meaning": {"type": "string"}
+    },
+    "required": ["Checklist Evaluation", "Match Level", "Compliance Score", "Suggested Rewrite", "Simplified Legal Meaning"],
+    "additionalProperties": False
+}
+
+# Cascade triage replies also rate how sure the model is about each item (0-1)
+CONFIDENCE_SECTION_REPLY_SCHEMA = copy.deepcopy(SECTION_REPLY_SCHEMA)
+_confidence_item = CONFIDENCE_SECTION_REPLY_SCHEMA["properties"]["Checklist Evaluation"]["items"]
+_confidence_item["properties"]["Confidence"] = {"type": "number"}
+_confidence_item["required"].append("Confidence")
+
+def multi_section_schema(section_ids):
+    return {
+        "type": "object",
+        "properties": {
+            "Sections": {
+                "type": "object",
+                "properties": {sid: SECTION_REPLY_SCHEMA for sid in section_ids},
+                "required": list(section_ids),
+                "additionalProperties": False
+            }
+        },
+        "required": ["Sections"],
+        "additionalProperties": False
+    }
+
+# Model name prefixes by the strongest JSON mode they support
+JSON_SCHEMA_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+JSON_OBJECT_MODELS = ("gpt-4-turbo", "gpt-4-1106", "gpt-4-0125", "gpt-3.5-turbo")
+
+def response_format_for(model, schema_name, schema):
+    """Pick the response_format for a model: strict JSON schema, plain JSON mode, or None."""
+    if model.startswith(JSON_SCHEMA_MODELS):
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": schema_name, "schema": schema, "strict": True}
+        }
+    if model.startswith(JSON_OBJECT_MODELS):
+        return {"type": "json_object"}
+    return None
+
+# --- Tolerant Extraction ---
+def extract_json(text):
+    """Parse the first JSON object in a model reply.
+
+    Accepts bare JSON as well as JSON wrapped in code fences or surrounded by
+    prose. The fallback scans the text once, tracking brace depth outside of
+    string literals, and parses the first balanced object it finds.
+    """
+    text = (text or "").strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, flags=re.S)
+    if fenced:
+        try:
+            return json.loads(fenced.group(1))
+        except json.JSONDecodeError:
+            pass
+
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        in_string = escaped = False
+        for i in range(start, len(text)):
+            char = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        return json.loads(text[start:i + 1])
+                    except json.JSONDecodeError:
+                        break
+        start = text.find("{", start + 1)
+    raise json.JSONDecodeError("No JSON object found in model reply", text, 0)
+
+# --- Validation ---
+def validate_section_reply(data):
+    """Check a section reply against SECTION_REPLY_SCHEMA, normalizing status spelling in place."""
+    if not isinstance(data, dict):
+        raise ReplyValidationError("Reply must be a JSON object.")
+    evaluations = data.get("Checklist Evaluation")
+    if not isinstance(evaluations, list) or not evaluations:
+        raise ReplyValidationError('"Checklist Evaluation" must be a non-empty list.')
+
+    canonical = {status.lower(): status for status in STATUSES}
+    for entry in evaluations:
+        if not isinstance(entry, dict) or not isinstance(entry.get("Checklist Item ID"), str):
+            raise ReplyValidationError('Every evaluation needs a string "Checklist Item ID".')
+        status = canonical.get(str(entry.get("Status", "")).strip().lower())
+        if status is None:
+            raise ReplyValidationError(
+                f'Item {entry["Checklist Item ID"]} has Status {entry.get("Status")!r}; expected one of {", ".join(STATUSES)}.'
+            )
+        entry["Status"] = status
+        if not isinstance(entry.get("Justification", ""), str):
+            raise ReplyValidationError(f'Item {entry["Checklist Item ID"]} needs a string "Justification".')
+        if "Confidence" in entry:
+            try:
+                entry["Confidence"] = min(1.0, max(0.0, float(entry["Confidence"])))
+            except (TypeError, ValueError):
+                raise ReplyValidationError(f'Item {entry["Checklist Item ID"]} needs a numeric "Confidence" between 0 and 1.')
+
+    for key in ("Suggested Rewrite", "Simplified Legal Meaning"):
+        if key in data and not isinstance(data[key], str):
+            raise ReplyValidationError(f'"{key}" must be a string.')
+    return data
+
+def multi_section_validator(section_ids):
+    def validate(data):
+        sections = data.get("Sections") if isinstance(data, dict) else None
+        if not isinstance(sections, dict):
+            raise ReplyValidationError('Reply must contain a "Sections" object.')
+        missing = [sid for sid in section_ids if sid not in sections]
+        if missing:
+            raise ReplyValidationError(f"Sections {', '.join(missing)} are missing from the reply.")
+        for sid in section_ids:
+            validate_section_reply(sections[sid])
+        return data
+    return validate
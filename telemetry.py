@@ -0,0 +1,196 @@
+import collections
+import contextlib
+import contextvars
+import datetime
+import json
+import os
+import threading
+
+
+# Which part of the app a GPT call belongs to, e.g. "compliance:section-6" or "generator:full-policy"
+_feature = contextvars.ContextVar("llm_feature", default="unlabelled")
+
+@contextlib.contextmanager
+def llm_feature(name):
+    """Attribute every GPT call made inside the block (in this thread) to ``name``."""
+    token = _feature.set(name)
+    try:
+        yield
+    finally:
+        _feature.reset(token)
+
+def current_feature():
+    return _feature.get()
+
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+# --- Recorder ---
+class Telemetry:
+    """Records tokens, latency, retries and cache hits for every GPT call.
+
+    Each call is kept in a bounded in-memory list for the live panel, appended
+    to a size-rotated JSONL log when ``log_path`` is set, and folded into
+    per-(feature, model) counters that are exported in the Prometheus text
+    format, rewritten atomically to ``metrics_path`` after every call so a
+    node_exporter textfile collector can scrape it.
+    """
+
+    def __init__(self, log_path=None, metrics_path=None, max_log_bytes=20 * 1024 * 1024, log_backups=3, recent_calls=500):
+        self.log_path = log_path
+        self.metrics_path = metrics_path
+        self.max_log_bytes = max_log_bytes
+        self.log_backups = log_backups
+        self._recent = collections.deque(maxlen=recent_calls)
+        self._totals = {}
+        self._escalations = {}
+        self._lock = threading.Lock()
+        for path in (log_path, metrics_path):
+            directory = os.path.dirname(path) if path else ""
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def record_call(self, model, usage=None, latency_seconds=0.0, retries=0, error=None, cache_hit=False, feature=None):
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        record = {
+            "ts": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "feature": feature or current_feature(),
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "latency_ms": round(latency_seconds * 1000, 1),
+            "retries": retries,
+            "cache_hit": cache_hit,
+            "status": "error" if error is not None else "cache_hit" if cache_hit else "ok",
+            "error": f"{type(error).__name__}: {error}" if error is not None else None
+        }
+        with self._lock:
+            self._recent.append(record)
+            self._accumulate(record, latency_seconds)
+            if self.log_path:
+                self._append_log(record)
+            if self.metrics_path:
+                self._write_metrics()
+        return record
+
+    def record_cache_hit(self, model, feature=None):
+        return self.record_call(model, cache_hit=True, feature=feature)
+
+    def record_escalation(self, section_id, items, escalated):
+        """Count checklist items the cascade's triage model handled versus passed on to the evaluation model."""
+        with self._lock:
+            totals = self._escalations.setdefault(str(section_id), {"items": 0, "escalated": 0})
+            totals["items"] += items
+            totals["escalated"] += escalated
+            if self.metrics_path:
+                self._write_metrics()
+
+    def _accumulate(self, record, latency_seconds):
+        totals = self._totals.setdefault((record["feature"], record["model"]), {
+            "calls": 0, "errors": 0, "cache_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "retries": 0, "latency_sum": 0.0, "latency_buckets": [0] * len(LATENCY_BUCKETS)
+        })
+        if record["cache_hit"]:
+            totals["cache_hits"] += 1
+            return
+        totals["calls"] += 1
+        totals["errors"] += record["error"] is not None
+        totals["prompt_tokens"] += record["prompt_tokens"]
+        totals["completion_tokens"] += record["completion_tokens"]
+        totals["retries"] += record["retries"]
+        totals["latency_sum"] += latency_seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency_seconds <= bound:
+                totals["latency_buckets"][i] += 1
+
+    # --- Sinks ---
+    def _append_log(self, record):
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) >= self.max_log_bytes:
+            for i in range(self.log_backups - 1, 0, -1):
+                if os.path.exists(f"{self.log_path}.{i}"):
+                    os.replace(f"{self.log_path}.{i}", f"{self.log_path}.{i + 1}")
+            os.replace(self.log_path, f"{self.log_path}.1")
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _write_metrics(self):
+        temporary = f"{self.metrics_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self._prometheus_text())
+        os.replace(temporary, self.metrics_path)
+
+    def prometheus_text(self):
+        with self._lock:
+            return self._prometheus_text()
+
+    def _prometheus_text(self):
+        counters = [
+            ("dpdpa_llm_calls_total", "GPT requests sent (after the result cache).", "calls"),
+            ("dpdpa_llm_errors_total", "GPT requests that failed after all retries.", "errors"),
+            ("dpdpa_llm_cache_hits_total", "Results served from the cache instead of GPT.", "cache_hits"),
+            ("dpdpa_llm_prompt_tokens_total", "Prompt tokens reported by the API.", "prompt_tokens"),
+            ("dpdpa_llm_completion_tokens_total", "Completion tokens reported by the API.", "completion_tokens"),
+            ("dpdpa_llm_retries_total", "Retried attempts (rate limits, timeouts, 5xx).", "retries")
+        ]
+        lines = []
+        for name, help_text, key in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (feature, model), totals in sorted(self._totals.items()):
+                lines.append(f'{name}{{feature="{feature}",model="{model}"}} {totals[key]}')
+
+        name = "dpdpa_llm_latency_seconds"
+        lines += [f"# HELP {name} Wall time of GPT requests including rate-limit waits and retries.", f"# TYPE {name} histogram"]
+        for (feature, model), totals in sorted(self._totals.items()):
+            labels = f'feature="{feature}",model="{model}"'
+            for bound, count in zip(LATENCY_BUCKETS, totals["latency_buckets"]):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {totals["calls"]}')
+            lines.append(f"{name}_sum{{{labels}}} {round(totals['latency_sum'], 3)}")
+            lines.append(f"{name}_count{{{labels}}} {totals['calls']}")
+
+        for name, help_text, key in [
+            ("dpdpa_cascade_items_total", "Checklist items evaluated by the cascade's triage model.", "items"),
+            ("dpdpa_cascade_escalated_total", "Cascade items re-asked to the evaluation model.", "escalated")
+        ]:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for section, totals in sorted(self._escalations.items()):
+                lines.append(f'{name}{{section="{section}"}} {totals[key]}')
+        return "\n".join(lines) + "\n"
+
+    # --- Reporting ---
+    def recent(self, limit=50):
+        """The most recent call records, newest first."""
+        with self._lock:
+            return list(self._recent)[::-1][:limit]
+
+    def summary(self):
+        """Totals per feature and model since this process started."""
+        with self._lock:
+            return [
+                {
+                    "feature": feature,
+                    "model": model,
+                    "calls": totals["calls"],
+                    "cache_hits": totals["cache_hits"],
+                    "errors": totals["errors"],
+                    "retries": totals["retries"],
+                    "prompt_tokens": totals["prompt_tokens"],
+                    "completion_tokens": totals["completion_tokens"],
+                    "avg_latency_ms": round(1000 * totals["latency_sum"] / totals["calls"], 1) if totals["calls"] else 0.0
+                }
+                for (feature, model), totals in sorted(self._totals.items())
+            ]
+
+    def escalation_summary(self):
+        """Cascade items and escalation rate per section since this process started."""
+        with self._lock:
+            return [
+                {
+                    "section": section,
+                    "items": totals["items"],
+                    "escalated": totals["escalated"],
+                    "escalation_rate": round(totals["escalated"] / totals["items"], 3) if totals["items"] else 0.0
+                }
+                for section, totals in sorted(self._escalations.items(), key=lambda pair: int(pair[0]))
+            ]
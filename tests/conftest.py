@@ -0,0 +1,79 @@
+import json
+import os
+import re
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dpdpa_engine
+from gpt_scheduler import RequestScheduler
+from result_cache import ResultCache
+from telemetry import Telemetry
+
+
+# Checklist lines in the evaluation prompt look like "4.1. The policy must ..."
+PROMPT_ITEM = re.compile(r"^[ \t]*(\d+\.\d+)\. ", re.M)
+
+
+class FakeOpenAI:
+    """Stands in for openai.OpenAI: answers every checklist item in the prompt.
+
+    ``answer(model, item_id, prompt)`` returns the (status, confidence) of one
+    item; every call is kept in ``calls`` for assertions.
+    """
+
+    def __init__(self, answer=None):
+        self.answer = answer or (lambda model, item_id, prompt: ("Explicitly Mentioned", 0.9))
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        return self
+
+    def create(self, model, messages, temperature=0, timeout=None, **options):
+        prompt = messages[0]["content"]
+        self.calls.append({"model": model, "temperature": temperature, "prompt": prompt, "thread": threading.get_ident()})
+        evaluations = []
+        for item_id in PROMPT_ITEM.findall(prompt):
+            status, confidence = self.answer(model, item_id, prompt)
+            evaluations.append({
+                "Checklist Item ID": item_id, "Status": status, "Confidence": confidence,
+                "Justification": f"{model} on {item_id}"
+            })
+        content = json.dumps({
+            "Checklist Evaluation": evaluations,
+            "Match Level": "Partially Compliant",
+            "Compliance Score": 0.5,
+            "Suggested Rewrite": f"Rewrite by {model}",
+            "Simplified Legal Meaning": "Meaning"
+        })
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=50, total_tokens=150)
+        )
+
+
+@pytest.fixture
+def fake_openai():
+    return FakeOpenAI()
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path, fake_openai):
+    """dpdpa_engine wired to the fake client, a fresh result cache, scheduler and telemetry.
+
+    Module globals are patched rather than configure()d so every test starts
+    from the defaults again.
+    """
+    monkeypatch.setattr(dpdpa_engine, "client", fake_openai)
+    monkeypatch.setattr(dpdpa_engine, "result_cache", ResultCache(str(tmp_path / "results.sqlite")))
+    monkeypatch.setattr(dpdpa_engine, "scheduler", RequestScheduler(requests_per_minute=100_000, tokens_per_minute=10_000_000))
+    monkeypatch.setattr(dpdpa_engine, "telemetry", Telemetry())
+    monkeypatch.setattr(dpdpa_engine, "TASK_MODELS", dict(dpdpa_engine.TASK_MODELS))
+    monkeypatch.setattr(dpdpa_engine, "TASK_TEMPERATURES", dict(dpdpa_engine.TASK_TEMPERATURES))
+    monkeypatch.setattr(dpdpa_engine, "CASCADE_SECTIONS", frozenset())
+    return dpdpa_engine
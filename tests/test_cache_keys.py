@@ -0,0 +1,82 @@
+import time
+
+import dpdpa_engine
+from dpdpa_engine import dpdpa_checklists, section_prompt_version
+from result_cache import ResultCache, checklist_fingerprint, make_cache_key, policy_hash
+
+
+POLICY = "We collect personal data with your consent.\n\nContact our Data Protection Officer."
+
+
+def test_cache_key_is_stable_and_ignores_whitespace():
+    checklist = dpdpa_checklists["6"]["items"]
+    key = make_cache_key(POLICY, "6", checklist, "1", "gpt-4")
+    assert key == make_cache_key(POLICY, "6", checklist, "1", "gpt-4")
+    assert key == make_cache_key("  " + POLICY.replace("\n\n", "\n \n"), "6", checklist, "1", "gpt-4")
+
+
+def test_cache_key_accepts_precomputed_digest_and_fingerprint():
+    checklist = dpdpa_checklists["6"]["items"]
+    assert make_cache_key(POLICY, "6", checklist, "1", "gpt-4") == make_cache_key(
+        None, "6", checklist_fingerprint(checklist), "1", "gpt-4", policy_digest=policy_hash(POLICY)
+    )
+
+
+def test_cache_key_changes_with_each_part():
+    checklist = dpdpa_checklists["6"]["items"]
+    key = make_cache_key(POLICY, "6", checklist, "1", "gpt-4")
+    assert key != make_cache_key(POLICY + " More.", "6", checklist, "1", "gpt-4")
+    assert key != make_cache_key(POLICY, "7", checklist, "1", "gpt-4")
+    assert key != make_cache_key(POLICY, "6", checklist[:-1], "1", "gpt-4")
+    assert key != make_cache_key(POLICY, "6", checklist, "2", "gpt-4")
+    assert key != make_cache_key(POLICY, "6", checklist, "1", "gpt-4o")
+
+
+def test_prompt_version_is_stable_per_section():
+    for section_id, section in dpdpa_checklists.items():
+        items = section["items"]
+        assert section_prompt_version(items, prescreen=True) == section_prompt_version(items, prescreen=True)
+
+
+def test_editing_one_sections_rules_keeps_other_sections_keys(monkeypatch):
+    section_5, section_6 = dpdpa_checklists["5"]["items"], dpdpa_checklists["6"]["items"]
+    before = section_prompt_version(section_5, prescreen=True), section_prompt_version(section_6, prescreen=True)
+
+    monkeypatch.setitem(dpdpa_engine.prescreen_rules, "6.8", dict(dpdpa_engine.prescreen_rules["6.8"], topic="edited"))
+    after = section_prompt_version(section_5, prescreen=True), section_prompt_version(section_6, prescreen=True)
+
+    assert after[0] == before[0]
+    assert after[1] != before[1]
+
+
+def test_prompt_version_distinguishes_run_modes():
+    items = dpdpa_checklists["6"]["items"]
+    versions = {
+        section_prompt_version(items),
+        section_prompt_version(items, retrieval_top_k=3),
+        section_prompt_version(items, retrieval_top_k=5),
+        section_prompt_version(items, prescreen=True),
+        section_prompt_version(items, cascade=True)
+    }
+    assert len(versions) == 5
+
+
+def test_result_cache_round_trip_and_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_bytes=200)
+    cache.set("a", {"value": "x" * 80})
+    assert cache.get("a") == {"value": "x" * 80}
+    assert cache.get("missing") is None
+
+    cache.set("b", {"value": "y" * 80})
+    cache.get("a")
+    cache.set("c", {"value": "z" * 80})
+    # "b" was the least recently used entry once the payloads passed max_bytes
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_result_cache_expires_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_age_seconds=0.05)
+    cache.set("a", {"value": 1})
+    time.sleep(0.1)
+    assert cache.get("a") is None
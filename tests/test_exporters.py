@@ -0,0 +1,90 @@
+import io
+
+from docx import Document
+from openpyxl import load_workbook
+
+from draft_export import DraftExporter, markdown_to_docx
+from xlsx_report import ComplianceReportWriter, write_compliance_report
+
+
+def section_result(section_id, statuses):
+    return {
+        "Section": section_id,
+        "Title": f"Section {section_id} title",
+        "Match Level": "Partially Compliant",
+        "Compliance Score": 0.5,
+        "Matched Details": [
+            {
+                "Checklist Item ID": f"{section_id}.{i}", "Checklist Text": f"Item {i}",
+                "Status": status, "Justification": f"Because {i}"
+            }
+            for i, status in enumerate(statuses, start=1)
+        ]
+    }
+
+
+# --- Excel Report ---
+def test_report_has_a_summary_and_a_sheet_per_section():
+    documents = [
+        ("a.pdf", [section_result("4", ["Explicitly Mentioned", "Missing"]), section_result("6", ["Partially Mentioned"])]),
+        ("b.pdf", [section_result("4", ["Missing", "Missing"]), section_result("6", ["Explicitly Mentioned"])])
+    ]
+    buffer = io.BytesIO()
+    write_compliance_report(iter(documents), buffer)
+
+    workbook = load_workbook(io.BytesIO(buffer.getvalue()))
+    assert workbook.sheetnames == ["Summary", "Section 4", "Section 6"]
+
+    summary = list(workbook["Summary"].iter_rows(values_only=True))
+    assert summary[0][:3] == ("Document", "Section", "Title")
+    assert summary[1] == ("a.pdf", "4", "Section 4 title", "Partially Compliant", 0.5, 1, 0, 1)
+    assert len(summary) == 5
+
+    section_rows = list(workbook["Section 4"].iter_rows(values_only=True))
+    assert [row[:4] for row in section_rows[1:]] == [
+        ("a.pdf", "4.1", "Item 1", "Explicitly Mentioned"), ("a.pdf", "4.2", "Item 2", "Missing"),
+        ("b.pdf", "4.1", "Item 1", "Missing"), ("b.pdf", "4.2", "Item 2", "Missing")
+    ]
+    assert workbook["Section 4"].auto_filter.ref == "A1:G5"
+
+
+def test_empty_report_still_opens(tmp_path):
+    path = tmp_path / "report.xlsx"
+    ComplianceReportWriter().save(str(path))
+    assert load_workbook(path).sheetnames == ["Summary"]
+
+
+# --- Word Drafts ---
+def test_markdown_becomes_word_styles():
+    data = markdown_to_docx("Privacy Policy", "# Consent\n\nWe ask for **explicit** consent.\n\n- Email us\n  - or call\n1. First\n---")
+    paragraphs = [(p.style.name, p.text) for p in Document(io.BytesIO(data)).paragraphs]
+    assert paragraphs == [
+        ("Heading 1", "Privacy Policy"),
+        ("Heading 2", "Consent"),
+        ("Normal", "We ask for explicit consent."),
+        ("List Bullet", "Email us"),
+        ("List Bullet 2", "or call"),
+        ("List Number", "First")
+    ]
+    bold = [run.text for run in Document(io.BytesIO(data)).paragraphs[2].runs if run.bold]
+    assert bold == ["explicit"]
+
+
+def test_exporter_reuses_built_files():
+    exporter = DraftExporter()
+    first = exporter.docx("Policy", "Some text")
+    assert exporter.docx("Policy", "Some text") is first
+    assert exporter.docx("Policy", "Other text") is not first
+    assert exporter.txt("Some text") == b"Some text"
+    assert exporter.json({"a": 1}) == b'{\n  "a": 1\n}'
+
+
+def test_exporter_evicts_least_recently_used():
+    exporter = DraftExporter(max_bytes=20)
+    a = exporter.txt("a" * 10)
+    b = exporter.txt("b" * 10)
+    exporter.txt("a" * 10)
+    exporter.txt("c" * 10)
+    assert exporter._size == 20
+    assert exporter.txt("a" * 10) is a
+    assert exporter.txt("b" * 10) is not b
@@ -0,0 +1,135 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from gpt_scheduler import BudgetExceededError, DailyTokenBudget, RequestScheduler, TokenBucket
+from result_cache import ResultCache
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, request=request, headers={"retry-after": "0"})
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def response(total_tokens):
+    return SimpleNamespace(usage=SimpleNamespace(total_tokens=total_tokens))
+
+
+def failing(error):
+    def call(timeout):
+        raise error
+    return call
+
+
+# --- Token Bucket ---
+def test_bucket_adjust_gives_back_and_takes_extra():
+    bucket = TokenBucket(60_000)
+    bucket.acquire(10_000)
+    bucket.adjust(4_000)
+    assert 54_000 <= bucket._level <= 54_100
+    bucket.adjust(-20_000)
+    assert bucket._level < 35_000
+
+
+def test_bucket_never_fills_past_capacity():
+    bucket = TokenBucket(1_000)
+    bucket.adjust(5_000)
+    assert bucket._level == 1_000
+
+
+def test_bucket_caps_requests_larger_than_capacity():
+    bucket = TokenBucket(1_000)
+    bucket.acquire(5_000)
+    assert bucket._level < 1
+
+
+# --- Daily Token Budget ---
+def test_budget_rejects_past_the_limit():
+    budget = DailyTokenBudget(1_000)
+    budget.reserve(800)
+    with pytest.raises(BudgetExceededError):
+        budget.reserve(300)
+    assert budget.used_today() == 800
+
+
+def test_budget_adjust_never_goes_negative():
+    budget = DailyTokenBudget()
+    budget.reserve(100)
+    budget.adjust(-500)
+    assert budget.used_today() == 0
+
+
+def test_budget_in_the_result_cache_is_shared(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    app, api = DailyTokenBudget(1_000, ResultCache(path)), DailyTokenBudget(1_000, ResultCache(path))
+    app.reserve(600)
+    with pytest.raises(BudgetExceededError):
+        api.reserve(600)
+    api.adjust(-200)
+    assert app.used_today() == api.used_today() == 400
+    # A restarted process picks up today's total
+    assert DailyTokenBudget(1_000, ResultCache(path)).used_today() == 400
+
+
+# --- Scheduler ---
+def test_failed_attempt_refunds_budget_and_token_bucket():
+    scheduler = RequestScheduler(tokens_per_minute=10_000, max_retries=0, daily_token_budget=50_000)
+    with pytest.raises(ValueError):
+        scheduler.run(failing(ValueError("bad request")), estimated_tokens=4_000)
+    assert scheduler.budget.used_today() == 0
+    assert scheduler.token_bucket._level == pytest.approx(10_000, abs=10)
+
+
+def test_retries_refund_every_failed_attempt():
+    scheduler = RequestScheduler(tokens_per_minute=10_000, max_retries=3, base_delay=0, daily_token_budget=50_000)
+    attempts = []
+
+    def call(timeout):
+        attempts.append(timeout)
+        if len(attempts) < 3:
+            raise rate_limit_error()
+        return response(1_500)
+
+    report = {}
+    scheduler.run(call, estimated_tokens=4_000, report=report)
+    assert len(attempts) == 3 and report["retries"] == 2
+    # Only the successful attempt is charged, at its reported usage
+    assert scheduler.budget.used_today() == 1_500
+    assert scheduler.token_bucket._level == pytest.approx(8_500, abs=10)
+
+
+def test_non_retryable_errors_are_not_retried():
+    scheduler = RequestScheduler(max_retries=5, base_delay=0)
+    attempts = []
+
+    def call(timeout):
+        attempts.append(timeout)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.run(call, estimated_tokens=100)
+    assert len(attempts) == 1
+
+
+def test_exhausted_budget_stops_before_calling():
+    scheduler = RequestScheduler(daily_token_budget=1_000)
+    calls = []
+    with pytest.raises(BudgetExceededError):
+        scheduler.run(lambda timeout: calls.append(timeout), estimated_tokens=2_000)
+    assert calls == []
+
+
+def test_settle_corrects_the_estimate():
+    scheduler = RequestScheduler(tokens_per_minute=10_000, daily_token_budget=50_000)
+    scheduler.run(lambda timeout: response(6_000), estimated_tokens=2_000)
+    assert scheduler.budget.used_today() == 6_000
+    assert scheduler.token_bucket._level == pytest.approx(4_000, abs=10)
+
+
+def test_backoff_honours_retry_after():
+    scheduler = RequestScheduler(max_delay=30)
+    assert scheduler.backoff(4, rate_limit_error()) == 0
+    assert 0 <= scheduler.backoff(2) <= 4
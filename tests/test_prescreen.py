@@ -0,0 +1,68 @@
+import re
+
+import pytest
+
+from dpdpa_engine import dpdpa_checklists, prescreen_rules
+from prescreen import WITHDRAWAL_PATTERN, prescreen_checklist, rules_fingerprint, screen_item, sentence_spans
+
+
+def screen(text, section_id):
+    resolved, ambiguous = prescreen_checklist(text, dpdpa_checklists[section_id]["items"], prescreen_rules)
+    return {item_id: entry["Status"] for item_id, entry in resolved.items()}, [item["id"] for item in ambiguous]
+
+
+@pytest.mark.parametrize("wording", [
+    "You may withdraw your consent at any time.",
+    "You may revoke your consent at any time.",
+    "Revocation of consent is possible by writing to us.",
+    "You can opt out of processing from your account settings.",
+    "You can opt-out of marketing from your account settings.",
+    "Click unsubscribe in any email we send."
+])
+def test_withdrawal_synonyms_are_never_missing(wording):
+    statuses, _ = screen(wording, "6")
+    for item_id in ("6.8", "6.9", "6.10", "6.11"):
+        assert statuses.get(item_id) != "Missing"
+    statuses, _ = screen(wording, "5")
+    assert statuses.get("5.4") != "Missing"
+
+
+def test_no_withdrawal_wording_is_missing():
+    statuses, _ = screen("We collect your name and email address to send invoices.", "6")
+    assert statuses["6.8"] == "Missing"
+
+
+def test_revoke_at_any_time_is_present():
+    statuses, _ = screen("You may revoke your consent at any time.", "6")
+    assert statuses["6.8"] == "Explicitly Mentioned"
+
+
+def test_partial_wording_goes_to_gpt():
+    # 6.1 also needs the "clear affirmative action"; naming only some qualities is left to GPT
+    statuses, ambiguous = screen("Your consent is free, specific, informed, unconditional and unambiguous.", "6")
+    assert "6.1" not in statuses
+    assert "6.1" in ambiguous
+
+
+def test_every_element_makes_the_item_present():
+    statuses, _ = screen(
+        "Your consent is free, specific, informed, unconditional and unambiguous, given by a clear affirmative action.", "6"
+    )
+    assert statuses["6.1"] == "Explicitly Mentioned"
+
+
+def test_negated_sentence_is_not_evidence():
+    rule = {"present": [[r"\bsell\b", r"\bpersonal data\b"]], "topic": "selling data"}
+    text = "We do not sell personal data."
+    assert screen_item("x.1", rule, text, sentence_spans(text)) is None
+
+
+def test_withdrawal_pattern_ignores_unrelated_words():
+    assert not re.search(WITHDRAWAL_PATTERN, "We revise this notice and keep an optical record.", re.I)
+
+
+def test_rules_fingerprint_tracks_rule_changes():
+    rules = {"6.8": prescreen_rules["6.8"]}
+    changed = {"6.8": dict(prescreen_rules["6.8"], topic="something else")}
+    assert rules_fingerprint(rules) == rules_fingerprint(dict(rules))
+    assert rules_fingerprint(rules) != rules_fingerprint(changed)
@@ -0,0 +1,78 @@
+import pytest
+
+from retrieval import BM25Index, chunk_policy, chunk_policy_windows, items_touched_by_edit, select_passages, stem, tokenize
+
+
+@pytest.mark.parametrize("word, expected", [
+    ("process", "process"),
+    ("processes", "process"),
+    ("processing", "process"),
+    ("processed", "process"),
+    ("address", "address"),
+    ("addresses", "address"),
+    ("status", "status"),
+    ("analysis", "analysis"),
+    ("purposes", "purpose"),
+    ("services", "service"),
+    ("consents", "consent"),
+    ("boxes", "box"),
+    ("data", "data")
+])
+def test_stem(word, expected):
+    assert stem(word) == expected
+
+
+def test_tokenize_drops_stopwords_and_shares_stems():
+    assert tokenize("The Processing of your Personal Data") == ["process", "personal", "data"]
+    assert tokenize("We process data")[0] == tokenize("processes")[0]
+
+
+POLICY = """We collect your name and email address when you register.
+
+Your personal data is processed only for the purposes stated in this notice.
+
+You may withdraw your consent at any time by writing to privacy@example.com.
+
+We retain records for seven years to meet tax obligations."""
+
+
+def test_bm25_ranks_the_matching_passage_first():
+    passages = chunk_policy(POLICY, min_chars=10)
+    index = BM25Index(passages)
+    assert "withdraw" in passages[index.top_k("withdrawing consent", k=1)[0]]["text"]
+    assert "seven years" in passages[index.top_k("retention of records", k=1)[0]]["text"]
+    assert index.top_k("blockchain", k=3) == []
+
+
+def test_bm25_repeated_query_terms_count_once():
+    index = BM25Index(chunk_policy(POLICY, min_chars=10))
+    assert (index.scores("consent consent") == index.scores("consent")).all()
+
+
+def test_select_passages_records_items_in_document_order():
+    checklist = [
+        {"id": "6.8", "text": "The policy must let the Data Principal withdraw consent at any time."},
+        {"id": "8.7", "text": "The policy must state how long records are retained."}
+    ]
+    passages = select_passages(POLICY, checklist, top_k=1)
+    assert [p["start"] for p in passages] == sorted(p["start"] for p in passages)
+    assert {item for p in passages for item in p["items"]} == {"6.8", "8.7"}
+
+
+def test_windows_cover_the_text_with_overlap():
+    text = " ".join(f"word{i}" for i in range(2000))
+    windows = chunk_policy_windows(text, max_chars=1000, overlap_chars=100)
+    assert windows[0]["start"] == 0 and windows[-1]["end"] == len(text)
+    assert all(len(w["text"]) <= 1000 for w in windows)
+    for previous, current in zip(windows, windows[1:]):
+        assert current["start"] < previous["end"]
+        assert text[current["start"]:current["end"]] == current["text"]
+
+
+def test_items_touched_by_edit_flags_only_changed_evidence():
+    checklist = [
+        {"id": "6.8", "text": "The policy must let the Data Principal withdraw consent at any time."},
+        {"id": "8.7", "text": "The policy must state how long records are retained."}
+    ]
+    edited = POLICY.replace("seven years", "ten years")
+    assert items_touched_by_edit(POLICY, edited, checklist) == ["8.7"]
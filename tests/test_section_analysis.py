@@ -0,0 +1,109 @@
+import threading
+
+from dpdpa_engine import dpdpa_checklists
+
+
+SECTION = "6"
+POLICY = "We collect personal data with your consent for the purposes stated here. Contact our Data Protection Officer."
+
+
+def items():
+    return dpdpa_checklists[SECTION]["items"]
+
+
+def test_section_result_is_cached(engine, fake_openai):
+    first = engine.analyze_policy_section(SECTION, items(), POLICY, prescreen=False)
+    assert first["Match Level"] != "Error"
+    assert [d["Checklist Item ID"] for d in first["Matched Details"]] == [item["id"] for item in items()]
+    assert len(fake_openai.calls) == 1
+
+    second = engine.analyze_policy_section(SECTION, items(), POLICY, prescreen=False)
+    assert second == first
+    assert len(fake_openai.calls) == 1
+
+
+def test_failed_call_is_an_error_result_and_not_cached(engine, fake_openai):
+    def answer(model, item_id, prompt):
+        raise ValueError("bad request")
+    fake_openai.answer = answer
+
+    result = engine.analyze_policy_section(SECTION, items(), POLICY, prescreen=False)
+    assert result["Match Level"] == "Error"
+    assert engine.result_cache.stats()["entries"] == 0
+
+
+# --- Cascade ---
+def test_cascade_escalates_only_uncertain_items(engine, fake_openai):
+    uncertain = items()[1]["id"]
+    triage_model, evaluation_model = engine.model_for("triage"), engine.model_for("evaluation")
+
+    def answer(model, item_id, prompt):
+        if model == triage_model:
+            return ("Explicitly Mentioned", 0.3 if item_id == uncertain else 0.95)
+        return ("Missing", 1.0)
+    fake_openai.answer = answer
+    engine.TASK_TEMPERATURES.update(triage=0.3, evaluation=0.0)
+
+    result = engine.analyze_policy_section(SECTION, items(), POLICY, prescreen=False, cascade=True)
+
+    assert result["Escalated Items"] == [uncertain]
+    statuses = {e["Checklist Item ID"]: e["Status"] for e in result["Matched Details"]}
+    assert statuses[uncertain] == "Missing"
+    assert all(status == "Explicitly Mentioned" for item_id, status in statuses.items() if item_id != uncertain)
+    assert [(c["model"], c["temperature"]) for c in fake_openai.calls] == [(triage_model, 0.3), (evaluation_model, 0.0)]
+    # Only the escalated item is re-asked
+    assert engine.telemetry.escalation_summary()[0]["escalated"] == 1
+
+
+def test_cascade_escalates_everything_when_triage_fails(engine, fake_openai):
+    triage_model = engine.model_for("triage")
+
+    def answer(model, item_id, prompt):
+        if model == triage_model:
+            raise ValueError("triage unavailable")
+        return ("Partially Mentioned", 1.0)
+    fake_openai.answer = answer
+
+    result = engine.analyze_policy_section(SECTION, items(), POLICY, prescreen=False, cascade=True)
+    assert result["Escalated Items"] == [item["id"] for item in items()]
+
+
+# --- Long-Policy Map-Reduce ---
+def long_policy():
+    filler = "We describe our services and the ways you can reach customer support for help. " * 40
+    paragraphs = [filler] * 30
+    paragraphs[20] = "You may withdraw your consent at any time and as easily as you gave it. " + filler
+    return "\n\n".join(paragraphs)
+
+
+def test_long_policy_is_map_reduced_in_the_section_worker(engine, fake_openai):
+    def answer(model, item_id, prompt):
+        return ("Explicitly Mentioned", 1.0) if "withdraw your consent" in prompt else ("Missing", 1.0)
+    fake_openai.answer = answer
+    policy = long_policy()
+    assert engine.exceeds_context(SECTION, items(), policy, engine.model_for("evaluation"))
+
+    result = engine.analyze_policy_section(SECTION, items(), policy, prescreen=False)
+
+    parts = result["Policy Parts"]
+    assert parts > 1 and len(fake_openai.calls) == parts
+    # Windows run one after another on the caller's thread rather than in a nested pool
+    assert {c["thread"] for c in fake_openai.calls} == {threading.get_ident()}
+    details = result["Matched Details"]
+    assert all(d["Status"] == "Explicitly Mentioned" for d in details)
+    assert all(d["Justification"].startswith("[chars ") for d in details)
+
+
+def test_map_reduce_keeps_missing_when_no_window_has_evidence(engine, fake_openai):
+    fake_openai.answer = lambda model, item_id, prompt: ("Missing", 1.0)
+    result = engine.analyze_policy_section(SECTION, items(), long_policy(), prescreen=False)
+    parts = result["Policy Parts"]
+    assert all(d["Status"] == "Missing" for d in result["Matched Details"])
+    assert all(f"any of the {parts} parts" in d["Justification"] for d in result["Matched Details"])
+
+
+def test_concurrent_sections_come_back_in_order(engine, fake_openai):
+    section_ids = ["4", "5", "6"]
+    results = engine.evaluate_policy(POLICY, section_ids, prescreen=False, max_workers=3)
+    assert [r["Section"] for r in results] == section_ids
+    assert len(fake_openai.calls) == 3
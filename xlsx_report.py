@@ -0,0 +1,126 @@
+"""Excel compliance reports written row by row in openpyxl's write-only mode.
+
+Rows go straight to each worksheet's temporary file as documents are added,
+so a batch of thousands of evaluations never exists as a DataFrame or a list
+of row dicts; only a small per-sheet row count is kept for the formatting
+ranges applied at save time.
+"""
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import CellIsRule, ColorScaleRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+
+SECTION_COLUMNS = [
+    ("Document", 28), ("Checklist Item ID", 10), ("Checklist Text", 60),
+    ("Status", 20), ("Justification", 80), ("Match Level", 20), ("Score", 8)
+]
+SUMMARY_COLUMNS = [
+    ("Document", 28), ("Section", 9), ("Title", 45), ("Match Level", 20), ("Compliance Score", 10),
+    ("Explicitly Mentioned", 10), ("Partially Mentioned", 10), ("Missing", 10)
+]
+
+# Light fills with dark text, in the hues of the app's status badges
+STATUS_FILLS = {
+    "Explicitly Mentioned": ("D1E7DD", "0F5132"),
+    "Partially Mentioned": ("FFF3CD", "664D03"),
+    "Missing": ("F8D7DA", "842029"),
+    "Fully Compliant": ("D1E7DD", "0F5132"),
+    "Partially Compliant": ("FFF3CD", "664D03"),
+    "Non-Compliant": ("F8D7DA", "842029"),
+    "Error": ("E2E3E5", "41464B")
+}
+HEADER_FILL = PatternFill("solid", start_color="1F3864", end_color="1F3864")
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+
+
+class ComplianceReportWriter:
+    """Streams section results into a workbook with a Summary sheet and one sheet per section.
+
+    Call ``add_document`` once per evaluated policy, then ``save`` with a path
+    or a binary file object. Section sheets are created the first time a
+    section appears, so they follow the order of the first document's results.
+    """
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+        self._sheets = {}
+        self._rows = {}
+        self.summary = self._create_sheet("Summary", SUMMARY_COLUMNS)
+
+    def _create_sheet(self, title, columns):
+        sheet = self.workbook.create_sheet(title)
+        # Column widths and panes must be set before the first row is written
+        for i, (_, width) in enumerate(columns, start=1):
+            sheet.column_dimensions[get_column_letter(i)].width = width
+        sheet.freeze_panes = "A2"
+        header = []
+        for name, _ in columns:
+            cell = WriteOnlyCell(sheet, value=name)
+            cell.font, cell.fill = HEADER_FONT, HEADER_FILL
+            header.append(cell)
+        sheet.append(header)
+        self._rows[title] = 1
+        return sheet
+
+    def _section_sheet(self, section_id):
+        title = f"Section {section_id}"[:31]
+        if title not in self._sheets:
+            self._sheets[title] = self._create_sheet(title, SECTION_COLUMNS)
+        return title, self._sheets[title]
+
+    def add_document(self, document, results):
+        for result in results:
+            details = result["Matched Details"]
+            counts = {status: 0 for status in ("Explicitly Mentioned", "Partially Mentioned", "Missing")}
+            title, sheet = self._section_sheet(result["Section"])
+            for item in details:
+                sheet.append([
+                    document, item["Checklist Item ID"], item["Checklist Text"], item["Status"],
+                    item["Justification"], result["Match Level"], result["Compliance Score"]
+                ])
+                if item["Status"] in counts:
+                    counts[item["Status"]] += 1
+            self._rows[title] += len(details)
+
+            self.summary.append([
+                document, result["Section"], result["Title"], result["Match Level"], result["Compliance Score"],
+                *counts.values()
+            ])
+            self._rows["Summary"] += 1
+
+    def _format(self, sheet, columns, status_columns, score_column):
+        last_row = self._rows[sheet.title]
+        sheet.auto_filter.ref = f"A1:{get_column_letter(len(columns))}{last_row}"
+        if last_row < 2:
+            return
+        names = [name for name, _ in columns]
+        for column in status_columns:
+            letter = get_column_letter(names.index(column) + 1)
+            for status, (fill, font) in STATUS_FILLS.items():
+                sheet.conditional_formatting.add(f"{letter}2:{letter}{last_row}", CellIsRule(
+                    operator="equal", formula=[f'"{status}"'],
+                    fill=PatternFill("solid", start_color=fill, end_color=fill), font=Font(color=font)
+                ))
+        letter = get_column_letter(names.index(score_column) + 1)
+        sheet.conditional_formatting.add(f"{letter}2:{letter}{last_row}", ColorScaleRule(
+            start_type="num", start_value=0, start_color="F8D7DA",
+            mid_type="num", mid_value=0.5, mid_color="FFF3CD",
+            end_type="num", end_value=1, end_color="D1E7DD"
+        ))
+
+    def save(self, destination):
+        """Write the workbook to a path or binary file object; the writer cannot be reused afterwards."""
+        self._format(self.summary, SUMMARY_COLUMNS, ["Match Level"], "Compliance Score")
+        for sheet in self._sheets.values():
+            self._format(sheet, SECTION_COLUMNS, ["Status", "Match Level"], "Score")
+        self.workbook.save(destination)
+
+
+def write_compliance_report(documents, destination):
+    """Write (document name, section results) pairs, consumed lazily, as one Excel report."""
+    writer = ComplianceReportWriter()
+    for document, results in documents:
+        writer.add_document(document, results)
+    writer.save(destination)